@@ -0,0 +1,32 @@
+"""Add blob table, the reference-counted content-addressed image files
+
+Revision ID: add_blob_table
+Revises: add_image_storage_key
+Create Date: 2026-10-17 23:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'add_blob_table'
+down_revision = 'add_image_storage_key'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        'blob',
+        sa.Column('storage_key', sa.String(length=500), nullable=False),
+        sa.Column('sha256', sa.String(length=64), nullable=False),
+        sa.Column('size', sa.Integer(), nullable=False),
+        sa.Column('ref_count', sa.Integer(), nullable=False),
+        sa.Column('created_at', sa.DateTime(), nullable=False),
+        sa.PrimaryKeyConstraint('storage_key')
+    )
+
+
+def downgrade() -> None:
+    op.drop_table('blob')
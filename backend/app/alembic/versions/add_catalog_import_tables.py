@@ -0,0 +1,55 @@
+"""Add catalogimport and catalogimporterror tables for bulk catalog imports
+
+Revision ID: add_catalog_import_tables
+Revises: add_item_filter_indexes
+Create Date: 2026-10-17 16:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'add_catalog_import_tables'
+down_revision = 'add_item_filter_indexes'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        'catalogimport',
+        sa.Column('filename', sa.String(length=255), nullable=False),
+        sa.Column('format', sa.String(length=10), nullable=False),
+        sa.Column('status', sa.String(length=20), nullable=False),
+        sa.Column('rows_loaded', sa.Integer(), nullable=False),
+        sa.Column('items_created', sa.Integer(), nullable=False),
+        sa.Column('images_created', sa.Integer(), nullable=False),
+        sa.Column('error_count', sa.Integer(), nullable=False),
+        sa.Column('error_message', sa.String(length=1000), nullable=True),
+        sa.Column('id', sa.Uuid(), nullable=False),
+        sa.Column('owner_id', sa.Uuid(), nullable=False),
+        sa.Column('producer_id', sa.Uuid(), nullable=True),
+        sa.Column('created_at', sa.DateTime(), nullable=False),
+        sa.Column('finished_at', sa.DateTime(), nullable=True),
+        sa.ForeignKeyConstraint(['owner_id'], ['user.id'], ondelete='CASCADE'),
+        sa.ForeignKeyConstraint(['producer_id'], ['producer.id'], ondelete='SET NULL'),
+        sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('ix_catalogimport_owner_id', 'catalogimport', ['owner_id'])
+    op.create_index('ix_catalogimport_producer_id', 'catalogimport', ['producer_id'])
+    op.create_table(
+        'catalogimporterror',
+        sa.Column('import_id', sa.Uuid(), nullable=False),
+        sa.Column('row_number', sa.Integer(), nullable=False),
+        sa.Column('message', sa.String(length=255), nullable=False),
+        sa.ForeignKeyConstraint(['import_id'], ['catalogimport.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('import_id', 'row_number')
+    )
+
+
+def downgrade() -> None:
+    op.drop_table('catalogimporterror')
+    op.drop_index('ix_catalogimport_producer_id', table_name='catalogimport')
+    op.drop_index('ix_catalogimport_owner_id', table_name='catalogimport')
+    op.drop_table('catalogimport')
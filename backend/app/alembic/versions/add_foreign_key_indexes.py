@@ -0,0 +1,45 @@
+"""Add indexes on foreign key columns used by hot queries
+
+Revision ID: add_foreign_key_indexes
+Revises: add_keyset_pagination_indexes
+Create Date: 2026-10-17 10:00:00.000000
+
+"""
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = 'add_foreign_key_indexes'
+down_revision = 'add_keyset_pagination_indexes'
+branch_labels = None
+depends_on = None
+
+
+# item.owner_id is already covered by ix_item_owner_id_created_at_id
+INDEXES = (
+    ('ix_item_producer_id', 'item', ['producer_id']),
+    ('ix_item_variant_of', 'item', ['variant_of']),
+    ('ix_image_item_id', 'image', ['item_id']),
+    ('ix_producerimage_producer_id', 'producerimage', ['producer_id']),
+    ('ix_review_producer_id', 'review', ['producer_id']),
+    ('ix_producer_user_id', 'producer', ['user_id']),
+    ('ix_emaillog_user_id_created_at', 'emaillog', ['user_id', 'created_at']),
+)
+
+
+def upgrade() -> None:
+    # CREATE INDEX CONCURRENTLY cannot run inside a transaction, and does not
+    # block writes to tables that are already large in production
+    with op.get_context().autocommit_block():
+        for name, table, columns in INDEXES:
+            op.create_index(
+                name, table, columns, postgresql_concurrently=True, if_not_exists=True
+            )
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        for name, table, _ in reversed(INDEXES):
+            op.drop_index(
+                name, table_name=table, postgresql_concurrently=True, if_exists=True
+            )
@@ -0,0 +1,103 @@
+"""Add storage_key to image and producerimage, backfilled from their paths
+
+Revision ID: add_image_storage_key
+Revises: add_storage_task_table
+Create Date: 2026-10-17 21:00:00.000000
+
+The backfill runs in batches of BATCH_SIZE rows, each committed on its own, so
+it holds no long locks on a large table and an interrupted run picks up where
+it stopped: the columns are only added if missing, and only rows without a key
+are visited. Rows whose path is not a file in storage
+(app.core.storage.storage_key_patterns, for the configured BACKEND_HOST and
+pull zone) keep a NULL key and are served by their path.
+"""
+import re
+from urllib.parse import urlparse
+
+from alembic import op
+import sqlalchemy as sa
+
+from app.core.config import settings
+
+
+# revision identifiers, used by Alembic.
+revision = 'add_image_storage_key'
+down_revision = 'add_storage_task_table'
+branch_labels = None
+depends_on = None
+
+BATCH_SIZE = 5000
+
+# Copy of app.core.storage.storage_key_patterns when this revision was written
+_KEY = r"(?!/)(?!.*\.\.)(.+)"
+
+
+def _storage_key_patterns() -> tuple[str, ...]:
+    backend = urlparse(settings.BACKEND_HOST)
+    patterns = [
+        rf"^(?:https?://{re.escape(backend.netloc)})?/uploads/{_KEY}$",
+        rf"^/.*/uploads/{_KEY}$",
+    ]
+    pull_zone_url = settings.BUNNYCDN_PULL_ZONE_URL or (
+        settings.BUNNYCDN_STORAGE_ZONE
+        and f"https://{settings.BUNNYCDN_STORAGE_ZONE}.b-cdn.net"
+    )
+    if pull_zone_url:
+        pull_zone = urlparse(pull_zone_url)
+        host = f"{pull_zone.netloc}{pull_zone.path.rstrip('/')}"
+        patterns.insert(0, rf"^https?://{re.escape(host)}/{_KEY}$")
+    return tuple(patterns)
+
+
+def _backfill(table: str) -> None:
+    patterns = _storage_key_patterns()
+    key = "coalesce({})".format(
+        ", ".join(f"substring(path from :pattern_{i})" for i in range(len(patterns)))
+    )
+    # One batch of rows without a key after `after`, in id order; returns the
+    # last id visited, or nothing once the table is done
+    statement = sa.text(
+        f"""
+        WITH batch AS (
+            SELECT id, {key} AS storage_key FROM {table}
+            WHERE storage_key IS NULL AND (CAST(:after AS uuid) IS NULL OR id > :after)
+            ORDER BY id
+            LIMIT :batch_size
+        ), updated AS (
+            UPDATE {table} SET storage_key = batch.storage_key
+            FROM batch
+            WHERE {table}.id = batch.id AND batch.storage_key IS NOT NULL
+        )
+        SELECT id FROM batch ORDER BY id DESC LIMIT 1
+        """
+    ).bindparams(
+        *(
+            sa.bindparam(f"pattern_{i}", pattern)
+            for i, pattern in enumerate(patterns)
+        )
+    )
+    connection = op.get_bind()
+    after = None
+    with op.get_context().autocommit_block():
+        while True:
+            after = connection.execute(
+                statement, {"after": after, "batch_size": BATCH_SIZE}
+            ).scalar()
+            if after is None:
+                break
+
+
+def upgrade() -> None:
+    # Committed before the backfill (autocommit_block), so already there when
+    # an interrupted upgrade is run again
+    op.execute('ALTER TABLE image ADD COLUMN IF NOT EXISTS storage_key VARCHAR(500)')
+    op.execute(
+        'ALTER TABLE producerimage ADD COLUMN IF NOT EXISTS storage_key VARCHAR(500)'
+    )
+    _backfill('image')
+    _backfill('producerimage')
+
+
+def downgrade() -> None:
+    op.drop_column('producerimage', 'storage_key')
+    op.drop_column('image', 'storage_key')
@@ -0,0 +1,27 @@
+"""Add variants to image, the resized copies of item images
+
+Revision ID: add_image_variants
+Revises: add_blob_table
+Create Date: 2026-10-17 23:30:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision = 'add_image_variants'
+down_revision = 'add_blob_table'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column(
+        'image', sa.Column('variants', postgresql.JSONB(astext_type=sa.Text()), nullable=True)
+    )
+
+
+def downgrade() -> None:
+    op.drop_column('image', 'variants')
@@ -0,0 +1,60 @@
+"""Add composite indexes for item filters and orderings
+
+Revision ID: add_item_filter_indexes
+Revises: add_item_search_vector
+Create Date: 2026-10-17 14:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'add_item_filter_indexes'
+down_revision = 'add_item_search_vector'
+branch_labels = None
+depends_on = None
+
+
+INDEXES = (
+    ('ix_item_producer_id_created_at_id', ['producer_id', 'created_at', 'id'], None),
+    ('ix_item_variant_of_created_at_id', ['variant_of', 'created_at', 'id'], None),
+    ('ix_item_is_original_created_at_id', ['is_original', 'created_at', 'id'], None),
+    ('ix_item_with_model_created_at_id', ['created_at', 'id'], 'model IS NOT NULL'),
+    ('ix_item_title_id', ['title', 'id'], None),
+)
+
+# Foreign key indexes made redundant by the composite indexes above
+REPLACED = (
+    ('ix_item_producer_id', ['producer_id']),
+    ('ix_item_variant_of', ['variant_of']),
+)
+
+
+def upgrade() -> None:
+    with op.get_context().autocommit_block():
+        for name, columns, where in INDEXES:
+            op.create_index(
+                name,
+                'item',
+                columns,
+                postgresql_where=sa.text(where) if where else None,
+                postgresql_concurrently=True,
+                if_not_exists=True,
+            )
+        for name, _ in REPLACED:
+            op.drop_index(
+                name, table_name='item', postgresql_concurrently=True, if_exists=True
+            )
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        for name, columns in REPLACED:
+            op.create_index(
+                name, 'item', columns, postgresql_concurrently=True, if_not_exists=True
+            )
+        for name, _, _ in reversed(INDEXES):
+            op.drop_index(
+                name, table_name='item', postgresql_concurrently=True, if_exists=True
+            )
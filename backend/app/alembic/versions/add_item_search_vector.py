@@ -0,0 +1,56 @@
+"""Add a generated full-text search vector to item
+
+Revision ID: add_item_search_vector
+Revises: add_foreign_key_indexes
+Create Date: 2026-10-17 12:00:00.000000
+
+"""
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = 'add_item_search_vector'
+down_revision = 'add_foreign_key_indexes'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.execute(
+        """
+        ALTER TABLE item ADD COLUMN search_vector tsvector GENERATED ALWAYS AS (
+            setweight(to_tsvector('english', coalesce(title, '')), 'A') ||
+            setweight(to_tsvector('english', coalesce(description, '')), 'B')
+        ) STORED
+        """
+    )
+    with op.get_context().autocommit_block():
+        op.create_index(
+            'ix_item_search_vector',
+            'item',
+            ['search_vector'],
+            postgresql_using='gin',
+            postgresql_concurrently=True,
+            if_not_exists=True,
+        )
+        op.execute(
+            "CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_producer_name_search "
+            "ON producer USING gin (to_tsvector('english', name))"
+        )
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.drop_index(
+            'ix_producer_name_search',
+            table_name='producer',
+            postgresql_concurrently=True,
+            if_exists=True,
+        )
+        op.drop_index(
+            'ix_item_search_vector',
+            table_name='item',
+            postgresql_concurrently=True,
+            if_exists=True,
+        )
+    op.drop_column('item', 'search_vector')
@@ -0,0 +1,36 @@
+"""Add item.created_at and indexes backing keyset pagination
+
+Revision ID: add_keyset_pagination_indexes
+Revises: remove_nft_fields_from_item
+Create Date: 2026-10-17 09:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'add_keyset_pagination_indexes'
+down_revision = 'remove_nft_fields_from_item'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # Existing rows get the migration time; their order then falls back to id
+    op.add_column(
+        'item',
+        sa.Column('created_at', sa.DateTime(), nullable=False, server_default=sa.func.now()),
+    )
+    op.alter_column('item', 'created_at', server_default=None)
+
+    op.create_index('ix_item_created_at_id', 'item', ['created_at', 'id'])
+    op.create_index('ix_item_owner_id_created_at_id', 'item', ['owner_id', 'created_at', 'id'])
+    op.create_index('ix_producer_created_at_id', 'producer', ['created_at', 'id'])
+
+
+def downgrade() -> None:
+    op.drop_index('ix_producer_created_at_id', table_name='producer')
+    op.drop_index('ix_item_owner_id_created_at_id', table_name='item')
+    op.drop_index('ix_item_created_at_id', table_name='item')
+    op.drop_column('item', 'created_at')
@@ -0,0 +1,37 @@
+"""Add storage_task table, the outbox of pending file deletions
+
+Revision ID: add_storage_task_table
+Revises: add_catalog_import_tables
+Create Date: 2026-10-17 18:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'add_storage_task_table'
+down_revision = 'add_catalog_import_tables'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        'storage_task',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('path', sa.String(length=1000), nullable=False),
+        sa.Column('attempts', sa.Integer(), nullable=False),
+        sa.Column('last_error', sa.String(length=1000), nullable=True),
+        sa.Column('created_at', sa.DateTime(), nullable=False),
+        sa.Column('next_attempt_at', sa.DateTime(), nullable=False),
+        sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(
+        'ix_storage_task_next_attempt_at', 'storage_task', ['next_attempt_at']
+    )
+
+
+def downgrade() -> None:
+    op.drop_index('ix_storage_task_next_attempt_at', table_name='storage_task')
+    op.drop_table('storage_task')
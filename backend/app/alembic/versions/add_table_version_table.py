@@ -0,0 +1,30 @@
+"""Add table_version table, the versions the per-process caches are checked against
+
+Revision ID: add_table_version_table
+Revises: add_image_variants
+Create Date: 2026-10-17 23:30:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'add_table_version_table'
+down_revision = 'add_image_variants'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        'table_version',
+        sa.Column('name', sa.String(length=100), nullable=False),
+        sa.Column('version', sa.Integer(), nullable=False),
+        sa.Column('rows_version', sa.Integer(), nullable=False),
+        sa.PrimaryKeyConstraint('name')
+    )
+
+
+def downgrade() -> None:
+    op.drop_table('table_version')
@@ -1,16 +1,19 @@
-from collections.abc import Generator
+from collections.abc import AsyncGenerator, Generator
 from typing import Annotated
 
 import jwt
-from fastapi import Depends, HTTPException, status
+from fastapi import Depends, HTTPException, Request, status
 from fastapi.security import OAuth2PasswordBearer
 from jwt.exceptions import InvalidTokenError
 from pydantic import ValidationError
 from sqlmodel import Session
+from sqlmodel.ext.asyncio.session import AsyncSession
 
 from app.core import security
 from app.core.config import settings
 from app.core.db import engine
+from app.core.db_routing import READ_YOUR_WRITES_COOKIE, select_async_engine
+from app.core.storage import StorageBackend, get_storage
 from app.models import TokenPayload, User
 
 reusable_oauth2 = OAuth2PasswordBearer(
@@ -27,22 +30,35 @@ def get_db() -> Generator[Session, None, None]:
         yield session
 
 
+async def get_async_db(request: Request) -> AsyncGenerator[AsyncSession, None]:
+    # Safe requests may be served by the read replica (see app.core.db_routing)
+    bind = select_async_engine(
+        request.method,
+        request.headers.get("authorization"),
+        request.cookies.get(READ_YOUR_WRITES_COOKIE),
+    )
+    # Objects stay usable after commit; attribute refresh would need an await
+    async with AsyncSession(bind, expire_on_commit=False) as session:
+        yield session
+
+
 SessionDep = Annotated[Session, Depends(get_db)]
+AsyncSessionDep = Annotated[AsyncSession, Depends(get_async_db)]
 TokenDep = Annotated[str, Depends(reusable_oauth2)]
+StorageDep = Annotated[StorageBackend, Depends(get_storage)]
 
 
-def get_current_user(session: SessionDep, token: TokenDep) -> User:
+def _decode_token(token: str) -> TokenPayload | None:
     try:
         payload = jwt.decode(
             token, settings.SECRET_KEY, algorithms=[security.ALGORITHM]
         )
-        token_data = TokenPayload(**payload)
+        return TokenPayload(**payload)
     except (InvalidTokenError, ValidationError):
-        raise HTTPException(
-            status_code=status.HTTP_403_FORBIDDEN,
-            detail="Could not validate credentials",
-        )
-    user = session.get(User, token_data.sub)
+        return None
+
+
+def _check_current_user(user: User | None) -> User:
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
     if not user.is_active:
@@ -50,7 +66,29 @@ def get_current_user(session: SessionDep, token: TokenDep) -> User:
     return user
 
 
+def _credentials_exception() -> HTTPException:
+    return HTTPException(
+        status_code=status.HTTP_403_FORBIDDEN,
+        detail="Could not validate credentials",
+    )
+
+
+def get_current_user(session: SessionDep, token: TokenDep) -> User:
+    token_data = _decode_token(token)
+    if token_data is None:
+        raise _credentials_exception()
+    return _check_current_user(session.get(User, token_data.sub))
+
+
+async def get_current_user_async(session: AsyncSessionDep, token: TokenDep) -> User:
+    token_data = _decode_token(token)
+    if token_data is None:
+        raise _credentials_exception()
+    return _check_current_user(await session.get(User, token_data.sub))
+
+
 CurrentUser = Annotated[User, Depends(get_current_user)]
+AsyncCurrentUser = Annotated[User, Depends(get_current_user_async)]
 
 
 def get_optional_current_user(
@@ -58,19 +96,32 @@ def get_optional_current_user(
 ) -> User | None:
     if not token:
         return None
-    try:
-        payload = jwt.decode(
-            token, settings.SECRET_KEY, algorithms=[security.ALGORITHM]
-        )
-        token_data = TokenPayload(**payload)
-    except (InvalidTokenError, ValidationError):
+    token_data = _decode_token(token)
+    if token_data is None:
         return None
     user = session.get(User, token_data.sub)
     if not user or not user.is_active:
         return None
     return user
 
+
+async def get_optional_current_user_async(
+    session: AsyncSessionDep, token: str | None = Depends(optional_oauth2_scheme)
+) -> User | None:
+    if not token:
+        return None
+    token_data = _decode_token(token)
+    if token_data is None:
+        return None
+    user = await session.get(User, token_data.sub)
+    if not user or not user.is_active:
+        return None
+    return user
+
 OptionalCurrentUser = Annotated[User | None, Depends(get_optional_current_user)]
+AsyncOptionalCurrentUser = Annotated[
+    User | None, Depends(get_optional_current_user_async)
+]
 
 def get_current_active_superuser(current_user: CurrentUser) -> User:
     if "superuser" not in current_user.permissions:
@@ -2,6 +2,7 @@ from fastapi import APIRouter
 
 from app.api.routes import (
     images,
+    imports,
     items,
     login,
     logs,
@@ -20,6 +21,7 @@ api_router.include_router(login.router)
 api_router.include_router(users.router)
 api_router.include_router(utils.router)
 api_router.include_router(items.router)
+api_router.include_router(imports.router)
 api_router.include_router(images.router)
 api_router.include_router(logs.router)
 api_router.include_router(models.router)
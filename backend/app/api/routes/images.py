@@ -1,17 +1,29 @@
-import os
 import uuid
+from email.utils import formatdate
 from enum import Enum
 from logging import getLogger
 from pathlib import Path
 
-from fastapi import APIRouter, File, HTTPException, Query, UploadFile
-from fastapi.responses import FileResponse
+from fastapi import (
+    APIRouter,
+    BackgroundTasks,
+    File,
+    HTTPException,
+    Query,
+    Response,
+    UploadFile,
+)
+from fastapi.responses import StreamingResponse
+from PIL import UnidentifiedImageError
+from PIL.Image import DecompressionBombError
 from pydantic import BaseModel
 from sqlmodel import select
+from sqlmodel.ext.asyncio.session import AsyncSession
 
-from app.api.deps import SessionDep
+from app.api.deps import AsyncSessionDep, StorageDep
 from app.core.config import CDNFolder, EntityType, ProducerImageType, settings
-from app.core.storage import delete_from_bunnycdn, save_to_bunnycdn, save_to_local
+from app.core.serialization import variant_records
+from app.core.storage import public_url
 from app.models import (
     ItemImage,
     ImageCreate,
@@ -21,12 +33,28 @@ from app.models import (
     ProducerImageCreate,
     ProducerImagePublic,
 )
+from app.services import blobs, image_renders, image_variants, storage_tasks
+from app.services.image_renders import RenderFormat
 
 router = APIRouter(prefix="/images", tags=["images"])
 
 logging = getLogger(__name__)
 logging.setLevel("INFO")
 
+
+def _image_public(image: ItemImage) -> ImagePublic:
+    # `path` is the URL built from the storage key
+    url = public_url(image.path, image.storage_key)
+    return ImagePublic.model_validate(
+        image, update={"path": url, "variants": variant_records(image.variants)}
+    )
+
+
+def _producer_image_public(image: ProducerImage) -> ProducerImagePublic:
+    url = public_url(image.path, image.storage_key)
+    return ProducerImagePublic.model_validate(image, update={"path": url})
+
+
 class UploadResponse(BaseModel):
     """Response model for file uploads."""
     path: str
@@ -35,7 +63,9 @@ class UploadResponse(BaseModel):
 
 @router.post("/{id}")
 async def upload_file(
-    session: SessionDep,
+    session: AsyncSessionDep,
+    storage: StorageDep,
+    background_tasks: BackgroundTasks,
     id: str,
     file: UploadFile = File(...),
     entity_type: EntityType = Query(EntityType.ITEM, description="Type of entity: item or producer"),
@@ -46,7 +76,6 @@ async def upload_file(
     folder = CDNFolder.IMAGES_PRODUCER if entity_type == EntityType.PRODUCER else CDNFolder.IMAGES_ITEM
     
     logging.info(f"Upload request: id={id}, file={file.filename}, entity_type={entity_type.value}, folder={folder.value}")
-    logging.info(f"Environment: {settings.ENVIRONMENT}, BunnyCDN enabled: {settings.bunnycdn_enabled}")
     
     # Parse id as UUID
     try:
@@ -58,14 +87,8 @@ async def upload_file(
     file_id = uuid.uuid4()
     
     try:
-        if settings.bunnycdn_enabled:
-            # Save to BunnyCDN if configured
-            logging.info(f"Uploading to BunnyCDN with zone: {settings.BUNNYCDN_STORAGE_ZONE}")
-            image_path = await save_to_bunnycdn(file, folder, file_id)
-        else:
-            # Save to local folder if BunnyCDN not configured
-            logging.info(f"Uploading to local storage: {settings.UPLOAD_DIR}")
-            image_path = await save_to_local(file, folder, file_id)
+        # Stored under its content hash, once for identical uploads
+        stored = await blobs.store_upload(session, storage, file, folder)
     except HTTPException:
         # Re-raise HTTP exceptions
         raise
@@ -84,34 +107,40 @@ async def upload_file(
             raise HTTPException(status_code=400, detail="image_type is required for producer images")
         
         producer_image_create = ProducerImageCreate(
-            path=image_path,
+            path=stored.url,
             name=name_without_ext,
             image_type=image_type.value,
             producer_id=entity_uuid
         )
-        db_producer_image = ProducerImage.model_validate(producer_image_create, update={"id": file_id})
+        db_producer_image = ProducerImage.model_validate(
+            producer_image_create, update={"id": file_id, "storage_key": stored.key}
+        )
         session.add(db_producer_image)
-        session.commit()
-        session.refresh(db_producer_image)
+        await session.commit()
+        await session.refresh(db_producer_image)
         
-        return ProducerImagePublic.model_validate(db_producer_image)
+        return _producer_image_public(db_producer_image)
     
     # For item images, create database entry
     image_create = ImageCreate(
-        path=image_path,
+        path=stored.url,
         name=name_without_ext,
         item_id=entity_uuid
     )
-    db_image = ItemImage.model_validate(image_create, update={"id": file_id})
+    db_image = ItemImage.model_validate(
+        image_create, update={"id": file_id, "storage_key": stored.key}
+    )
     session.add(db_image)
-    session.commit()
-    session.refresh(db_image)
+    await session.commit()
+    await session.refresh(db_image)
+    # Resized copies are made after the response is sent
+    background_tasks.add_task(image_variants.make_image_variants, db_image.id)
     
-    return ImagePublic.model_validate(db_image)
+    return _image_public(db_image)
 
 
 @router.delete("/{image_id}")
-async def delete_file(session: SessionDep, image_id: str) -> dict[str, str]:
+async def delete_file(session: AsyncSessionDep, image_id: str) -> dict[str, str]:
     """Delete an image by its ID (supports both item and producer images)."""
     try:
         img_uuid = uuid.UUID(image_id)
@@ -119,50 +148,30 @@ async def delete_file(session: SessionDep, image_id: str) -> dict[str, str]:
         raise HTTPException(status_code=400, detail="Invalid image_id format")
     
     # Try to get image from database (check both ItemImage and ProducerImage)
-    db_image = session.get(ItemImage, img_uuid)
+    db_image: ItemImage | ProducerImage | None = await session.get(ItemImage, img_uuid)
     if not db_image:
-        db_image = session.get(ProducerImage, img_uuid)
+        db_image = await session.get(ProducerImage, img_uuid)
     
     if not db_image:
         raise HTTPException(status_code=404, detail="Image not found")
     
-    if settings.bunnycdn_enabled:
-        # Delete the file from BunnyCDN
-        await delete_from_bunnycdn(db_image.path)
-    else:
-        # Delete the file from the local folder
-        # Path is in format: http://localhost:8000/uploads/images/filename.webp
-        # Extract the relative path from the URL
-        if db_image.path.startswith("http"):
-            # Parse URL to get path: /uploads/images/filename.webp
-            from urllib.parse import urlparse
-            parsed = urlparse(db_image.path)
-            relative_path = parsed.path.removeprefix("/uploads/")
-            file_path = settings.UPLOAD_DIR / relative_path
-        elif db_image.path.startswith("/uploads/"):
-            # Legacy format: /uploads/images/filename.webp
-            relative_path = db_image.path.removeprefix("/uploads/")
-            file_path = settings.UPLOAD_DIR / relative_path
-        else:
-            # Very old legacy format: absolute path
-            file_path = Path(db_image.path)
-        
-        try:
-            if file_path.exists():
-                os.remove(file_path)
-        except Exception as e:
-            logging.error(f"Failed to delete file {file_path}: {e}")
-            raise HTTPException(status_code=500, detail="Failed to delete file")
-    
-    # Delete database entry
-    session.delete(db_image)
-    session.commit()
+    # Queue the file for deletion in the same transaction as its row, if it
+    # is in our storage
+    if db_image.storage_key is not None:
+        key = db_image.storage_key
+        storage_tasks.enqueue_deletions(
+            session, [key, *image_variants.variant_keys(db_image)]
+        )
+        await blobs.release(session, [key])
+    await session.delete(db_image)
+    await session.commit()
+    storage_tasks.wake()
     
     return {"message": "Image deleted successfully"}
 
 
 @router.delete("/item/{item_id}")
-async def delete_item_images(session: SessionDep, item_id: str) -> dict[str, str]:
+async def delete_item_images(session: AsyncSessionDep, item_id: str) -> dict[str, str]:
     """Delete all images for an item."""
     try:
         item_uuid = uuid.UUID(item_id)
@@ -171,51 +180,25 @@ async def delete_item_images(session: SessionDep, item_id: str) -> dict[str, str
     
     # Get all images for this item
     statement = select(ItemImage).where(ItemImage.item_id == item_uuid)
-    images = session.exec(statement).all()
+    images = (await session.exec(statement)).all()
     
-    deleted_count = 0
+    # Images without a key are not in our storage
+    keys = [db_image.storage_key for db_image in images if db_image.storage_key is not None]
+    storage_tasks.enqueue_deletions(
+        session,
+        keys + [key for db_image in images for key in image_variants.variant_keys(db_image)],
+    )
+    await blobs.release(session, keys)
     for db_image in images:
-        if settings.bunnycdn_enabled:
-            # Delete from BunnyCDN
-            try:
-                await delete_from_bunnycdn(db_image.path)
-            except Exception as e:
-                logging.error(f"Failed to delete from BunnyCDN: {e}")
-        else:
-            # Delete from local folder
-            # Path is in format: http://localhost:8000/uploads/images/filename.webp
-            # Extract the relative path from the URL
-            if db_image.path.startswith("http"):
-                # Parse URL to get path: /uploads/images/filename.webp
-                from urllib.parse import urlparse
-                parsed = urlparse(db_image.path)
-                relative_path = parsed.path.removeprefix("/uploads/")
-                file_path = settings.UPLOAD_DIR / relative_path
-            elif db_image.path.startswith("/uploads/"):
-                # Legacy format: /uploads/images/filename.webp
-                relative_path = db_image.path.removeprefix("/uploads/")
-                file_path = settings.UPLOAD_DIR / relative_path
-            else:
-                # Very old legacy format: absolute path
-                file_path = Path(db_image.path)
-            
-            try:
-                if file_path.exists():
-                    os.remove(file_path)
-            except Exception as e:
-                logging.error(f"Failed to delete file {file_path}: {e}")
-        
-        # Delete database entry
-        session.delete(db_image)
-        deleted_count += 1
+        await session.delete(db_image)
+    await session.commit()
+    storage_tasks.wake()
     
-    session.commit()
-    
-    return {"message": f"{deleted_count} images deleted successfully"}
+    return {"message": f"{len(images)} images deleted successfully"}
 
 
 @router.get("/item/{item_id}")
-async def get_item_images(session: SessionDep, item_id: str) -> ImagesPublic:
+async def get_item_images(session: AsyncSessionDep, item_id: str) -> ImagesPublic:
     """Get all images for an item."""
     try:
         item_uuid = uuid.UUID(item_id)
@@ -223,71 +206,102 @@ async def get_item_images(session: SessionDep, item_id: str) -> ImagesPublic:
         raise HTTPException(status_code=400, detail="Invalid item_id format")
     
     statement = select(ItemImage).where(ItemImage.item_id == item_uuid)
-    images = session.exec(statement).all()
+    images = (await session.exec(statement)).all()
     
     return ImagesPublic(
-        data=[ImagePublic.model_validate(img) for img in images],
+        data=[_image_public(img) for img in images],
         count=len(images)
     )
 
 
 @router.get("/{image_id}")
-async def get_image(session: SessionDep, image_id: str) -> ImagePublic:
+async def get_image(session: AsyncSessionDep, image_id: str) -> ImagePublic:
     """Get image metadata by ID."""
     try:
         img_uuid = uuid.UUID(image_id)
     except ValueError:
         raise HTTPException(status_code=400, detail="Invalid image_id format")
     
-    db_image = session.get(ItemImage, img_uuid)
+    db_image = await session.get(ItemImage, img_uuid)
     if not db_image:
         raise HTTPException(status_code=404, detail="Image not found")
     
-    return ImagePublic.model_validate(db_image)
+    return _image_public(db_image)
 
 
-@router.get("/download/{image_id}")
-async def download_image(session: SessionDep, image_id: str) -> FileResponse:
-    """Download image file by ID."""
+async def _stored_file(session: AsyncSession, image_id: str) -> str:
+    """Storage key of an item image's file; 404 for files not in our storage."""
     try:
         img_uuid = uuid.UUID(image_id)
     except ValueError:
         raise HTTPException(status_code=400, detail="Invalid image_id format")
     
-    db_image = session.get(ItemImage, img_uuid)
+    db_image = await session.get(ItemImage, img_uuid)
     if not db_image:
         raise HTTPException(status_code=404, detail="Image not found")
+    if db_image.storage_key is None:
+        raise HTTPException(status_code=404, detail="File not found")
+    return db_image.storage_key
+
+
+@router.get("/download/{image_id}", response_model=None)
+async def download_image(
+    session: AsyncSessionDep, storage: StorageDep, image_id: str
+) -> Response:
+    """Download image file by ID."""
+    stored_file = await _stored_file(session, image_id)
     
-    if settings.bunnycdn_enabled:
-        # For BunnyCDN, redirect to the URL
-        from fastapi.responses import RedirectResponse
-        return RedirectResponse(url=db_image.path)
-    else:
-        # Stream the file from the local folder
-        # Path is in format: http://localhost:8000/uploads/images/filename.webp
-        # Extract the relative path from the URL
-        if db_image.path.startswith("http"):
-            # Parse URL to get path: /uploads/images/filename.webp
-            from urllib.parse import urlparse
-            parsed = urlparse(db_image.path)
-            relative_path = parsed.path.removeprefix("/uploads/")
-            file_path = settings.UPLOAD_DIR / relative_path
-        elif db_image.path.startswith("/uploads/"):
-            # Legacy format: /uploads/images/filename.webp
-            relative_path = db_image.path.removeprefix("/uploads/")
-            file_path = settings.UPLOAD_DIR / relative_path
-        else:
-            # Very old legacy format: absolute path
-            file_path = Path(db_image.path)
-        
-        if not file_path.exists():
-            raise HTTPException(status_code=404, detail="File not found")
-        return FileResponse(file_path)
+    # Redirects to the CDN, or streams the file from the backend's storage
+    try:
+        return await storage.download_response(stored_file)
+    except FileNotFoundError:
+        raise HTTPException(status_code=404, detail="File not found")
+
+
+@router.get("/{image_id}/render", response_model=None)
+async def render_image(
+    session: AsyncSessionDep,
+    storage: StorageDep,
+    image_id: str,
+    w: int | None = Query(
+        None, ge=1, le=max(settings.IMAGE_RENDER_SIZES), description="Largest width"
+    ),
+    h: int | None = Query(
+        None, ge=1, le=max(settings.IMAGE_RENDER_SIZES), description="Largest height"
+    ),
+    fmt: RenderFormat = Query("webp", description="Format: avif, webp, jpeg or png"),
+) -> StreamingResponse:
+    """
+    Image resized to fit `w` x `h` (never enlarged), rendered once and cached.
+
+    `w` and `h` are rounded up to the next of IMAGE_RENDER_SIZES.
+    """
+    stored_file = await _stored_file(session, image_id)
+    try:
+        cached = await image_renders.rendered_file(
+            storage, stored_file, image_renders.snap(w), image_renders.snap(h), fmt
+        )
+    except FileNotFoundError:
+        raise HTTPException(status_code=404, detail="File not found")
+    except UnidentifiedImageError:
+        raise HTTPException(status_code=422, detail="File is not an image")
+    except DecompressionBombError:
+        raise HTTPException(status_code=422, detail="Image is too large")
+    # Streamed from the file the cache opened, which an eviction cannot cut short
+    return StreamingResponse(
+        cached.chunks(),
+        media_type=f"image/{fmt}",
+        headers={
+            "Cache-Control": "public, max-age=86400",
+            "Content-Length": str(cached.stat.st_size),
+            "Last-Modified": formatdate(cached.stat.st_mtime, usegmt=True),
+        },
+    )
 
 
 @router.get("/producer/{producer_id}")
 async def get_producer_images(
-    session: SessionDep, 
+    session: AsyncSessionDep, 
     producer_id: str,
     image_type: ProducerImageType | None = Query(None, description="Filter by image type: logo or portfolio")
 ) -> list[ProducerImagePublic]:
@@ -303,8 +317,8 @@ async def get_producer_images(
     if image_type:
         statement = statement.where(ProducerImage.image_type == image_type.value)
     
-    images = session.exec(statement).all()
+    images = (await session.exec(statement)).all()
     
-    return [ProducerImagePublic.model_validate(img) for img in images]
+    return [_producer_image_public(img) for img in images]
 
 
@@ -0,0 +1,121 @@
+"""Bulk catalog imports (superuser only, see app.services.catalog_import)."""
+import shutil
+import tempfile
+import uuid
+from pathlib import Path
+from typing import Any
+
+from fastapi import (
+    APIRouter,
+    BackgroundTasks,
+    Depends,
+    File,
+    Form,
+    HTTPException,
+    UploadFile,
+)
+from sqlmodel import col, select
+
+from app.api.deps import CurrentUser, SessionDep, get_current_active_superuser
+from app.core.config import CatalogFormat
+from app.core.pagination import Keyset, paginate, split_page
+from app.models import (
+    CatalogImport,
+    CatalogImportError,
+    CatalogImportErrorsPublic,
+    CatalogImportPublic,
+    Producer,
+)
+from app.services.catalog_import import create_import, format_of, run_import
+
+router = APIRouter(
+    prefix="/imports",
+    tags=["imports"],
+    dependencies=[Depends(get_current_active_superuser)],
+)
+
+# Backed by the (import_id, row_number) primary key
+IMPORT_ERROR_KEYSET = Keyset("row", (CatalogImportError.row_number,))
+
+
+def _run_import(import_id: uuid.UUID, path: Path) -> None:
+    try:
+        run_import(import_id, path)
+    finally:
+        path.unlink(missing_ok=True)
+
+
+@router.post("/", response_model=CatalogImportPublic, status_code=202)
+def create_catalog_import(
+    session: SessionDep,
+    current_user: CurrentUser,
+    background_tasks: BackgroundTasks,
+    file: UploadFile = File(...),
+    producer_id: uuid.UUID | None = Form(None),
+    format: CatalogFormat | None = Form(None),
+) -> Any:
+    """
+    Import items and image references from a CSV or NDJSON file.
+
+    The import runs in the background; poll `GET /imports/{id}` for its
+    progress and `GET /imports/{id}/errors` for rejected rows. Items belong to
+    the producer's user when a producer is given, otherwise to the caller.
+    """
+    format = format or format_of(file.filename or "")
+    if format is None:
+        raise HTTPException(
+            status_code=400, detail="Unknown file format, expected .csv or .ndjson"
+        )
+    owner_id = current_user.id
+    if producer_id is not None:
+        producer = session.get(Producer, producer_id)
+        if producer is None:
+            raise HTTPException(status_code=404, detail="Producer not found")
+        owner_id = producer.user_id or owner_id
+
+    # The upload is closed once the response is sent, before the import runs
+    with tempfile.NamedTemporaryFile(delete=False, suffix=f".{format.value}") as copy:
+        shutil.copyfileobj(file.file, copy)
+    catalog_import = create_import(
+        session,
+        filename=file.filename or copy.name,
+        format=format,
+        owner_id=owner_id,
+        producer_id=producer_id,
+    )
+    background_tasks.add_task(_run_import, catalog_import.id, Path(copy.name))
+    return catalog_import
+
+
+@router.get("/{id}", response_model=CatalogImportPublic)
+def read_catalog_import(session: SessionDep, id: uuid.UUID) -> Any:
+    """
+    Get the status and progress of an import.
+    """
+    catalog_import = session.get(CatalogImport, id)
+    if not catalog_import:
+        raise HTTPException(status_code=404, detail="Import not found")
+    return catalog_import
+
+
+@router.get("/{id}/errors", response_model=CatalogImportErrorsPublic)
+def read_catalog_import_errors(
+    session: SessionDep,
+    id: uuid.UUID,
+    limit: int = 100,
+    cursor: str | None = None,
+) -> Any:
+    """
+    Get the rows an import rejected, in file order.
+    """
+    if not session.get(CatalogImport, id):
+        raise HTTPException(status_code=404, detail="Import not found")
+    statement = paginate(
+        select(CatalogImportError).where(col(CatalogImportError.import_id) == id),
+        IMPORT_ERROR_KEYSET,
+        cursor=cursor,
+        skip=0,
+        limit=limit,
+    )
+    errors, next_cursor = split_page(session.exec(statement).all(), IMPORT_ERROR_KEYSET, limit)
+    return CatalogImportErrorsPublic(data=errors, next_cursor=next_cursor)
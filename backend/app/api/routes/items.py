@@ -1,45 +1,490 @@
-import os
+import html
 import uuid
-from typing import Any
-import logging
+from functools import partial
+from dataclasses import dataclass
+from typing import Annotated, Any, NamedTuple
 
-from fastapi import APIRouter, HTTPException, Request
-from sqlmodel import func, select
-from sqlalchemy.orm import selectinload
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
+from fastapi.exceptions import RequestValidationError
+from fastapi.responses import StreamingResponse
+from sqlmodel import col, func, select
+from sqlalchemy import Double, cast, literal, literal_column, true, union
+from sqlalchemy.orm import aliased, selectinload
+from sqlalchemy.sql import Select, Subquery
+from sqlalchemy.sql.expression import ColumnClause
+from sqlmodel.ext.asyncio.session import AsyncSession
 
-from app.api.deps import CurrentUser, OptionalCurrentUser, SessionDep
-from app.core.config import settings
-from app.core.storage import delete_from_bunnycdn
-from app.models import Item, ItemCreate, ItemImage, ItemPublic, ItemsPublic, ItemUpdate, ItemWithPermissions, Message, Producer
+from app import crud
+from app.api.deps import (
+    AsyncCurrentUser,
+    AsyncOptionalCurrentUser,
+    AsyncSessionDep,
+    CurrentUser,
+    SessionDep,
+    get_current_active_superuser,
+)
+from app.core.cache import ITEM_TABLES, cached_response, warm
+from app.core.config import CatalogFormat, CountMode, ItemSort, settings
+from app.core.db import async_engine
+from app.core.counts import count_rows_async
+from app.core.pagination import Keyset, SelectT, paginate, split_page
+from app.core.serialization import (
+    item_record,
+    items_page_record,
+    json_response,
+    variant_records,
+)
+from app.core.storage import public_url_expression
+from app.services import blobs, storage_tasks
+from app.services.export import MEDIA_TYPES, export_lines
+from app.models import (
+    Item,
+    ItemCardsPublic,
+    ItemCreate,
+    ItemImage,
+    ItemLineagePublic,
+    ItemPublic,
+    ItemsBulkCreate,
+    ItemsBulkPublic,
+    ItemsBulkUpdate,
+    ItemsPublic,
+    ItemsSearchPublic,
+    ItemUpdate,
+    ItemWithPermissions,
+    Message,
+    Producer,
+    ProducerImage,
+    SEARCH_CONFIG,
+    item_search_vector,
+)
 
 router = APIRouter(prefix="/items", tags=["items"])
 
+# Stable gallery order, backed by ix_item_created_at_id / ix_item_owner_id_created_at_id
+ITEM_KEYSET = Keyset("created", (Item.created_at, Item.id))
+
+# Each ordering has its own keyset, so a cursor only continues the ordering it
+# was issued for. Filtered orderings are backed by the composite indexes on Item.
+ITEM_SORTS = {
+    ItemSort.CREATED: ITEM_KEYSET,
+    ItemSort.NEWEST: Keyset("newest", (Item.created_at, Item.id), descending=True),
+    ItemSort.TITLE: Keyset("title", (Item.title, Item.id)),
+}
+
+
+@dataclass
+class ItemFilters:
+    """Filters accepted by the item list endpoints."""
+
+    producer_id: uuid.UUID | None = None
+    owner_id: uuid.UUID | None = None
+    is_original: bool | None = None
+    variant_of: uuid.UUID | None = None
+    # Items with (true) or without (false) a 3D model
+    has_model: bool | None = None
+
+    def apply(self, statement: SelectT) -> SelectT:
+        if self.producer_id is not None:
+            statement = statement.where(col(Item.producer_id) == self.producer_id)
+        if self.owner_id is not None:
+            statement = statement.where(col(Item.owner_id) == self.owner_id)
+        if self.is_original is not None:
+            statement = statement.where(col(Item.is_original) == self.is_original)
+        if self.variant_of is not None:
+            statement = statement.where(col(Item.variant_of) == self.variant_of)
+        if self.has_model is not None:
+            model_column = col(Item.model)
+            statement = statement.where(
+                model_column.is_not(None) if self.has_model else model_column.is_(None)
+            )
+        return statement
+
+
+ItemFiltersDep = Annotated[ItemFilters, Depends()]
+
+
+async def _items_page(
+    session: AsyncSession,
+    *,
+    filters: ItemFilters,
+    sort: ItemSort,
+    skip: int,
+    limit: int,
+    cursor: str | None,
+    count_mode: CountMode | None,
+) -> dict[str, Any]:
+    """ItemsPublic payload for one page of the gallery."""
+    count_statement = filters.apply(select(func.count()).select_from(Item))
+    count = await count_rows_async(
+        session, count_statement, count_mode or settings.LIST_COUNT_MODE
+    )
+    statement = filters.apply(select(Item)).options(
+        selectinload(Item.item_images),
+        selectinload(Item.producer).selectinload(Producer.producer_images)
+    )
+    keyset = ITEM_SORTS[sort]
+    statement = paginate(statement, keyset, cursor=cursor, skip=skip, limit=limit)
+    items, next_cursor = split_page((await session.exec(statement)).all(), keyset, limit)
+    return items_page_record(items, count.value, count.exact, next_cursor)
+
 
 @router.get("/", response_model=ItemsPublic)
-def read_items(
-    request: Request, session: SessionDep, skip: int = 0, limit: int = 100
+async def read_items(
+    request: Request,
+    session: AsyncSessionDep,
+    filters: ItemFiltersDep,
+    sort: ItemSort = ItemSort.CREATED,
+    skip: int = 0,
+    limit: int = 100,
+    cursor: str | None = None,
+    count_mode: CountMode | None = None,
 ) -> Any:
     """
-    Retrieve items.
+    Retrieve items, optionally filtered and sorted.
+
+    Pass the `next_cursor` of a page as `cursor` to get the following page;
+    `skip` is ignored when a cursor is given. A cursor is only valid for the
+    `sort` it was returned with.
     """
-    count_statement = select(func.count()).select_from(Item)
-    count = session.exec(count_statement).one()
-    statement = select(Item).options(
-        selectinload(Item.item_images),
-        selectinload(Item.producer).selectinload(Producer.producer_images)
-    ).offset(skip).limit(limit)
-    items = session.exec(statement).all()
-    
-    # Get base URL from request
-    base_url = str(request.base_url).rstrip('/')
-    items_public = [ItemPublic.from_item(item, base_url) for item in items]
+    return await cached_response(
+        request,
+        session,
+        partial(
+            _items_page,
+            session,
+            filters=filters,
+            sort=sort,
+            skip=skip,
+            limit=limit,
+            cursor=cursor,
+            count_mode=count_mode,
+        ),
+        tables=ITEM_TABLES,
+    )
+
+
+async def warm_item_pages(pages: int) -> None:
+    """Cache the first gallery pages, as requested with default parameters."""
+    path = f"{settings.API_V1_STR}{router.prefix}/"
+    params: dict[str, str] = {}
+    async with AsyncSession(async_engine, expire_on_commit=False) as session:
+        for _ in range(pages):
+            page = await warm(
+                session,
+                path,
+                params,
+                partial(
+                    _items_page,
+                    session,
+                    filters=ItemFilters(),
+                    sort=ItemSort.CREATED,
+                    skip=0,
+                    limit=100,
+                    cursor=params.get("cursor"),
+                    count_mode=None,
+                ),
+                tables=ITEM_TABLES,
+            )
+            if page["next_cursor"] is None:
+                break
+            params = {"cursor": page["next_cursor"]}
+
+
+def item_cards_statement() -> Select[Any]:
+    """One row per item with only the columns a gallery card shows."""
+    # First image of the item, by upload order
+    cover = (
+        select(
+            public_url_expression(col(ItemImage.path), col(ItemImage.storage_key)).label(
+                "url"
+            ),
+            col(ItemImage.variants).label("variants"),
+        )
+        .where(ItemImage.item_id == Item.id)
+        .order_by(ItemImage.created_at, ItemImage.id)  # type: ignore[arg-type]
+        .limit(1)
+        .lateral("cover")
+    )
+    # Uploaded logo, used when the producer has no logo_url (as in ItemPublic.from_item)
+    logo = (
+        select(
+            public_url_expression(
+                col(ProducerImage.path), col(ProducerImage.storage_key)
+            ).label("url")
+        )
+        .where(
+            ProducerImage.producer_id == Item.producer_id,
+            ProducerImage.image_type == "logo",
+        )
+        .order_by(ProducerImage.created_at, ProducerImage.id)  # type: ignore[arg-type]
+        .limit(1)
+        .lateral("logo")
+    )
+    statement: Select[Any] = (
+        select(  # type: ignore[call-overload]
+            Item.id,
+            Item.title,
+            Item.created_at,
+            cover.c.url.label("cover_image_url"),
+            cover.c.variants.label("cover_image_variants"),
+            Producer.name.label("producer_name"),  # type: ignore[attr-defined]
+            func.coalesce(func.nullif(Producer.logo_url, ""), logo.c.url).label(
+                "producer_logo_url"
+            ),
+        )
+        .select_from(Item)
+        .outerjoin(cover, true())
+        .outerjoin(Producer, Producer.id == Item.producer_id)
+        .outerjoin(logo, true())
+    )
+    return statement
+
+
+async def _item_cards_page(
+    session: AsyncSession,
+    *,
+    filters: ItemFilters,
+    sort: ItemSort,
+    skip: int,
+    limit: int,
+    cursor: str | None,
+    count_mode: CountMode | None,
+) -> dict[str, Any]:
+    """ItemCardsPublic payload for one page of cards."""
+    count_statement = filters.apply(select(func.count()).select_from(Item))
+    count = await count_rows_async(
+        session, count_statement, count_mode or settings.LIST_COUNT_MODE
+    )
+    keyset = ITEM_SORTS[sort]
+    statement = paginate(
+        filters.apply(item_cards_statement()), keyset, cursor=cursor, skip=skip, limit=limit
+    )
+    rows, next_cursor = split_page((await session.exec(statement)).all(), keyset, limit)  # type: ignore[call-overload]
+    return {
+        "data": [
+            {
+                "id": row.id,
+                "title": row.title,
+                "cover_image_url": row.cover_image_url,
+                "cover_image_variants": variant_records(row.cover_image_variants),
+                "producer_name": row.producer_name,
+                "producer_logo_url": row.producer_logo_url,
+            }
+            for row in rows
+        ],
+        "count": count.value,
+        "count_exact": count.exact,
+        "next_cursor": next_cursor,
+    }
+
+
+@router.get("/cards", response_model=ItemCardsPublic)
+async def read_item_cards(
+    request: Request,
+    session: AsyncSessionDep,
+    filters: ItemFiltersDep,
+    sort: ItemSort = ItemSort.CREATED,
+    skip: int = 0,
+    limit: int = 100,
+    cursor: str | None = None,
+    count_mode: CountMode | None = None,
+) -> Any:
+    """
+    Retrieve gallery cards: id, title, cover image and producer name and logo.
+
+    Same filters, orderings and cursors as `GET /items/`, at a fraction of the cost.
+    """
+    return await cached_response(
+        request,
+        session,
+        partial(
+            _item_cards_page,
+            session,
+            filters=filters,
+            sort=sort,
+            skip=skip,
+            limit=limit,
+            cursor=cursor,
+            count_mode=count_mode,
+        ),
+        tables=ITEM_TABLES,
+    )
+
+
+# ts_headline does not escape the text around matches: it marks them with
+# private-use characters, and highlight_html escapes the text before turning
+# these into <mark> tags
+HIGHLIGHT_START = "\ue000"
+HIGHLIGHT_STOP = "\ue001"
+HIGHLIGHT_OPTIONS = f"StartSel={HIGHLIGHT_START}, StopSel={HIGHLIGHT_STOP}"
+
+
+def highlight_html(headline: str | None) -> str | None:
+    """HTML of a ts_headline excerpt, with its matches wrapped in <mark>."""
+    if headline is None:
+        return None
+    return (
+        html.escape(headline)
+        .replace(HIGHLIGHT_START, "<mark>")
+        .replace(HIGHLIGHT_STOP, "</mark>")
+    )
+
+
+class ItemSearch(NamedTuple):
+    matches: Subquery
+    page: Select[Any]
+    keyset: Keyset
+
+
+def item_search(q: str) -> ItemSearch:
+    """
+    Statements for a full-text search of items.
+
+    An item matches when its title or description (generated search_vector) or
+    its producer's name matches the query; each side is a GIN index lookup.
+    Matches are ranked over the item's document plus the producer name, which
+    weighs less than the title and description.
+    """
+    config: ColumnClause[Any] = literal_column(f"'{SEARCH_CONFIG}'::regconfig")
+    query = func.websearch_to_tsquery(config, q)
+    producer_vector = func.to_tsvector(config, Producer.name)
+    matches = union(
+        select(Item.id).where(item_search_vector.op("@@")(query)),
+        select(Item.id)
+        .join(Producer, Producer.id == Item.producer_id)  # type: ignore[arg-type]
+        .where(producer_vector.op("@@")(query)),
+    ).subquery("matches")
+    document = item_search_vector.op("||")(
+        func.setweight(
+            func.to_tsvector(config, func.coalesce(Producer.name, "")),
+            literal_column("'C'"),
+        )
+    )
+    ranked = (
+        select(
+            Item.id,
+            # Doubles survive the cursor round trip exactly; ts_rank returns real
+            cast(func.ts_rank(document, query), Double).label("rank"),
+        )
+        .join(matches, matches.c.id == Item.id)
+        .outerjoin(Producer, Producer.id == Item.producer_id)  # type: ignore[arg-type]
+        .subquery("ranked")
+    )
+    keyset = Keyset("rank", (ranked.c.rank, ranked.c.id), descending=True)
+    page = (
+        select(  # type: ignore[call-overload]
+            Item,
+            ranked.c.rank,
+            ranked.c.id,
+            func.ts_headline(
+                config, Item.title, query, f"HighlightAll=true, {HIGHLIGHT_OPTIONS}"
+            ).label("title_highlight"),
+            func.ts_headline(
+                config, Item.description, query, HIGHLIGHT_OPTIONS
+            ).label("description_highlight"),
+        )
+        .join(ranked, ranked.c.id == Item.id)
+        .options(
+            selectinload(Item.item_images),
+            selectinload(Item.producer).selectinload(Producer.producer_images)
+        )
+    )
+    return ItemSearch(matches, page, keyset)
+
+
+async def _search_page(
+    session: AsyncSession,
+    q: str,
+    *,
+    limit: int,
+    cursor: str | None,
+    count_mode: CountMode | None,
+) -> dict[str, Any]:
+    """ItemsSearchPublic payload for one page of search results."""
+    search = item_search(q)
+    count = await count_rows_async(
+        session,
+        select(func.count()).select_from(search.matches),
+        count_mode or settings.LIST_COUNT_MODE,
+    )
+    statement = paginate(search.page, search.keyset, cursor=cursor, skip=0, limit=limit)
+    rows, next_cursor = split_page((await session.exec(statement)).all(), search.keyset, limit)  # type: ignore[call-overload]
+    return {
+        "data": [
+            {
+                **item_record(row.Item),
+                "rank": row.rank,
+                "title_highlight": highlight_html(row.title_highlight),
+                "description_highlight": highlight_html(row.description_highlight),
+            }
+            for row in rows
+        ],
+        "count": count.value,
+        "count_exact": count.exact,
+        "next_cursor": next_cursor,
+    }
+
+
+@router.get("/search", response_model=ItemsSearchPublic)
+async def search_items(
+    request: Request,
+    session: AsyncSessionDep,
+    q: str = Query(min_length=1, max_length=200),
+    limit: int = 100,
+    cursor: str | None = None,
+    count_mode: CountMode | None = None,
+) -> Any:
+    """
+    Search items by title, description and producer name.
 
-    return ItemsPublic(data=items_public, count=count)
+    `q` accepts web search syntax: quoted phrases, `or` and `-excluded` words.
+    Results are ordered by relevance; pass `next_cursor` as `cursor` for the
+    next page.
+    """
+    return await cached_response(
+        request,
+        session,
+        partial(
+            _search_page,
+            session,
+            q,
+            limit=limit,
+            cursor=cursor,
+            count_mode=count_mode,
+        ),
+        tables=ITEM_TABLES,
+    )
+
+
+@router.get(
+    "/export",
+    dependencies=[Depends(get_current_active_superuser)],
+    response_class=StreamingResponse,
+)
+def export_items(format: CatalogFormat = CatalogFormat.NDJSON) -> StreamingResponse:
+    """
+    Export all items with producer and image URLs, as NDJSON or CSV.
+
+    Rows are streamed from a server-side cursor as they are read, in the
+    order of `GET /items/`.
+    """
+    return StreamingResponse(
+        export_lines(format),
+        media_type=MEDIA_TYPES[format],
+        headers={
+            "Content-Disposition": f'attachment; filename="items.{format.value}"'
+        },
+    )
 
 
 @router.get("/my-items/", response_model=ItemsPublic)
-def read_my_items(
-    request: Request, session: SessionDep, current_user: CurrentUser, skip: int = 0, limit: int = 100
+async def read_my_items(
+    session: AsyncSessionDep,
+    current_user: AsyncCurrentUser,
+    skip: int = 0,
+    limit: int = 100,
+    cursor: str | None = None,
+    count_mode: CountMode | None = None,
 ) -> Any:
     """
     Retrieve items for the current user.
@@ -49,7 +494,9 @@ def read_my_items(
         .select_from(Item)
         .where(Item.owner_id == current_user.id)
     )
-    count = session.exec(count_statement).one()
+    count = await count_rows_async(
+        session, count_statement, count_mode or settings.LIST_COUNT_MODE
+    )
     statement = (
         select(Item)
         .options(
@@ -57,55 +504,141 @@ def read_my_items(
             selectinload(Item.producer).selectinload(Producer.producer_images)
         )
         .where(Item.owner_id == current_user.id)
-        .offset(skip)
-        .limit(limit)
     )
-    items = session.exec(statement).all()
-    
-    # Get base URL from request
-    base_url = str(request.base_url).rstrip('/')
-    items_public = [ItemPublic.from_item(item, base_url) for item in items]
-
-    return ItemsPublic(data=items_public, count=count)
+    statement = paginate(statement, ITEM_KEYSET, cursor=cursor, skip=skip, limit=limit)
+    items, next_cursor = split_page((await session.exec(statement)).all(), ITEM_KEYSET, limit)
+    return json_response(
+        items_page_record(items, count.value, count.exact, next_cursor)
+    )
 
 
 @router.get("/{id}", response_model=ItemWithPermissions)
-def read_item(request: Request, session: SessionDep, current_user: OptionalCurrentUser, id: uuid.UUID) -> Any:
+async def read_item(request: Request, session: AsyncSessionDep, current_user: AsyncOptionalCurrentUser, id: uuid.UUID) -> Any:
     """
     Get item by ID with edit permissions.
     """
-    statement = select(Item).options(
-        selectinload(Item.item_images),
-        selectinload(Item.producer).selectinload(Producer.producer_images)
-    ).where(Item.id == id)
-    item = session.exec(statement).first()
-    if not item:
-        raise HTTPException(status_code=404, detail="Item not found")
-    
-    # Get base URL from request
-    base_url = str(request.base_url).rstrip('/')
-    
-    # Create ItemPublic instance from the item with image URLs
-    item_public = ItemPublic.from_item(item, base_url)
-    
-    # Check if user can edit (superuser OR item owner)
-    can_edit = False
-    if current_user:
-        can_edit = (
-            "superuser" in current_user.permissions or 
-            item.owner_id == current_user.id
+
+    async def build() -> dict[str, Any]:
+        statement = select(Item).options(
+            selectinload(Item.item_images),
+            selectinload(Item.producer).selectinload(Producer.producer_images)
+        ).where(Item.id == id)
+        item = (await session.exec(statement)).first()
+        if not item:
+            raise HTTPException(status_code=404, detail="Item not found")
+
+        # Check if user can edit (superuser OR item owner)
+        can_edit = False
+        if current_user:
+            can_edit = (
+                "superuser" in current_user.permissions or
+                item.owner_id == current_user.id
+            )
+
+        # Return item with edit permissions (ItemWithPermissions)
+        return {"item": item_record(item), "can_edit": can_edit}
+
+    # Only anonymous views are shared; can_edit depends on the signed-in user
+    return await cached_response(
+        request, session, build, tables=ITEM_TABLES, shared=current_user is None
+    )
+
+
+def item_lineage(id: uuid.UUID, max_depth: int) -> Select[Any]:
+    """
+    Variant family of an item in one recursive query.
+
+    The first CTE walks `variant_of` up from the item to its original, the
+    second walks back down from that original to every variant, each step an
+    index lookup on ix_item_variant_of_created_at_id. Both stop after
+    `max_depth` levels; the descent goes one level further so callers can tell
+    the family was cut short. Rows come ordered by depth, then creation.
+    """
+    parent = aliased(Item)
+    ancestors = (
+        select(col(Item.id), col(Item.variant_of), literal(0).label("hops"))
+        .where(col(Item.id) == id)
+        .cte("ancestors", recursive=True)
+    )
+    ancestors = ancestors.union_all(
+        select(col(parent.id), col(parent.variant_of), ancestors.c.hops + 1)
+        .join(ancestors, col(parent.id) == ancestors.c.variant_of)
+        .where(ancestors.c.hops < max_depth)
+    )
+    root = (
+        select(ancestors.c.id).order_by(ancestors.c.hops.desc()).limit(1).cte("root")
+    )
+
+    child = aliased(Item)
+    tree = (
+        select(  # type: ignore[call-overload]
+            Item.id,
+            Item.title,
+            Item.is_original,
+            Item.variant_of,
+            Item.created_at,
+            literal(0).label("depth"),
         )
-    
-    # Return item with edit permissions
-    return ItemWithPermissions(
-        item=item_public,
-        can_edit=can_edit
+        .join(root, col(Item.id) == root.c.id)
+        .cte("tree", recursive=True)
     )
+    tree = tree.union_all(
+        select(  # type: ignore[call-overload]
+            child.id,
+            child.title,
+            child.is_original,
+            child.variant_of,
+            child.created_at,
+            tree.c.depth + 1,
+        )
+        .join(tree, col(child.variant_of) == tree.c.id)
+        .where(tree.c.depth <= max_depth)
+    )
+    statement: Select[Any] = select(*tree.c).order_by(
+        tree.c.depth, tree.c.created_at, tree.c.id
+    )
+    return statement
+
+
+@router.get("/{id}/lineage", response_model=ItemLineagePublic)
+async def read_item_lineage(
+    request: Request, session: AsyncSessionDep, id: uuid.UUID
+) -> Any:
+    """
+    Get the variant family of an item: its original and all of the original's
+    variants, each with its depth below the original.
+    """
+    max_depth = settings.ITEM_LINEAGE_MAX_DEPTH
+
+    async def build() -> dict[str, Any]:
+        rows = (await session.exec(item_lineage(id, max_depth))).all()  # type: ignore[call-overload]
+        if not rows:
+            raise HTTPException(status_code=404, detail="Item not found")
+        nodes: dict[uuid.UUID, dict[str, Any]] = {}
+        for row in rows:
+            # A variant_of cycle would list items again at a larger depth
+            if row.depth <= max_depth and row.id not in nodes:
+                nodes[row.id] = {
+                    "id": row.id,
+                    "title": row.title,
+                    "is_original": row.is_original,
+                    "variant_of": row.variant_of,
+                    "depth": row.depth,
+                }
+        root = rows[0]
+        return {
+            "root_id": root.id,
+            "data": list(nodes.values()),
+            # The original is itself a variant, or variants lie below the limit
+            "truncated": root.variant_of is not None or rows[-1].depth > max_depth,
+        }
+
+    return await cached_response(request, session, build, tables=ITEM_TABLES)
 
 
 @router.post("/", response_model=ItemPublic)
 def create_item(
-    *, request: Request, session: SessionDep, current_user: CurrentUser, item_in: ItemCreate
+    *, session: SessionDep, current_user: CurrentUser, item_in: ItemCreate
 ) -> Any:
     """
     Create new item.
@@ -130,17 +663,126 @@ def create_item(
         selectinload(Item.item_images),
         selectinload(Item.producer).selectinload(Producer.producer_images)
     ).where(Item.id == item.id)
-    item = session.exec(statement).first()
+    item = session.exec(statement).one()
     
-    # Get base URL and return with image URLs
-    base_url = str(request.base_url).rstrip('/')
-    return ItemPublic.from_item(item, base_url)
+    return ItemPublic.from_item(item)
+
+
+def _row_error(index: int, field: str, msg: str, value: Any) -> dict[str, Any]:
+    """Error of one bulk row, in the shape of FastAPI's validation errors."""
+    return {
+        "type": "value_error",
+        "loc": ("body", "items", index, field),
+        "msg": msg,
+        "input": value,
+    }
+
+
+async def _existing_item_ids(
+    session: AsyncSession, ids: set[uuid.UUID]
+) -> set[uuid.UUID]:
+    if not ids:
+        return set()
+    statement = select(Item.id).where(col(Item.id).in_(ids))
+    return set((await session.exec(statement)).all())
+
+
+@router.post("/bulk", response_model=ItemsBulkPublic)
+async def create_items_bulk(
+    session: AsyncSessionDep, current_user: AsyncCurrentUser, items_in: ItemsBulkCreate
+) -> Any:
+    """
+    Create up to 1000 items in one transaction.
+
+    Either every item is created or none is: invalid rows are reported
+    together, as a 422 with each error located at its row's index.
+    """
+    rows = items_in.items
+    errors = [
+        _row_error(i, "variant_of", "variant_of must be provided when is_original is false", None)
+        for i, row in enumerate(rows)
+        if row.is_original is False and row.variant_of is None
+    ]
+    existing = await _existing_item_ids(
+        session, {row.variant_of for row in rows if row.variant_of is not None}
+    )
+    errors += [
+        _row_error(i, "variant_of", "Item not found", str(row.variant_of))
+        for i, row in enumerate(rows)
+        if row.variant_of is not None and row.variant_of not in existing
+    ]
+    if errors:
+        raise RequestValidationError(errors)
+
+    # One producer lookup for the whole batch
+    producer_id = (
+        await session.exec(select(Producer.id).where(Producer.user_id == current_user.id))
+    ).first()
+    extra: dict[str, Any] = {"owner_id": current_user.id}
+    if producer_id:
+        extra["producer_id"] = producer_id
+    ids = await crud.create_items_async(session=session, items_in=rows, extra=extra)
+    return ItemsBulkPublic(ids=ids, count=len(ids))
+
+
+@router.patch("/bulk", response_model=ItemsBulkPublic)
+async def update_items_bulk(
+    session: AsyncSessionDep, current_user: AsyncCurrentUser, items_in: ItemsBulkUpdate
+) -> Any:
+    """
+    Update up to 1000 items in one transaction.
+
+    Each row holds an item `id` and the fields to change. As with
+    `POST /items/bulk`, either every row is applied or none is.
+    """
+    rows = items_in.items
+    statement: Select[Any] = select(
+        Item.id, Item.owner_id, Item.is_original, Item.variant_of
+    ).where(col(Item.id).in_({row.id for row in rows}))
+    current = {item.id: item for item in (await session.exec(statement)).all()}  # type: ignore[call-overload]
+    existing = await _existing_item_ids(
+        session, {row.variant_of for row in rows if row.variant_of is not None}
+    )
+    is_superuser = "superuser" in current_user.permissions
+
+    errors: list[dict[str, Any]] = []
+    changes: list[dict[str, Any]] = []
+    seen: set[uuid.UUID] = set()
+    for i, row in enumerate(rows):
+        item = current.get(row.id)
+        fields = row.model_dump(exclude_unset=True, exclude={"id"})
+        if item is None:
+            errors.append(_row_error(i, "id", "Item not found", str(row.id)))
+        elif not is_superuser and item.owner_id != current_user.id:
+            errors.append(_row_error(i, "id", "Not enough permissions", str(row.id)))
+        elif row.id in seen:
+            errors.append(_row_error(i, "id", "Item is updated by an earlier row", str(row.id)))
+        elif "title" in fields and fields["title"] is None:
+            errors.append(_row_error(i, "title", "title cannot be null", None))
+        elif fields.get("is_original", item.is_original) is False and (
+            fields.get("variant_of", item.variant_of) is None
+        ):
+            errors.append(
+                _row_error(i, "variant_of", "variant_of must be provided when is_original is false", None)
+            )
+        elif row.variant_of is not None and row.variant_of not in existing:
+            errors.append(_row_error(i, "variant_of", "Item not found", str(row.variant_of)))
+        elif fields:
+            changes.append({"id": row.id, **fields})
+        seen.add(row.id)
+
+    if errors:
+        raise RequestValidationError(errors)
+
+    if changes:
+        await crud.update_items_async(session=session, changes=changes)
+    ids = [row.id for row in rows]
+    return ItemsBulkPublic(ids=ids, count=len(ids))
 
 
 @router.put("/{id}", response_model=ItemPublic)
 def update_item(
     *,
-    request: Request,
     session: SessionDep,
     current_user: CurrentUser,
     id: uuid.UUID,
@@ -172,19 +814,17 @@ def update_item(
     session.commit()
     session.refresh(item)
     
-    # Get base URL and return with image URLs
-    base_url = str(request.base_url).rstrip('/')
-    return ItemPublic.from_item(item, base_url)
+    return ItemPublic.from_item(item)
 
 
 @router.delete("/{id}")
 async def delete_item(
-    session: SessionDep, current_user: CurrentUser, id: uuid.UUID
+    session: AsyncSessionDep, current_user: AsyncCurrentUser, id: uuid.UUID
 ) -> Message:
     """
     Delete an item and its associated images.
     """
-    item = session.get(Item, id)
+    item = await session.get(Item, id)
     if not item:
         raise HTTPException(status_code=404, detail="Item not found")
     if "superuser" not in current_user.permissions and (
@@ -192,33 +832,20 @@ async def delete_item(
     ):
         raise HTTPException(status_code=400, detail="Not enough permissions")
     
-    # Delete physical image files before deleting item
-    statement = select(ItemImage).where(ItemImage.item_id == id)
-    item_images = session.exec(statement).all()
-    
-    for image in item_images:
-        if settings.bunnycdn_enabled:
-            try:
-                await delete_from_bunnycdn(image.path)
-            except Exception as e:
-                logging.error(f"Failed to delete from BunnyCDN: {e}")
-        else:
-            # Delete from local folder
-            try:
-                base_url = str(settings.BACKEND_HOST)
-                relative_path = image.path.replace(base_url, "")
-                # Remove leading slash and 'uploads/' prefix since UPLOAD_DIR already points to uploads folder
-                relative_path = relative_path.lstrip("/").replace("uploads/", "", 1)
-                file_path = settings.UPLOAD_DIR / relative_path
-                if file_path.exists():
-                    os.remove(file_path)
-                    logging.info(f"Deleted file: {file_path}")
-                else:
-                    logging.warning(f"File not found: {file_path}")
-            except Exception as e:
-                logging.error(f"Failed to delete file {image.path}: {e}")
+    # Queue the image files for deletion in the item's transaction; images
+    # without a key are not in our storage
+    statement = select(ItemImage.storage_key, ItemImage.variants).where(
+        ItemImage.item_id == id, col(ItemImage.storage_key).is_not(None)
+    )
+    rows = (await session.exec(statement)).all()
+    keys = [key for key, _ in rows if key is not None]
+    storage_tasks.enqueue_deletions(
+        session, keys + [variant["key"] for _, variants in rows for variant in variants or []]
+    )
+    await blobs.release(session, keys)
     
     # Delete item (cascade will handle database records)
-    session.delete(item)
-    session.commit()
+    await session.delete(item)
+    await session.commit()
+    storage_tasks.wake()
     return Message(message="Item deleted successfully")
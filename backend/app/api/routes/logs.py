@@ -8,6 +8,7 @@ from fastapi import APIRouter, HTTPException
 from pydantic import BaseModel
 
 from app.api.deps import CurrentUser
+from app.core.db import get_pool_stats
 from app.models import UserPermission
 
 router = APIRouter(prefix="/logs", tags=["logs"])
@@ -140,3 +141,15 @@ async def get_log_stats(current_user: CurrentUser) -> dict[str, Any]:
         "oldest_entry": logs[0]["timestamp"] if logs else None,
         "newest_entry": logs[-1]["timestamp"] if logs else None,
     }
+
+
+@router.get("/pool-stats")
+async def get_db_pool_stats(current_user: CurrentUser) -> dict[str, Any]:
+    """Get database connection pool statistics for this worker (superuser only)."""
+    if UserPermission.SUPERUSER not in current_user.permissions:
+        raise HTTPException(
+            status_code=403,
+            detail="Only superusers can access pool stats"
+        )
+
+    return get_pool_stats()
@@ -1,27 +1,30 @@
-import logging
-import os
 import uuid
 from typing import Any
 
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, HTTPException, Request
 from sqlmodel import func, select
 
-from app.api.deps import CurrentUser, SessionDep
-from app.core.config import settings
-from app.core.storage import delete_from_bunnycdn
+from app.api.deps import AsyncCurrentUser, AsyncSessionDep, CurrentUser, SessionDep
+from app.core.cache import PRODUCER_TABLES, cached_response
+from app.core.config import CountMode, settings
+from app.core.counts import count_rows_async
+from app.core.pagination import Keyset, paginate, split_page
 from app.models import (
     Message,
     Producer,
     ProducerCreate,
-    ProducerImage,
     ProducerPublic,
     ProducersPublic,
     ProducerUpdate,
     UserPermission,
 )
+from app.services import deletion, storage_tasks
 
 router = APIRouter(prefix="/producers", tags=["producers"])
 
+# Backed by ix_producer_created_at_id
+PRODUCER_KEYSET = Keyset("created", (Producer.created_at, Producer.id))
+
 
 @router.get("/me", response_model=ProducerPublic | None)
 def read_my_producer(session: SessionDep, current_user: CurrentUser) -> Any:
@@ -39,17 +42,32 @@ def read_my_producer(session: SessionDep, current_user: CurrentUser) -> Any:
 
 
 @router.get("/", response_model=ProducersPublic)
-def read_producers(
-    session: SessionDep, skip: int = 0, limit: int = 100
+async def read_producers(
+    session: AsyncSessionDep,
+    skip: int = 0,
+    limit: int = 100,
+    cursor: str | None = None,
+    count_mode: CountMode | None = None,
 ) -> Any:
     """
     Retrieve producers.
     """
     count_statement = select(func.count()).select_from(Producer)
-    count = session.exec(count_statement).one()
-    statement = select(Producer).offset(skip).limit(limit)
-    producers = session.exec(statement).all()
-    return ProducersPublic(data=producers, count=count)
+    count = await count_rows_async(
+        session, count_statement, count_mode or settings.LIST_COUNT_MODE
+    )
+    statement = paginate(
+        select(Producer), PRODUCER_KEYSET, cursor=cursor, skip=skip, limit=limit
+    )
+    producers, next_cursor = split_page(
+        (await session.exec(statement)).all(), PRODUCER_KEYSET, limit
+    )
+    return ProducersPublic(
+        data=producers,
+        count=count.value,
+        count_exact=count.exact,
+        next_cursor=next_cursor,
+    )
 
 
 @router.get("/by-user/{user_id}", response_model=ProducerPublic | None)
@@ -71,14 +89,20 @@ def read_producer_by_user(
 
 
 @router.get("/{id}", response_model=ProducerPublic)
-def read_producer(session: SessionDep, id: uuid.UUID) -> Any:
+async def read_producer(
+    request: Request, session: AsyncSessionDep, id: uuid.UUID
+) -> Any:
     """
     Get producer by ID.
     """
-    producer = session.get(Producer, id)
-    if not producer:
-        raise HTTPException(status_code=404, detail="Producer not found")
-    return producer
+
+    async def build() -> ProducerPublic:
+        producer = await session.get(Producer, id)
+        if not producer:
+            raise HTTPException(status_code=404, detail="Producer not found")
+        return ProducerPublic.model_validate(producer)
+
+    return await cached_response(request, session, build, tables=PRODUCER_TABLES)
 
 
 @router.post("/for-user/{user_id}", response_model=ProducerPublic)
@@ -180,7 +204,7 @@ def update_producer(
 
 @router.delete("/{id}")
 async def delete_producer(
-    session: SessionDep, current_user: CurrentUser, id: uuid.UUID
+    session: AsyncSessionDep, current_user: AsyncCurrentUser, id: uuid.UUID
 ) -> Message:
     """
     Delete a producer.
@@ -191,7 +215,7 @@ async def delete_producer(
             status_code=403, detail="Not enough permissions"
         )
     
-    producer = session.get(Producer, id)
+    producer = await session.get(Producer, id)
     if not producer:
         raise HTTPException(status_code=404, detail="Producer not found")
     
@@ -201,46 +225,8 @@ async def delete_producer(
             status_code=403, detail="Not authorized to delete this producer profile"
         )
     
-    # Delete physical image files before deleting producer
-    statement = select(ProducerImage).where(ProducerImage.producer_id == id)
-    producer_images = session.exec(statement).all()
-    
-    logging.info(f"Found {len(producer_images)} images to delete for producer {id}")
-    
-    for image in producer_images:
-        logging.info(f"Processing image: path={image.path}, type={image.image_type}")
-        
-        if settings.bunnycdn_enabled:
-            try:
-                await delete_from_bunnycdn(image.path)
-                logging.info(f"Deleted from BunnyCDN: {image.path}")
-            except Exception as e:
-                logging.error(f"Failed to delete from BunnyCDN: {e}")
-        else:
-            # Delete from local folder
-            try:
-                base_url = str(settings.BACKEND_HOST)
-                logging.info(f"Base URL: {base_url}")
-                logging.info(f"Image path: {image.path}")
-                
-                relative_path = image.path.replace(base_url, "")
-                logging.info(f"Relative path: {relative_path}")
-                
-                # Remove leading slash and 'uploads/' prefix since UPLOAD_DIR already points to uploads folder
-                relative_path = relative_path.lstrip("/").replace("uploads/", "", 1)
-                file_path = settings.UPLOAD_DIR / relative_path
-                logging.info(f"Full file path: {file_path}")
-                logging.info(f"File exists: {file_path.exists()}")
-                
-                if file_path.exists():
-                    os.remove(file_path)
-                    logging.info(f"✓ Successfully deleted file: {file_path}")
-                else:
-                    logging.warning(f"✗ File not found at: {file_path}")
-            except Exception as e:
-                logging.error(f"Failed to delete file {image.path}: {e}")
-    
-    # Delete producer (cascade will handle database records)
-    session.delete(producer)
-    session.commit()
+    # Delete the producer's rows and queue its image files for deletion
+    await deletion.delete_producer(session, id)
+    await session.commit()
+    storage_tasks.wake()
     return Message(message="Producer deleted successfully")
\ No newline at end of file
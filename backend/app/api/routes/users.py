@@ -1,32 +1,28 @@
-import logging
-import os
 import uuid
 from datetime import datetime
 from typing import Any, Optional
 
 from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException
-from sqlmodel import col, delete, func, select, Session, create_engine
+from sqlmodel import func, select, Session, create_engine
 
 from app import crud
 from app.api.deps import (
+    AsyncCurrentUser,
+    AsyncSessionDep,
     CurrentUser,
     SessionDep,
     get_current_active_superuser,
 )
-from app.core.config import settings
+from app.core.config import CountMode, settings
+from app.core.counts import count_rows
+from app.core.pagination import Keyset, paginate, split_page
 from app.core.security import get_password_hash, verify_password
-from app.core.storage import delete_from_bunnycdn
 from app.core.db import engine
 from app.models import (
     EmailConfirmation,
     EmailLog,
     EmailLogPublic,
-    Item,
-    ItemImage,
     Message,
-    Producer,
-    ProducerImage,
-    Review,
     UpdatePassword,
     User,
     UserCreate,
@@ -36,10 +32,14 @@ from app.models import (
     UserUpdate,
     UserUpdateMe,
 )
+from app.services import deletion, storage_tasks
 from app.utils import generate_new_account_email, send_email, send_email_with_logging, generate_email_confirmation_token, generate_email_confirmation_email, verify_email_confirmation_token
 
 router = APIRouter(prefix="/users", tags=["users"])
 
+# Primary key order, so the cursor is backed by the primary key index
+USER_KEYSET = Keyset("id", (User.id,))
+
 
 def _send_email_background(
     user_id: uuid.UUID,
@@ -68,18 +68,26 @@ def _send_email_background(
     dependencies=[Depends(get_current_active_superuser)],
     response_model=UsersPublic,
 )
-def read_users(session: SessionDep, skip: int = 0, limit: int = 100) -> Any:
+def read_users(
+    session: SessionDep,
+    skip: int = 0,
+    limit: int = 100,
+    cursor: str | None = None,
+    count_mode: CountMode | None = None,
+) -> Any:
     """
     Retrieve users.
     """
 
     count_statement = select(func.count()).select_from(User)
-    count = session.exec(count_statement).one()
+    count = count_rows(session, count_statement, count_mode or settings.LIST_COUNT_MODE)
 
-    statement = select(User).offset(skip).limit(limit)
-    users = session.exec(statement).all()
+    statement = paginate(select(User), USER_KEYSET, cursor=cursor, skip=skip, limit=limit)
+    users, next_cursor = split_page(session.exec(statement).all(), USER_KEYSET, limit)
 
-    return UsersPublic(data=users, count=count)
+    return UsersPublic(
+        data=users, count=count.value, count_exact=count.exact, next_cursor=next_cursor
+    )
 
 
 @router.post(
@@ -174,7 +182,9 @@ def read_user_me(current_user: CurrentUser) -> Any:
 
 
 @router.delete("/me", response_model=Message)
-def delete_user_me(session: SessionDep, current_user: CurrentUser) -> Any:
+async def delete_user_me(
+    session: AsyncSessionDep, current_user: AsyncCurrentUser
+) -> Any:
     """
     Delete own user.
     """
@@ -182,10 +192,9 @@ def delete_user_me(session: SessionDep, current_user: CurrentUser) -> Any:
         raise HTTPException(
             status_code=403, detail="Super users are not allowed to delete themselves"
         )
-    statement = delete(Item).where(col(Item.owner_id) == current_user.id)
-    session.exec(statement)  # type: ignore
-    session.delete(current_user)
-    session.commit()
+    await deletion.delete_user(session, current_user.id)
+    await session.commit()
+    storage_tasks.wake()
     return Message(message="User deleted successfully")
 
 
@@ -350,114 +359,19 @@ def update_user(
 
 @router.delete("/{user_id}", dependencies=[Depends(get_current_active_superuser)])
 async def delete_user(
-    session: SessionDep, current_user: CurrentUser, user_id: uuid.UUID
+    session: AsyncSessionDep, current_user: AsyncCurrentUser, user_id: uuid.UUID
 ) -> Message:
     """
     Delete a user.
     """
-    user = session.get(User, user_id)
+    user = await session.get(User, user_id)
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
-    if user == current_user:
+    if user.id == current_user.id:
         raise HTTPException(
             status_code=403, detail="Super users are not allowed to delete themselves"
         )
-    # Get user's producer profile if exists
-    producer = session.exec(
-        select(Producer).where(Producer.user_id == user_id)
-    ).first()
-    
-    # If user has a producer profile, clean up related data
-    if producer:
-        from sqlmodel import update
-        # Nullify producer_id in items that reference this producer
-        update_items_statement = (
-            update(Item)
-            .where(col(Item.producer_id) == producer.id)
-            .values(producer_id=None)
-        )
-        session.exec(update_items_statement)  # type: ignore
-        
-        # Delete all reviews for this producer
-        delete_reviews_statement = delete(Review).where(col(Review.producer_id) == producer.id)
-        session.exec(delete_reviews_statement)  # type: ignore
-    
-    # Delete user's items and their images
-    # First get all items owned by this user
-    user_items_statement = select(Item).where(Item.owner_id == user_id)
-    user_items = session.exec(user_items_statement).all()
-    
-    logging.info(f"Found {len(user_items)} items to delete for user {user_id}")
-    
-    # Delete images for each item
-    for item in user_items:
-        item_images_statement = select(ItemImage).where(ItemImage.item_id == item.id)
-        item_images = session.exec(item_images_statement).all()
-        
-        logging.info(f"Found {len(item_images)} images for item {item.id}")
-        
-        for image in item_images:
-            if settings.bunnycdn_enabled:
-                try:
-                    await delete_from_bunnycdn(image.path)
-                    logging.info(f"Deleted from BunnyCDN: {image.path}")
-                except Exception as e:
-                    logging.error(f"Failed to delete from BunnyCDN: {e}")
-            else:
-                # Delete from local folder
-                try:
-                    base_url = str(settings.BACKEND_HOST)
-                    relative_path = image.path.replace(base_url, "")
-                    # Remove leading slash and 'uploads/' prefix since UPLOAD_DIR already points to uploads folder
-                    relative_path = relative_path.lstrip("/").replace("uploads/", "", 1)
-                    file_path = settings.UPLOAD_DIR / relative_path
-                    
-                    if file_path.exists():
-                        os.remove(file_path)
-                        logging.info(f"✓ Deleted item image file: {file_path}")
-                    else:
-                        logging.warning(f"✗ Item image file not found: {file_path}")
-                except Exception as e:
-                    logging.error(f"Failed to delete item image file {image.path}: {e}")
-    
-    # Now delete all items (cascade will handle database records)
-    statement = delete(Item).where(col(Item.owner_id) == user_id)
-    session.exec(statement)  # type: ignore
-    
-    # Delete user's producer profile if exists
-    if producer:
-        # Delete physical producer image files before deleting producer
-        producer_images_statement = select(ProducerImage).where(ProducerImage.producer_id == producer.id)
-        producer_images = session.exec(producer_images_statement).all()
-        
-        logging.info(f"Found {len(producer_images)} producer images to delete for user {user_id}")
-        
-        for image in producer_images:
-            if settings.bunnycdn_enabled:
-                try:
-                    await delete_from_bunnycdn(image.path)
-                    logging.info(f"Deleted from BunnyCDN: {image.path}")
-                except Exception as e:
-                    logging.error(f"Failed to delete from BunnyCDN: {e}")
-            else:
-                # Delete from local folder
-                try:
-                    base_url = str(settings.BACKEND_HOST)
-                    relative_path = image.path.replace(base_url, "")
-                    # Remove leading slash and 'uploads/' prefix since UPLOAD_DIR already points to uploads folder
-                    relative_path = relative_path.lstrip("/").replace("uploads/", "", 1)
-                    file_path = settings.UPLOAD_DIR / relative_path
-                    
-                    if file_path.exists():
-                        os.remove(file_path)
-                        logging.info(f"✓ Deleted producer image file: {file_path}")
-                    else:
-                        logging.warning(f"✗ Producer image file not found: {file_path}")
-                except Exception as e:
-                    logging.error(f"Failed to delete producer image file {image.path}: {e}")
-        
-        session.delete(producer)
-    
-    session.delete(user)
-    session.commit()
+    await deletion.delete_user(session, user_id)
+    await session.commit()
+    storage_tasks.wake()
     return Message(message="User deleted successfully")
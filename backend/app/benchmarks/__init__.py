@@ -0,0 +1 @@
+"""Benchmarks, run against the configured database"""
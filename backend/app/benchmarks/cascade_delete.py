@@ -0,0 +1,174 @@
+"""
+Compare deleting a user with everything it owns, row by row and set-based.
+
+Seeds a user with items, item images and a producer profile with images and
+reviews, then deletes it the way `DELETE /users/{id}` used to (one image query
+per item and ORM deletes of the producer and user) and, on a fresh copy,
+through app.services.deletion. Reports the time and the number of statements
+of each. Nothing is left behind but the storage tasks, which are removed too.
+
+Usage: python -m app.benchmarks.cascade_delete [--items 1000] [--images 4] [--reviews 200]
+"""
+import argparse
+import asyncio
+import logging
+import time
+import uuid
+from collections.abc import Iterator
+from contextlib import contextmanager
+from typing import Any
+
+from sqlalchemy import event, text
+from sqlmodel import Session, col, delete, select, update
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from app.core.db import async_engine, engine
+from app.core.security import get_password_hash
+from app.models import (
+    Item,
+    ItemImage,
+    Producer,
+    ProducerImage,
+    Review,
+    StorageTask,
+    User,
+)
+from app.services import deletion, storage_tasks
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+def seed(items: int, images: int, reviews: int) -> uuid.UUID:
+    user = User(
+        email=f"bench-{uuid.uuid4().hex}@example.com",
+        hashed_password=get_password_hash(uuid.uuid4().hex),
+    )
+    user_id = user.id
+    producer = Producer(name="Benchmark studio", location="Benchmark", user_id=user_id)
+    with Session(engine) as session:
+        session.add(user)
+        session.flush()
+        session.add(producer)
+        session.flush()
+        for i in range(items):
+            item = Item(title=f"Item {i}", owner_id=user_id, producer_id=producer.id)
+            session.add(item)
+            session.add_all(
+                ItemImage(
+                    path=f"/uploads/images/bench/{item.id}-{j}.webp",
+                    storage_key=f"images/bench/{item.id}-{j}.webp",
+                    name=str(j),
+                    item_id=item.id,
+                )
+                for j in range(images)
+            )
+        session.add_all(
+            ProducerImage(
+                path=f"/uploads/images/bench/{producer.id}-{j}.webp",
+                storage_key=f"images/bench/{producer.id}-{j}.webp",
+                name=str(j),
+                image_type="portfolio",
+                producer_id=producer.id,
+            )
+            for j in range(images)
+        )
+        session.add_all(
+            Review(name=f"Visitor {i}", review_text="Lovely", producer_id=producer.id)
+            for i in range(reviews)
+        )
+        session.commit()
+        # Fresh statistics, as autovacuum keeps them on a live database
+        session.execute(text("ANALYZE item, image, producer, producerimage, review"))
+    return user_id
+
+
+def delete_row_by_row(user_id: uuid.UUID) -> None:
+    with Session(engine) as session:
+        user = session.get(User, user_id)
+        producer = session.exec(select(Producer).where(Producer.user_id == user_id)).first()
+        assert user is not None and producer is not None
+        session.exec(  # type: ignore[call-overload]
+            update(Item).where(col(Item.producer_id) == producer.id).values(producer_id=None)
+        )
+        session.exec(delete(Review).where(col(Review.producer_id) == producer.id))  # type: ignore[call-overload]
+        paths = []
+        for item in session.exec(select(Item).where(Item.owner_id == user_id)).all():
+            images = session.exec(select(ItemImage).where(ItemImage.item_id == item.id)).all()
+            paths += [image.storage_key for image in images if image.storage_key]
+        session.exec(delete(Item).where(col(Item.owner_id) == user_id))  # type: ignore[call-overload]
+        paths += [
+            image.storage_key
+            for image in session.exec(
+                select(ProducerImage).where(ProducerImage.producer_id == producer.id)
+            ).all()
+            if image.storage_key
+        ]
+        storage_tasks.enqueue_deletions(session, paths)
+        session.delete(producer)
+        session.delete(user)
+        session.commit()
+
+
+async def delete_set_based(user_id: uuid.UUID) -> None:
+    async with AsyncSession(async_engine) as session:
+        await deletion.delete_user(session, user_id)
+        await session.commit()
+    await async_engine.dispose()
+
+
+@contextmanager
+def count_statements() -> Iterator[list[int]]:
+    counter = [0]
+
+    def count(*_args: Any) -> None:
+        counter[0] += 1
+
+    event.listen(engine, "before_cursor_execute", count)
+    event.listen(async_engine.sync_engine, "before_cursor_execute", count)
+    try:
+        yield counter
+    finally:
+        event.remove(engine, "before_cursor_execute", count)
+        event.remove(async_engine.sync_engine, "before_cursor_execute", count)
+
+
+def cleanup_tasks() -> None:
+    with Session(engine) as session:
+        session.exec(  # type: ignore[call-overload]
+            delete(StorageTask).where(col(StorageTask.path).startswith("/uploads/images/bench/"))
+        )
+        session.commit()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--items", type=int, default=1000)
+    parser.add_argument("--images", type=int, default=4)
+    parser.add_argument("--reviews", type=int, default=200)
+    args = parser.parse_args()
+
+    results = {}
+    try:
+        for name, run in (
+            ("row by row", delete_row_by_row),
+            ("set-based", lambda user_id: asyncio.run(delete_set_based(user_id))),
+        ):
+            user_id = seed(args.items, args.images, args.reviews)
+            with count_statements() as counter:
+                started = time.perf_counter()
+                run(user_id)
+                results[name] = (time.perf_counter() - started, counter[0])
+    finally:
+        cleanup_tasks()
+
+    for name, (seconds, statements) in results.items():
+        logger.info(f"{name:<12} {seconds * 1000:8.0f} ms  {statements:5} statements")
+    logger.info(
+        f"Speedup: {results['row by row'][0] / results['set-based'][0]:.1f}x"
+        f" for {args.items} items with {args.images} images each"
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,132 @@
+"""
+Compare a catalog import against creating the same items one by one.
+
+Writes a CSV of generated items with image URLs, imports it through the staging
+table, and creates a sample of the rows the way `POST /items/` does (insert,
+commit, refresh and a reload with images and producer per item). Reports rows
+per second for both. The seeded rows are deleted afterwards.
+
+Usage: python -m app.benchmarks.catalog_import [--rows 20000] [--images 2] [--sample 500]
+"""
+import argparse
+import csv
+import logging
+import tempfile
+import time
+import uuid
+from pathlib import Path
+
+from sqlalchemy.orm import selectinload
+from sqlmodel import Session, col, delete, select
+
+from app.core.config import CatalogFormat
+from app.core.db import engine
+from app.core.security import get_password_hash
+from app.models import CatalogImport, Item, ItemCreate, ItemImage, Producer, User
+from app.services.catalog_import import create_import, run_import
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+def write_catalog(path: Path, rows: int, images: int) -> None:
+    with path.open("w", newline="") as file:
+        writer = csv.writer(file)
+        writer.writerow(["ref", "title", "description", "is_original", "variant_of", "image_urls"])
+        for i in range(rows):
+            # Every fourth row is a variant of the row before it
+            variant = i % 4 == 3
+            writer.writerow(
+                [
+                    f"r{i}",
+                    f"Imported item {i}",
+                    "Benchmark item " * 5,
+                    "false" if variant else "true",
+                    f"r{i - 1}" if variant else "",
+                    "|".join(f"/uploads/images/bench/{i}-{j}.webp" for j in range(images)),
+                ]
+            )
+
+
+def create_one_by_one(owner_id: uuid.UUID, rows: int, images: int) -> None:
+    with Session(engine) as session:
+        for i in range(rows):
+            item = Item.model_validate(
+                ItemCreate(title=f"Posted item {i}", description="Benchmark item " * 5),
+                update={"owner_id": owner_id},
+            )
+            session.add(item)
+            session.commit()
+            session.refresh(item)
+            for j in range(images):
+                session.add(
+                    ItemImage(path=f"/uploads/images/bench/p{i}-{j}.webp", name=f"p{i}-{j}", item_id=item.id)
+                )
+            session.commit()
+            session.exec(
+                select(Item)
+                .options(
+                    selectinload(Item.item_images),  # type: ignore[arg-type]
+                    selectinload(Item.producer).selectinload(Producer.producer_images),  # type: ignore[arg-type]
+                )
+                .where(Item.id == item.id)
+            ).first()
+
+
+def cleanup(owner_id: uuid.UUID) -> None:
+    item_ids = select(Item.id).where(Item.owner_id == owner_id)
+    with Session(engine) as session:
+        for statement in (
+            delete(ItemImage).where(col(ItemImage.item_id).in_(item_ids)),
+            delete(Item).where(col(Item.owner_id) == owner_id),
+            delete(CatalogImport).where(col(CatalogImport.owner_id) == owner_id),
+            delete(User).where(col(User.id) == owner_id),
+        ):
+            session.exec(statement)  # type: ignore[call-overload]
+        session.commit()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--rows", type=int, default=20_000)
+    parser.add_argument("--images", type=int, default=2)
+    parser.add_argument("--sample", type=int, default=500)
+    args = parser.parse_args()
+
+    owner = User(
+        email=f"bench-{uuid.uuid4().hex}@example.com",
+        hashed_password=get_password_hash(uuid.uuid4().hex),
+    )
+    with Session(engine) as session:
+        session.add(owner)
+        session.commit()
+        session.refresh(owner)
+    try:
+        with tempfile.TemporaryDirectory() as directory:
+            path = Path(directory) / "catalog.csv"
+            write_catalog(path, args.rows, args.images)
+            with Session(engine) as session:
+                catalog_import = create_import(
+                    session,
+                    filename=path.name,
+                    format=CatalogFormat.CSV,
+                    owner_id=owner.id,
+                    producer_id=None,
+                )
+            started = time.perf_counter()
+            run_import(catalog_import.id, path)
+            imported = args.rows / (time.perf_counter() - started)
+
+        started = time.perf_counter()
+        create_one_by_one(owner.id, args.sample, args.images)
+        one_by_one = args.sample / (time.perf_counter() - started)
+    finally:
+        cleanup(owner.id)
+
+    logger.info(f"import       {imported:10.0f} rows/s ({args.rows} rows)")
+    logger.info(f"one by one   {one_by_one:10.0f} rows/s ({args.sample} rows)")
+    logger.info(f"Speedup: {imported / one_by_one:.0f}x with {args.images} images per item")
+
+
+if __name__ == "__main__":
+    main()
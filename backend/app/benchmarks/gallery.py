@@ -0,0 +1,193 @@
+"""
+Compare the gallery endpoints: GET /items/ against GET /items/cards.
+
+Seeds a throwaway user with items, images and producers, builds the first pages
+through both code paths and reports the time and peak Python memory per page.
+The seeded rows are deleted afterwards.
+
+Usage: python -m app.benchmarks.gallery [--items 2000] [--images 4] [--pages 20]
+"""
+import argparse
+import asyncio
+import logging
+import statistics
+import time
+import tracemalloc
+import uuid
+from collections.abc import Awaitable, Callable
+from dataclasses import dataclass, field
+from typing import Any
+
+from sqlmodel import Session, col, delete, select
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from app.api.routes.items import ItemFilters, _item_cards_page, _items_page
+from app.core.config import CountMode, ItemSort
+from app.core.db import async_engine, engine
+from app.core.security import get_password_hash
+from app.core.serialization import dump_json
+from app.models import Item, ItemImage, Producer, ProducerImage, User
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+PAGE_SIZE = 100
+
+
+@dataclass
+class Seeded:
+    user_id: uuid.UUID
+    producer_ids: list[uuid.UUID] = field(default_factory=list)
+
+
+def seed(items: int, images: int, producers: int) -> Seeded:
+    user = User(
+        email=f"bench-{uuid.uuid4().hex}@example.com",
+        hashed_password=get_password_hash(uuid.uuid4().hex),
+    )
+    seeded = Seeded(user.id)
+    with Session(engine) as session:
+        session.add(user)
+        for i in range(producers):
+            producer = Producer(name=f"Producer {i}", location="Benchmark")
+            session.add(producer)
+            session.add(
+                ProducerImage(
+                    path=f"/uploads/producers/{producer.id}/logo.webp",
+                    name="logo",
+                    image_type="logo",
+                    producer_id=producer.id,
+                )
+            )
+            seeded.producer_ids.append(producer.id)
+        session.flush()
+        for i in range(items):
+            item = Item(
+                title=f"Item {i}",
+                description="Benchmark item " * 10,
+                owner_id=user.id,
+                producer_id=seeded.producer_ids[i % producers] if producers else None,
+            )
+            session.add(item)
+            for j in range(images):
+                session.add(
+                    ItemImage(
+                        path=f"/uploads/images/{item.id}/{j}.webp",
+                        name=str(j),
+                        item_id=item.id,
+                    )
+                )
+        session.commit()
+    return seeded
+
+
+def cleanup(seeded: Seeded) -> None:
+    item_ids = select(Item.id).where(Item.owner_id == seeded.user_id)
+    with Session(engine) as session:
+        for statement in (
+            delete(ItemImage).where(col(ItemImage.item_id).in_(item_ids)),
+            delete(Item).where(col(Item.owner_id) == seeded.user_id),
+            delete(ProducerImage).where(
+                col(ProducerImage.producer_id).in_(seeded.producer_ids)
+            ),
+            delete(Producer).where(col(Producer.id).in_(seeded.producer_ids)),
+            delete(User).where(col(User.id) == seeded.user_id),
+        ):
+            session.exec(statement)  # type: ignore[call-overload]
+        session.commit()
+
+
+@dataclass
+class Measurement:
+    name: str
+    seconds: list[float] = field(default_factory=list)
+    peak_bytes: list[int] = field(default_factory=list)
+
+    def report(self) -> str:
+        return (
+            f"{self.name:<12} median {statistics.median(self.seconds) * 1000:8.2f} ms/page"
+            f"  peak {max(self.peak_bytes) / 1024:8.0f} KiB"
+        )
+
+
+async def measure(
+    name: str,
+    build_page: Callable[[AsyncSession, str | None], Awaitable[dict[str, Any]]],
+    pages: int,
+) -> Measurement:
+    measurement = Measurement(name)
+    async with AsyncSession(async_engine, expire_on_commit=False) as session:
+        cursor: str | None = None
+        for _ in range(pages):
+            tracemalloc.start()
+            started = time.perf_counter()
+            page = await build_page(session, cursor)
+            # Include serialization, as the endpoint would send it
+            dump_json(page)
+            measurement.seconds.append(time.perf_counter() - started)
+            measurement.peak_bytes.append(tracemalloc.get_traced_memory()[1])
+            tracemalloc.stop()
+            # Drop loaded objects so each page starts from an empty identity map
+            session.expunge_all()
+            cursor = page["next_cursor"]
+            if cursor is None:
+                break
+    return measurement
+
+
+async def run(pages: int) -> list[Measurement]:
+    def items(session: AsyncSession, cursor: str | None) -> Awaitable[dict[str, Any]]:
+        return _items_page(
+            session,
+            filters=ItemFilters(),
+            sort=ItemSort.CREATED,
+            skip=0,
+            limit=PAGE_SIZE,
+            cursor=cursor,
+            count_mode=CountMode.EXACT,
+        )
+
+    def cards(session: AsyncSession, cursor: str | None) -> Awaitable[dict[str, Any]]:
+        return _item_cards_page(
+            session,
+            filters=ItemFilters(),
+            sort=ItemSort.CREATED,
+            skip=0,
+            limit=PAGE_SIZE,
+            cursor=cursor,
+            count_mode=CountMode.EXACT,
+        )
+
+    # Warm up connections and statement caches before measuring
+    await measure("warm-up", items, 1)
+    await measure("warm-up", cards, 1)
+    results = [
+        await measure("/items/", items, pages),
+        await measure("/items/cards", cards, pages),
+    ]
+    await async_engine.dispose()
+    return results
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--items", type=int, default=2000)
+    parser.add_argument("--images", type=int, default=4)
+    parser.add_argument("--producers", type=int, default=50)
+    parser.add_argument("--pages", type=int, default=20)
+    args = parser.parse_args()
+
+    logger.info(
+        f"Seeding {args.items} items with {args.images} images each"
+        f" and {args.producers} producers"
+    )
+    seeded = seed(args.items, args.images, args.producers)
+    try:
+        for measurement in asyncio.run(run(args.pages)):
+            logger.info(measurement.report())
+    finally:
+        cleanup(seeded)
+
+
+if __name__ == "__main__":
+    main()
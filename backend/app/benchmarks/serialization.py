@@ -0,0 +1,111 @@
+"""
+Microbenchmark: serializing a 100-item page of ItemsPublic.
+
+Compares the response_model path (ItemPublic.from_item per item, then FastAPI's
+response validation and JSON rendering) with the fast path used by the item
+read endpoints (plain records encoded by app.core.serialization). No database
+is needed: the items are built in memory.
+
+Usage: python -m app.benchmarks.serialization [--items 100] [--images 4] [--runs 200]
+"""
+import argparse
+import asyncio
+import logging
+import time
+import uuid
+from functools import partial
+
+from fastapi.responses import JSONResponse
+from fastapi.routing import serialize_response
+from fastapi.utils import create_model_field
+
+from app.core.serialization import dump_json, items_page_record
+from app.models import Item, ItemImage, ItemPublic, ItemsPublic, Producer, ProducerImage
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+def make_items(count: int, images: int) -> list[Item]:
+    producer = Producer(id=uuid.uuid4(), name="Producer", location="Somewhere")
+    producer.producer_images = [
+        ProducerImage(
+            id=uuid.uuid4(),
+            path="https://cdn.example.com/producers/logo.webp",
+            name="logo",
+            image_type="logo",
+            producer_id=producer.id,
+        )
+    ]
+    items = []
+    for i in range(count):
+        item = Item(
+            id=uuid.uuid4(),
+            title=f"Item {i}",
+            description="Benchmark item " * 10,
+            owner_id=uuid.uuid4(),
+            producer_id=producer.id,
+        )
+        item.producer = producer
+        item.item_images = [
+            ItemImage(
+                id=uuid.uuid4(),
+                path=f"https://cdn.example.com/images/{item.id}/{j}.webp",
+                name=str(j),
+                item_id=item.id,
+            )
+            for j in range(images)
+        ]
+        items.append(item)
+    return items
+
+
+async def response_model_path(items: list[Item], field: object) -> bytes:
+    page = ItemsPublic(
+        data=[ItemPublic.from_item(item) for item in items], count=len(items)
+    )
+    content = await serialize_response(field=field, response_content=page)  # type: ignore[arg-type]
+    return bytes(JSONResponse(content).body)
+
+
+async def fast_path(items: list[Item]) -> bytes:
+    return dump_json(items_page_record(items, len(items), True, None))
+
+
+async def run(items: list[Item], runs: int) -> dict[str, float]:
+    field = create_model_field("Response", ItemsPublic, mode="serialization")
+    # Both paths must produce the same document
+    assert (await response_model_path(items, field)).replace(b" ", b"") == (
+        await fast_path(items)
+    ).replace(b" ", b"")
+    results = {}
+    for name, path in (
+        ("response_model", partial(response_model_path, items, field)),
+        ("fast path", partial(fast_path, items)),
+    ):
+        started = time.perf_counter()
+        for _ in range(runs):
+            await path()
+        results[name] = (time.perf_counter() - started) / runs
+    return results
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--items", type=int, default=100)
+    parser.add_argument("--images", type=int, default=4)
+    parser.add_argument("--runs", type=int, default=200)
+    args = parser.parse_args()
+
+    items = make_items(args.items, args.images)
+    results = asyncio.run(run(items, args.runs))
+    for name, seconds in results.items():
+        logger.info(f"{name:<15} {seconds * 1000:8.3f} ms/page")
+    logger.info(
+        f"Speedup: {results['response_model'] / results['fast path']:.1f}x"
+        f" for {args.items} items with {args.images} images each"
+    )
+
+
+if __name__ == "__main__":
+    main()
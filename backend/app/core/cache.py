@@ -0,0 +1,122 @@
+"""
+Response cache for public read endpoints.
+
+Anonymous reads of the gallery (`GET /items/`, `GET /items/{id}`) and of
+producer profiles return the same payload to every visitor, so the serialized
+body is kept in a per-process cache keyed by path and query string. Every
+response carries an ETag computed from its body; a client sending it back in
+`If-None-Match` gets a 304 without the body.
+
+Each cached endpoint declares the tables its payload is built from. An entry is
+served only while the database versions of those tables are the ones it was
+built with: any commit writing to one of them, from any worker or the CLI,
+makes it stale at once (see app.core.table_cache). Entries also expire after
+RESPONSE_CACHE_TTL_SECONDS, and a full cache drops its least recently used
+entry, so one-off search and cursor pages do not push out the warmed gallery
+pages.
+"""
+import hashlib
+from collections.abc import Awaitable, Callable, Iterable
+from typing import Any, NamedTuple
+
+from fastapi import Request, Response
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from app.core.config import settings
+from app.core.serialization import dump_json
+from app.core.table_cache import TableCache
+
+# Tables each cached payload is built from
+ITEM_TABLES = ("item", "image", "producer", "producerimage")
+PRODUCER_TABLES = ("producer",)
+
+
+class CachedResponse(NamedTuple):
+    body: bytes
+    etag: str
+
+
+response_cache: TableCache[CachedResponse] = TableCache(
+    settings.RESPONSE_CACHE_TTL_SECONDS, 1_000
+)
+
+
+def cache_key(path: str, params: Iterable[tuple[str, str]]) -> tuple[str, str]:
+    return path, "&".join(f"{k}={v}" for k, v in sorted(params))
+
+
+def make_etag(body: bytes) -> str:
+    return '"' + hashlib.blake2b(body, digest_size=16).hexdigest() + '"'
+
+
+def _etag_matches(if_none_match: str | None, etag: str) -> bool:
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    # Weak comparison, as required for If-None-Match
+    candidates = (tag.strip().removeprefix("W/") for tag in if_none_match.split(","))
+    return etag in candidates
+
+
+def _respond(request: Request, entry: CachedResponse, *, shared: bool) -> Response:
+    headers = {
+        "ETag": entry.etag,
+        # Clients may keep the body but must revalidate it with If-None-Match
+        "Cache-Control": "no-cache" if shared else "private, no-cache",
+    }
+    if _etag_matches(request.headers.get("if-none-match"), entry.etag):
+        return Response(status_code=304, headers=headers)
+    return Response(
+        content=entry.body, media_type="application/json", headers=headers
+    )
+
+
+async def cached_response(
+    request: Request,
+    session: AsyncSession,
+    build: Callable[[], Awaitable[Any]],
+    *,
+    tables: tuple[str, ...],
+    shared: bool = True,
+) -> Response:
+    """
+    Serve `build()` through the response cache.
+
+    `build` returns a pydantic model or a plain payload for `dump_json`, read
+    through `session`, which the versions of `tables` are read through first.
+
+    `shared` must be False when the payload depends on the caller (e.g. edit
+    permissions of a signed-in user); the response then still gets an ETag but
+    is neither read from nor stored in the cache.
+    """
+    use_cache = shared and settings.RESPONSE_CACHE_ENABLED
+    key = cache_key(request.url.path, request.query_params.multi_items())
+    entry = None
+    if use_cache:
+        versions = await response_cache.versions_async(session, tables)
+        entry = response_cache.lookup(key, versions)
+    if entry is None:
+        body = dump_json(await build())
+        entry = CachedResponse(body, make_etag(body))
+        if use_cache:
+            response_cache.store(key, entry, versions)
+    return _respond(request, entry, shared=shared)
+
+
+async def warm(
+    session: AsyncSession,
+    path: str,
+    params: dict[str, str],
+    build: Callable[[], Awaitable[Any]],
+    *,
+    tables: tuple[str, ...],
+) -> Any:
+    """Build a response ahead of the first request for it and cache it."""
+    versions = await response_cache.versions_async(session, tables)
+    payload = await build()
+    body = dump_json(payload)
+    response_cache.store(
+        cache_key(path, params.items()), CachedResponse(body, make_etag(body)), versions
+    )
+    return payload
@@ -1,4 +1,5 @@
 import secrets
+import tempfile
 import warnings
 from enum import Enum
 from pathlib import Path
@@ -42,6 +43,26 @@ class ProducerImageType(str, Enum):
     PORTFOLIO = "portfolio"
 
 
+class CountMode(str, Enum):
+    """How list endpoints compute their total count."""
+    EXACT = "exact"
+    CACHED = "cached"
+    ESTIMATED = "estimated"
+
+
+class ItemSort(str, Enum):
+    """Orderings accepted by the item list endpoints."""
+    CREATED = "created"  # oldest first
+    NEWEST = "newest"
+    TITLE = "title"
+
+
+class CatalogFormat(str, Enum):
+    """File formats of catalog exports and imports."""
+    NDJSON = "ndjson"
+    CSV = "csv"
+
+
 class Settings(BaseSettings):
     model_config = SettingsConfigDict(
         # Use top level .env file (one level above ./backend/)
@@ -84,6 +105,51 @@ class Settings(BaseSettings):
             f"@{self.POSTGRES_SERVER}:{self.POSTGRES_PORT}/{self.POSTGRES_DB}"
         )
 
+    # Optional streaming read replica. Safe GET requests on the async session
+    # are sent here, except for clients that wrote within the last
+    # DB_READ_YOUR_WRITES_SECONDS, which keep reading from the primary.
+    POSTGRES_REPLICA_SERVER: str | None = None
+    POSTGRES_REPLICA_PORT: int | None = None
+    DB_READ_YOUR_WRITES_SECONDS: float = 5.0
+
+    @computed_field  # type: ignore[prop-decorator]
+    @property
+    def SQLALCHEMY_REPLICA_DATABASE_URI(self) -> str | None:
+        if not self.POSTGRES_REPLICA_SERVER:
+            return None
+        port = self.POSTGRES_REPLICA_PORT or self.POSTGRES_PORT
+        return (
+            f"postgresql+psycopg://{self.POSTGRES_USER}:{self.POSTGRES_PASSWORD}"
+            f"@{self.POSTGRES_REPLICA_SERVER}:{port}/{self.POSTGRES_DB}"
+        )
+
+    # Connection pool settings (per process, so size for the uvicorn worker count)
+    DB_POOL_SIZE: int = 5
+    DB_MAX_OVERFLOW: int = 10
+    DB_POOL_TIMEOUT: float = 30.0
+    # Recycle connections older than this many seconds (-1 disables recycling)
+    DB_POOL_RECYCLE: int = 1800
+    DB_POOL_PRE_PING: bool = True
+    # psycopg prepares a statement after it has been executed this many times.
+    # Set to -1 to disable server-side prepared statements (e.g. behind PgBouncer).
+    DB_PREPARE_THRESHOLD: int = 5
+
+    # Total counts returned by list endpoints (see app.core.counts)
+    LIST_COUNT_MODE: CountMode = CountMode.EXACT
+    COUNT_CACHE_TTL_SECONDS: float = 60.0
+    # Planner estimates below this are replaced by an exact count, which is cheap
+    # at that size and avoids the planner's guesses for small or unanalyzed tables
+    COUNT_ESTIMATE_THRESHOLD: int = 10_000
+
+    # Cache of anonymous item and producer reads (see app.core.cache)
+    RESPONSE_CACHE_ENABLED: bool = True
+    RESPONSE_CACHE_TTL_SECONDS: float = 30.0
+    # Number of gallery pages (GET /items/ with default parameters) built at startup
+    RESPONSE_CACHE_WARM_PAGES: int = 2
+
+    # Variant levels walked up and down from an item by GET /items/{id}/lineage
+    ITEM_LINEAGE_MAX_DEPTH: int = 10
+
     SMTP_TLS: bool = True
     SMTP_SSL: bool = False
     SMTP_PORT: int = 587
@@ -115,11 +181,59 @@ class Settings(BaseSettings):
     def stripe_enabled(self) -> bool:
         return bool(self.STRIPE_SECRET_KEY and self.STRIPE_PUBLISHABLE_KEY)
 
+    # Storage of uploaded files (see app.core.storage.get_storage). By default
+    # BunnyCDN when bunnycdn_enabled, otherwise the local upload folder
+    STORAGE_BACKEND: Literal["local", "bunnycdn", "memory"] | None = None
+
     # BunnyCDN storage settings
     BUNNYCDN_STORAGE_ZONE: str | None = None
     BUNNYCDN_API_KEY: str | None = None
+    # Public URL of the pull zone serving the storage zone, by default
+    # https://{BUNNYCDN_STORAGE_ZONE}.b-cdn.net
+    BUNNYCDN_PULL_ZONE_URL: str | None = None
 
-    @computed_field
+    # Largest accepted uploads of images and of 3D models
+    UPLOAD_MAX_IMAGE_BYTES: int = 25 * 1024 * 1024
+    UPLOAD_MAX_MODEL_BYTES: int = 512 * 1024 * 1024
+
+    # Resized copies of item images (see app.services.image_variants), made
+    # after upload in a pool of IMAGE_VARIANT_PROCESSES processes. Widths above
+    # the original's are skipped
+    IMAGE_VARIANT_WIDTHS: list[int] = [320, 640, 1280]
+    IMAGE_VARIANT_FORMATS: list[Literal["avif", "webp"]] = ["avif", "webp"]
+    IMAGE_VARIANT_QUALITY: int = 75
+    IMAGE_VARIANT_PROCESSES: int = 2
+
+    # Images resized on request by GET /images/{id}/render (see
+    # app.services.image_renders), kept on local disk up to this many bytes.
+    # Requested widths and heights are rounded up to one of the sizes
+    IMAGE_RENDER_CACHE_DIR: Path = Path(tempfile.gettempdir()) / "image-renders"
+    IMAGE_RENDER_CACHE_MAX_BYTES: int = 1024 * 1024 * 1024
+    IMAGE_RENDER_SIZES: list[int] = [
+        32, 64, 128, 256, 384, 512, 768, 1024, 1536, 2048, 3072, 4096
+    ]
+
+    # BunnyCDN Storage API (see app.core.storage.BunnyCDNStorage); use the
+    # endpoint of the storage zone's primary region
+    BUNNYCDN_STORAGE_ENDPOINT: str = "https://storage.bunnycdn.com"
+    BUNNYCDN_MAX_CONNECTIONS: int = 20
+    BUNNYCDN_CONNECT_TIMEOUT_SECONDS: float = 5.0
+    # Read, write and pool timeout of Storage API requests
+    BUNNYCDN_TIMEOUT_SECONDS: float = 60.0
+    # Retries of failed requests (connection errors, timeouts and 5xx)
+    BUNNYCDN_MAX_RETRIES: int = 3
+    BUNNYCDN_RETRY_BACKOFF_SECONDS: float = 0.5
+    # BunnyCDN deletions in flight at once (see app.core.storage.BunnyCDNStorage)
+    STORAGE_DELETE_CONCURRENCY: int = 10
+    # Outbox of file deletions (see app.services.storage_tasks)
+    STORAGE_WORKER_ENABLED: bool = True
+    STORAGE_TASK_POLL_SECONDS: float = 5.0
+    STORAGE_TASK_MAX_ATTEMPTS: int = 8
+    # Delay before the first retry of a failed deletion, doubled after each retry
+    STORAGE_TASK_RETRY_SECONDS: float = 30.0
+
+    @computed_field  # type: ignore[prop-decorator]
+    @property
     def bunnycdn_enabled(self) -> bool:
         """
         Enable CDN only in staging/production environments.
@@ -130,7 +244,8 @@ class Settings(BaseSettings):
         # Use CDN in staging/production if credentials are configured
         return bool(self.BUNNYCDN_STORAGE_ZONE and self.BUNNYCDN_API_KEY)
     
-    @computed_field
+    @computed_field  # type: ignore[prop-decorator]
+    @property
     def UPLOAD_DIR(self) -> Path:
         """Get absolute path to uploads directory in backend folder."""
         # Get the directory where this config file is located (backend/app/core)
@@ -0,0 +1,110 @@
+"""
+Total counts for list endpoints.
+
+`SELECT count(*)` is the most expensive part of a list request on a large table,
+so each list endpoint can pick how its total is computed (see CountMode):
+
+* exact: run the count query every time.
+* cached: keep the count in a per-process cache (app.core.table_cache).
+  Entries are stale as soon as any process commits an insert or delete on one
+  of the counted tables, and expire after COUNT_CACHE_TTL_SECONDS.
+* estimated: use the planner's row estimate from the table statistics. Small
+  estimates fall back to an exact count, which is cheap at that size.
+"""
+from typing import Any, NamedTuple
+
+from sqlalchemy.sql import Select
+from sqlalchemy.sql.util import find_tables
+from sqlmodel import Session as SQLModelSession
+from sqlmodel.ext.asyncio.session import AsyncSession
+from sqlmodel.sql.expression import SelectOfScalar
+
+from app.core.config import CountMode, settings
+from app.core.explain import Explain
+from app.core.table_cache import TableCache
+
+
+class CountResult(NamedTuple):
+    value: int
+    exact: bool
+
+
+# One entry per distinct filter (e.g. per owner for /items/my-items/); updates
+# leave counts as they are
+count_cache: TableCache[int] = TableCache(
+    settings.COUNT_CACHE_TTL_SECONDS, 10_000, updates=False
+)
+
+
+def _key(statement: Select[Any]) -> tuple[Any, ...]:
+    compiled = statement.compile()
+    return str(compiled), tuple(sorted(compiled.params.items()))
+
+
+def _tables(statement: Select[Any]) -> tuple[str, ...]:
+    return tuple(sorted({t.name for t in find_tables(statement)}))
+
+
+def _parallel_divisor(workers: int) -> float:
+    # The share of a parallel plan's rows each process is estimated to see, as
+    # PostgreSQL computes it with the leader participating (the default)
+    return workers + max(1.0 - 0.3 * workers, 0.0)
+
+
+def _planner_estimate(plan: list[dict[str, Any]]) -> int:
+    node = plan[0]["Plan"]
+    # count(*) is an Aggregate node; its input carries the row estimate. In a
+    # parallel plan it is split into a Finalize Aggregate over a Gather of
+    # Partial Aggregates, whose input estimates the rows of one process only.
+    workers = 0
+    while node["Node Type"] in ("Aggregate", "Gather", "Gather Merge") and node.get(
+        "Plans"
+    ):
+        if not node.get("Single Copy"):
+            workers = node.get("Workers Planned", workers)
+        node = node["Plans"][0]
+    rows: float = node["Plan Rows"]
+    if workers:
+        rows *= _parallel_divisor(workers)
+    return round(rows)
+
+
+def count_rows(
+    session: SQLModelSession, statement: SelectOfScalar[int], mode: CountMode
+) -> CountResult:
+    """Compute the total for a `select(func.count())...` statement."""
+    if mode is CountMode.CACHED:
+        key, tables = _key(statement), _tables(statement)
+        versions = count_cache.versions(session, tables)
+        cached = count_cache.lookup(key, versions)
+        if cached is not None:
+            return CountResult(cached, exact=False)
+        value = session.exec(statement).one()
+        count_cache.store(key, value, versions)
+        return CountResult(value, exact=True)
+    if mode is CountMode.ESTIMATED:
+        estimate = _planner_estimate(session.execute(Explain(statement)).scalar_one())
+        if estimate >= settings.COUNT_ESTIMATE_THRESHOLD:
+            return CountResult(estimate, exact=False)
+    return CountResult(session.exec(statement).one(), exact=True)
+
+
+async def count_rows_async(
+    session: AsyncSession, statement: SelectOfScalar[int], mode: CountMode
+) -> CountResult:
+    """Async variant of count_rows."""
+    if mode is CountMode.CACHED:
+        key, tables = _key(statement), _tables(statement)
+        versions = await count_cache.versions_async(session, tables)
+        cached = count_cache.lookup(key, versions)
+        if cached is not None:
+            return CountResult(cached, exact=False)
+        value = (await session.exec(statement)).one()
+        count_cache.store(key, value, versions)
+        return CountResult(value, exact=True)
+    if mode is CountMode.ESTIMATED:
+        plan = (await session.execute(Explain(statement))).scalar_one()
+        estimate = _planner_estimate(plan)
+        if estimate >= settings.COUNT_ESTIMATE_THRESHOLD:
+            return CountResult(estimate, exact=False)
+    return CountResult((await session.exec(statement)).one(), exact=True)
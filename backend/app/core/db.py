@@ -1,10 +1,132 @@
+import threading
+import time
+from typing import Any
+
+from sqlalchemy import exc
+from sqlalchemy.ext.asyncio import AsyncEngine, create_async_engine
+from sqlalchemy.pool import AsyncAdaptedQueuePool, ConnectionPoolEntry, QueuePool
 from sqlmodel import Session, create_engine, select
 
 from app import crud
 from app.core.config import settings
 from app.models import User, UserCreate, UserPermission
 
-engine = create_engine(str(settings.SQLALCHEMY_DATABASE_URI))
+
+class InstrumentedQueuePool(QueuePool):
+    """QueuePool that records how long callers wait to check out a connection."""
+
+    def __init__(self, *args: Any, **kwargs: Any) -> None:
+        super().__init__(*args, **kwargs)
+        self._stats_lock = threading.Lock()
+        self.reset_wait_stats()
+
+    def reset_wait_stats(self) -> None:
+        with self._stats_lock:
+            self.checkouts = 0
+            self.timeouts = 0
+            self.total_wait = 0.0
+            self.max_wait = 0.0
+            self.peak_overflow = 0
+
+    def _do_get(self) -> ConnectionPoolEntry:
+        start = time.perf_counter()
+        try:
+            return super()._do_get()
+        except exc.TimeoutError:
+            with self._stats_lock:
+                self.timeouts += 1
+            raise
+        finally:
+            waited = time.perf_counter() - start
+            with self._stats_lock:
+                self.checkouts += 1
+                self.total_wait += waited
+                self.max_wait = max(self.max_wait, waited)
+                self.peak_overflow = max(self.peak_overflow, self.overflow())
+
+    def stats(self) -> dict[str, Any]:
+        with self._stats_lock:
+            return {
+                "pool_size": self.size(),
+                "max_overflow": self._max_overflow,
+                "checked_out": self.checkedout(),
+                "checked_in": self.checkedin(),
+                # overflow() is negative while the pool is still filling up
+                "overflow": max(self.overflow(), 0),
+                "peak_overflow": max(self.peak_overflow, 0),
+                "checkouts": self.checkouts,
+                "timeouts": self.timeouts,
+                "avg_wait_ms": (
+                    self.total_wait / self.checkouts * 1000 if self.checkouts else 0.0
+                ),
+                "max_wait_ms": self.max_wait * 1000,
+            }
+
+
+class InstrumentedAsyncQueuePool(InstrumentedQueuePool, AsyncAdaptedQueuePool):
+    """Async-adapted variant of InstrumentedQueuePool for the asyncio engine."""
+
+
+def _connect_args() -> dict[str, Any]:
+    # psycopg uses None to mean "never prepare"
+    threshold = settings.DB_PREPARE_THRESHOLD
+    return {"prepare_threshold": threshold if threshold >= 0 else None}
+
+
+def _engine_options() -> dict[str, Any]:
+    return {
+        "pool_size": settings.DB_POOL_SIZE,
+        "max_overflow": settings.DB_MAX_OVERFLOW,
+        "pool_timeout": settings.DB_POOL_TIMEOUT,
+        "pool_recycle": settings.DB_POOL_RECYCLE,
+        "pool_pre_ping": settings.DB_POOL_PRE_PING,
+        "connect_args": _connect_args(),
+    }
+
+
+engine = create_engine(
+    str(settings.SQLALCHEMY_DATABASE_URI),
+    poolclass=InstrumentedQueuePool,
+    **_engine_options(),
+)
+
+# The psycopg dialect picks its asyncio driver when used with create_async_engine
+async_engine = create_async_engine(
+    str(settings.SQLALCHEMY_DATABASE_URI),
+    poolclass=InstrumentedAsyncQueuePool,
+    **_engine_options(),
+)
+
+# Read replica for safe requests on the async session (see app.core.db_routing)
+async_replica_engine: AsyncEngine | None = None
+if settings.SQLALCHEMY_REPLICA_DATABASE_URI:
+    async_replica_engine = create_async_engine(
+        str(settings.SQLALCHEMY_REPLICA_DATABASE_URI),
+        poolclass=InstrumentedAsyncQueuePool,
+        **_engine_options(),
+    )
+
+
+def _pool_stats(pool: Any) -> dict[str, Any]:
+    if isinstance(pool, InstrumentedQueuePool):
+        return pool.stats()
+    return {"status": pool.status()}
+
+
+def get_pool_stats() -> dict[str, Any]:
+    """Return a snapshot of the connection pool usage for this process."""
+    pools = {
+        "sync": _pool_stats(engine.pool),
+        "async": _pool_stats(async_engine.pool),
+    }
+    if async_replica_engine is not None:
+        pools["replica_async"] = _pool_stats(async_replica_engine.pool)
+    return {
+        "pools": pools,
+        "pool_timeout_s": settings.DB_POOL_TIMEOUT,
+        "pool_recycle_s": settings.DB_POOL_RECYCLE,
+        "pre_ping": settings.DB_POOL_PRE_PING,
+    }
 
 
 # make sure all SQLModel models are imported (app.models) before initializing DB
@@ -0,0 +1,111 @@
+"""
+Routing of async sessions between the primary database and a read replica.
+
+Safe requests (GET/HEAD/OPTIONS) read from the replica when one is configured,
+and never count as writes: CORS preflights come before most writes but change
+nothing. A client that just wrote through the API keeps reading from the
+primary for DB_READ_YOUR_WRITES_SECONDS so it never sees its own change
+disappear because of replication lag. Clients are identified by their Authorization header.
+
+The window is carried by the client, in a cookie signed with SECRET_KEY that
+the response to the write sets: every worker process sees it, whichever one
+served the write.
+"""
+import hashlib
+import hmac
+import math
+import time
+from http.cookies import SimpleCookie
+
+from sqlalchemy.ext.asyncio import AsyncEngine
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app.core import db
+from app.core.config import settings
+
+SAFE_METHODS = frozenset({"GET", "HEAD", "OPTIONS"})
+
+READ_YOUR_WRITES_COOKIE = "read_your_writes"
+
+
+class ReadYourWritesWindow:
+    """Signed cookies holding the end of a client's window."""
+
+    def __init__(self, seconds: float, secret: str) -> None:
+        self.seconds = seconds
+        self._secret = secret.encode()
+
+    def _signature(self, until: str, client: str) -> str:
+        # Bound to the client's Authorization header, which it does not store
+        message = f"{until}:{client}".encode()
+        return hmac.new(self._secret, message, hashlib.sha256).hexdigest()[:32]
+
+    def cookie(self, client: str) -> str:
+        """Value of the cookie opening the window for `client` from now."""
+        # In milliseconds since the epoch: the clocks of the workers agree
+        until = str(int((time.time() + self.seconds) * 1000))
+        return f"{until}.{self._signature(until, client)}"
+
+    def is_active(self, cookie: str | None, client: str | None) -> bool:
+        if not cookie or not client:
+            return False
+        until, _, signature = cookie.partition(".")
+        if not until.isdigit() or not hmac.compare_digest(
+            signature, self._signature(until, client)
+        ):
+            return False
+        return int(until) > time.time() * 1000
+
+
+read_your_writes = ReadYourWritesWindow(
+    settings.DB_READ_YOUR_WRITES_SECONDS, settings.SECRET_KEY
+)
+
+
+def select_async_engine(
+    method: str, authorization: str | None, cookie: str | None = None
+) -> AsyncEngine:
+    """Pick the engine an async session for this request should use."""
+    replica = db.async_replica_engine
+    if (
+        replica is None
+        or method not in SAFE_METHODS
+        or read_your_writes.is_active(cookie, authorization)
+    ):
+        return db.async_engine
+    return replica
+
+
+class ReadYourWritesMiddleware:
+    """Open the read-your-writes window after a successful authenticated write."""
+
+    def __init__(self, app: ASGIApp) -> None:
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or scope["method"] in SAFE_METHODS:
+            await self.app(scope, receive, send)
+            return
+        authorization = Headers(scope=scope).get("authorization")
+        if not authorization:
+            await self.app(scope, receive, send)
+            return
+
+        async def send_wrapper(message: Message) -> None:
+            if message["type"] == "http.response.start" and message["status"] < 400:
+                cookie: SimpleCookie = SimpleCookie()
+                cookie[READ_YOUR_WRITES_COOKIE] = read_your_writes.cookie(authorization)
+                morsel = cookie[READ_YOUR_WRITES_COOKIE]
+                morsel["max-age"] = math.ceil(read_your_writes.seconds)
+                morsel["path"] = "/"
+                morsel["httponly"] = True
+                morsel["samesite"] = "lax"
+                if scope.get("scheme") == "https":
+                    morsel["secure"] = True
+                MutableHeaders(scope=message).append(
+                    "set-cookie", morsel.OutputString()
+                )
+            await send(message)
+
+        await self.app(scope, receive, send_wrapper)
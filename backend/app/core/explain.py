@@ -0,0 +1,30 @@
+"""EXPLAIN support for SQLAlchemy statements on PostgreSQL."""
+from collections.abc import Iterator
+from typing import Any
+
+from sqlalchemy.ext.compiler import compiles
+from sqlalchemy.sql.compiler import SQLCompiler
+from sqlalchemy.sql.expression import ClauseElement, Executable
+
+
+class Explain(Executable, ClauseElement):
+    """`EXPLAIN (FORMAT JSON) <statement>`, keeping the statement's bound parameters."""
+
+    inherit_cache = False
+
+    def __init__(self, statement: ClauseElement, *, analyze: bool = False) -> None:
+        self.statement = statement
+        self.analyze = analyze
+
+
+@compiles(Explain, "postgresql")
+def _compile_explain(element: Explain, compiler: SQLCompiler, **kw: Any) -> str:
+    options = "ANALYZE, FORMAT JSON" if element.analyze else "FORMAT JSON"
+    return f"EXPLAIN ({options}) " + compiler.process(element.statement, **kw)
+
+
+def iter_plan_nodes(plan: dict[str, Any]) -> Iterator[dict[str, Any]]:
+    """Yield every node of a JSON plan, depth first."""
+    yield plan
+    for child in plan.get("Plans", []):
+        yield from iter_plan_nodes(child)
@@ -0,0 +1,117 @@
+"""
+Keyset (cursor) pagination helpers.
+
+A keyset is an ordered list of columns that together are unique, e.g.
+(created_at, id). Pages are ordered by those columns and the opaque cursor holds
+the key of the last row of the previous page, so the next page is a single index
+range scan no matter how deep the client has scrolled.
+"""
+import base64
+import binascii
+import json
+import uuid
+from collections.abc import Sequence
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Any, TypeVar
+
+from fastapi import HTTPException
+from sqlalchemy import ColumnElement, tuple_
+from sqlalchemy.sql import Select
+
+SelectT = TypeVar("SelectT", bound=Select[Any])
+RowT = TypeVar("RowT")
+
+
+@dataclass(frozen=True)
+class Keyset:
+    """Sort key used for cursor pagination."""
+
+    name: str
+    columns: tuple[Any, ...]
+    descending: bool = False
+
+    def order_by(self) -> list[ColumnElement[Any]]:
+        return [c.desc() if self.descending else c.asc() for c in self.columns]
+
+    def after(self, values: Sequence[Any]) -> ColumnElement[bool]:
+        """Filter selecting rows that come after the given key."""
+        key = tuple_(*self.columns)
+        position = tuple_(*values)
+        return key < position if self.descending else key > position
+
+    def key_of(self, row: Any) -> list[Any]:
+        return [getattr(row, c.key) for c in self.columns]
+
+
+def _encode_value(value: Any) -> Any:
+    if isinstance(value, datetime):
+        return value.isoformat()
+    if isinstance(value, uuid.UUID):
+        return str(value)
+    return value
+
+
+def _decode_value(column: Any, value: Any) -> Any:
+    try:
+        python_type = column.type.python_type
+    except NotImplementedError:
+        # e.g. SQLModel's AutoString: JSON already gives back the right type
+        return value
+    if value is None or isinstance(value, python_type):
+        return value
+    if not isinstance(value, str | int | float):
+        # Lists, objects and the like in a tampered cursor
+        raise ValueError(f"unexpected cursor value {value!r}")
+    if python_type is datetime:
+        if not isinstance(value, str):
+            raise ValueError(f"unexpected cursor value {value!r}")
+        return datetime.fromisoformat(value)
+    return python_type(value)
+
+
+def encode_cursor(keyset: Keyset, row: Any) -> str:
+    payload = {"k": keyset.name, "v": [_encode_value(v) for v in keyset.key_of(row)]}
+    raw = json.dumps(payload, separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(keyset: Keyset, cursor: str) -> list[Any]:
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        payload = json.loads(raw)
+        if payload["k"] != keyset.name or len(payload["v"]) != len(keyset.columns):
+            raise ValueError("cursor does not match the requested ordering")
+        return [_decode_value(c, v) for c, v in zip(keyset.columns, payload["v"], strict=True)]
+    except (
+        AttributeError, binascii.Error, UnicodeDecodeError, KeyError, TypeError, ValueError
+    ):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+
+def paginate(
+    statement: SelectT, keyset: Keyset, *, cursor: str | None, skip: int, limit: int
+) -> SelectT:
+    """
+    Order the statement by the keyset and select one page.
+
+    With a cursor the page starts right after it; otherwise skip/limit is used
+    as before. One extra row is fetched so `split_page` can tell whether
+    another page exists.
+    """
+    statement = statement.order_by(*keyset.order_by())
+    if cursor:
+        statement = statement.where(keyset.after(decode_cursor(keyset, cursor)))
+    else:
+        statement = statement.offset(skip)
+    return statement.limit(limit + 1)
+
+
+def split_page(
+    rows: Sequence[RowT], keyset: Keyset, limit: int
+) -> tuple[list[RowT], str | None]:
+    """Trim the look-ahead row and return the page with the cursor for the next one."""
+    if len(rows) <= limit:
+        return list(rows), None
+    page = list(rows[:limit])
+    return page, encode_cursor(keyset, page[-1]) if page else None
@@ -0,0 +1,89 @@
+"""
+Fast serialization of item payloads.
+
+Building ItemPublic models runs pydantic validation once per item, and FastAPI
+validates the result again against the route's `response_model`. The item rows
+come from the database and are already valid, so hot read endpoints build plain
+dicts with the same shape instead and encode them in one pass with
+pydantic-core's JSON encoder, returning the bytes as the response body.
+"""
+from typing import TYPE_CHECKING, Any
+
+from fastapi import Response
+from pydantic_core import to_json
+
+from app.core.storage import get_storage, public_url
+
+if TYPE_CHECKING:
+    from app.models import Item
+
+
+def variant_records(variants: list[dict[str, Any]] | None) -> list[dict[str, Any]]:
+    """ImageVariant fields of the variants recorded on an image row."""
+    storage = get_storage()
+    return [
+        {
+            "url": storage.public_url(variant["key"]),
+            "width": variant["width"],
+            "height": variant["height"],
+            "format": variant["format"],
+        }
+        for variant in variants or []
+    ]
+
+
+def item_record(item: "Item") -> dict[str, Any]:
+    """ItemPublic fields of an item, in ItemPublic's field order."""
+    producer = item.producer
+    producer_logo_url = None
+    if producer is not None:
+        producer_logo_url = producer.logo_url or next(
+            (
+                public_url(image.path, image.storage_key)
+                for image in producer.producer_images
+                if image.image_type == "logo"
+            ),
+            None,
+        )
+    return {
+        "title": item.title,
+        "description": item.description,
+        "images": item.images,
+        "model": item.model,
+        "certificate": item.certificate,
+        "is_original": item.is_original,
+        "variant_of": item.variant_of,
+        "id": item.id,
+        "owner_id": item.owner_id,
+        "producer_id": item.producer_id,
+        "producer_name": producer.name if producer is not None else None,
+        "producer_location": producer.location if producer is not None else None,
+        "producer_logo_url": producer_logo_url,
+        # Full URLs, for both local files and the CDN
+        "image_urls": [
+            public_url(image.path, image.storage_key) for image in item.item_images
+        ],
+        "image_variants": [variant_records(image.variants) for image in item.item_images],
+    }
+
+
+def items_page_record(
+    items: list["Item"], count: int, count_exact: bool, next_cursor: str | None
+) -> dict[str, Any]:
+    """ItemsPublic payload for a page of items."""
+    return {
+        "data": [item_record(item) for item in items],
+        "count": count,
+        "count_exact": count_exact,
+        "next_cursor": next_cursor,
+    }
+
+
+def dump_json(payload: Any) -> bytes:
+    """Encode dicts, lists and pydantic models (UUIDs and datetimes included)."""
+    return to_json(payload)
+
+
+def json_response(payload: Any) -> Response:
+    """Response with a pre-built payload, bypassing `response_model` validation."""
+    return Response(content=dump_json(payload), media_type="application/json")
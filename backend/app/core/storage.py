@@ -1,136 +1,695 @@
 """
-Shared storage utilities for uploading and deleting files to BunnyCDN and local storage.
+Storage of uploaded files behind one StorageBackend interface.
+
+Each process picks its backend once, with `get_storage`: BunnyCDN in staging
+and production when it is configured, otherwise the local upload folder served
+under /uploads, or memory for tests (see STORAGE_BACKEND). Routes, services and
+the storage worker only talk to the interface, so pooling, batching and caching
+of storage calls live in the backend.
+
+Files are addressed by key, their path within the storage
+("images/item/<uuid>.webp"). Image rows store the key in `storage_key`, and
+their public URL is built from it when they are serialized (`public_url`), by
+prepending the backend's URL prefix: moving to another CDN or hostname needs no
+rewrite of the rows. Rows also keep the URL they were created with in `path`;
+every method accepts those URLs and older local paths too, mapped back with
+`key_of` when they point into our storage (`storage_key_patterns`). Rows
+without a key hold files stored elsewhere, which are never deleted or served
+from ours.
 """
+import asyncio
+import hashlib
+import importlib.util
+import os
+import random
+import re
 import uuid
+from abc import ABC, abstractmethod
+from collections.abc import AsyncIterator, Callable, Iterable
 from logging import getLogger
 from pathlib import Path
+from typing import Any, NamedTuple
+from urllib.parse import urlparse
 
-import requests  # type: ignore
+import httpx
 from fastapi import HTTPException, UploadFile
+from fastapi.responses import (
+    FileResponse,
+    RedirectResponse,
+    Response,
+    StreamingResponse,
+)
+from sqlalchemy import ColumnElement, String, func, literal
 
 from app.core.config import CDNFolder, settings
 
 logger = getLogger(__name__)
 logger.setLevel("INFO")
 
+# Uploads are read, hashed and written in pieces of this size, so memory use
+# does not grow with the size of the file
+UPLOAD_CHUNK_SIZE = 1024 * 1024
+
+# Error of a DeleteResult whose file was already gone
+FILE_NOT_FOUND = "File not found"
+
+# Key captured by storage_key_patterns: a relative path that does not lead out
+# of the storage
+_KEY = r"(?!/)(?!.*\.\.)(.+)"
+
+
+class StoredFile(NamedTuple):
+    key: str
+    url: str
+    size: int
+    sha256: str
+
+
+class UploadDigest(NamedTuple):
+    key: str
+    size: int
+    sha256: str
+
+
+class FileStat(NamedTuple):
+    size: int
+    # Seconds since the epoch, if the storage reports it
+    modified: float | None = None
+
+
+class DeleteResult(NamedTuple):
+    path: str
+    deleted: bool
+    error: str | None = None
+
+
+def max_upload_bytes(folder: CDNFolder) -> int:
+    """Largest file accepted for upload into a folder."""
+    if folder == CDNFolder.MODELS:
+        return settings.UPLOAD_MAX_MODEL_BYTES
+    return settings.UPLOAD_MAX_IMAGE_BYTES
+
+
+def _too_large(limit: int) -> HTTPException:
+    return HTTPException(status_code=413, detail=f"File is larger than {limit} bytes")
+
+
+async def _upload_size(file: UploadFile) -> int:
+    """Size of an upload, measuring the spooled file if the parser did not."""
+    if file.size is None:
+        file.size = await asyncio.to_thread(file.file.seek, 0, os.SEEK_END)
+    return file.size
+
+
+class _UploadReader:
+    """Reads an upload in chunks, enforcing a size limit and hashing it."""
+
+    def __init__(self, file: UploadFile, limit: int) -> None:
+        # The multipart parser reports the size; check it before reading anything
+        if file.size is not None and file.size > limit:
+            raise _too_large(limit)
+        self.file = file
+        self.limit = limit
+        self.size = 0
+        self._sha256 = hashlib.sha256()
+
+    async def chunks(self) -> AsyncIterator[bytes]:
+        """The file from its start (again, if a request is retried)."""
+        await self.file.seek(0)
+        self.size = 0
+        self._sha256 = hashlib.sha256()
+        while chunk := await self.file.read(UPLOAD_CHUNK_SIZE):
+            self.size += len(chunk)
+            if self.size > self.limit:
+                raise _too_large(self.limit)
+            self._sha256.update(chunk)
+            yield chunk
+
+    @property
+    def sha256(self) -> str:
+        return self._sha256.hexdigest()
+
+
+def _stored_key(path: str) -> str:
+    # URLs and absolute paths are mapped back to keys only when they point into
+    # our storage (storage_key_patterns): files elsewhere are none of ours
+    if "://" in path or path.startswith("/"):
+        key = storage_key_of(path)
+        if key is None:
+            raise FileNotFoundError(path)
+        return key
+    return path
+
+
+def upload_key(file: UploadFile, folder: CDNFolder, name: uuid.UUID | str) -> str:
+    """Key of an upload stored in a folder under `name` and its own extension."""
+    return f"{folder.value}/{name}{Path(file.filename or 'file').suffix}"
+
+
+async def hash_upload(file: UploadFile, folder: CDNFolder) -> UploadDigest:
+    """
+    Digest of an upload before it is stored, keyed by its content.
+
+    Reads the spooled upload in chunks, enforcing the folder's size limit.
+    """
+    await _upload_size(file)
+    reader = _UploadReader(file, max_upload_bytes(folder))
+    async for _chunk in reader.chunks():
+        pass
+    return UploadDigest(
+        upload_key(file, folder, reader.sha256), reader.size, reader.sha256
+    )
+
+
+class StorageBackend(ABC):
+    """Where uploaded files are kept."""
+
+    name: str
+    # Public URLs of files are this followed by their key
+    url_prefix: str
+
+    @abstractmethod
+    def key_of(self, path: str) -> str:
+        """
+        Key of a file, given its key, public URL or a legacy stored path.
+
+        Raises FileNotFoundError for URLs and paths of files elsewhere.
+        """
+
+    def public_url(self, key: str) -> str:
+        """URL the file is served from."""
+        return f"{self.url_prefix}{key}"
+
+    @abstractmethod
+    async def put_stream(
+        self, key: str, chunks: Callable[[], AsyncIterator[bytes]], size: int
+    ) -> None:
+        """
+        Store the `size` bytes yielded by `chunks()` under `key`.
+
+        `chunks` is called again for each retried attempt. An HTTPException
+        raised while reading it (such as a 413) is passed on, and nothing is
+        left stored.
+        """
+
+    @abstractmethod
+    async def _delete(self, paths: list[str]) -> list[DeleteResult]: ...
+
+    @abstractmethod
+    async def stat(self, path: str) -> FileStat | None:
+        """Size of a stored file, or None if there is no such file."""
+
+    @abstractmethod
+    def open_range(
+        self, path: str, start: int = 0, end: int | None = None
+    ) -> AsyncIterator[bytes]:
+        """
+        Bytes `start` to `end` (exclusive, default the end of the file) of a file.
+
+        Raises FileNotFoundError when iterated if there is no such file.
+        """
+
+    async def exists(self, path: str) -> bool:
+        return await self.stat(path) is not None
+
+    async def close(self) -> None:
+        """Release pooled connections, at shutdown (none by default)."""
+        return None
+
+    async def save_upload(
+        self, file: UploadFile, folder: CDNFolder, name: uuid.UUID | str
+    ) -> StoredFile:
+        """Stream an upload into a folder, named `name` with its own extension."""
+        limit = max_upload_bytes(folder)
+        size = await _upload_size(file)
+        reader = _UploadReader(file, limit)
+        key = upload_key(file, folder, name)
+        logger.info(f"Storing {key} ({size} bytes) in {self.name} storage")
+        await self.put_stream(key, reader.chunks, size)
+        return StoredFile(key, self.public_url(key), reader.size, reader.sha256)
+
+    async def delete_many(self, paths: Iterable[str]) -> list[DeleteResult]:
+        """
+        Delete stored files, by key or stored path.
+
+        Failures do not stop the other deletions: they are logged and returned,
+        one result per path in the given order. A file that was already gone
+        fails with FILE_NOT_FOUND.
+        """
+        paths = list(paths)
+        if not paths:
+            return []
+        results = await self._delete(paths)
+        failed = [result for result in results if not result.deleted]
+        for result in failed:
+            logger.warning(f"Failed to delete {result.path}: {result.error}")
+        logger.info(f"Deleted {len(paths) - len(failed)} of {len(paths)} stored files")
+        return results
+
+    async def download_response(
+        self, path: str, filename: str | None = None
+    ) -> Response:
+        """
+        Response serving a stored file, as an attachment if `filename` is given.
+
+        Raises FileNotFoundError if there is no such file.
+        """
+        stat = await self.stat(path)
+        if stat is None:
+            raise FileNotFoundError(path)
+        headers = {"Content-Length": str(stat.size)}
+        if filename is not None:
+            headers["Content-Disposition"] = f'attachment; filename="{filename}"'
+        return StreamingResponse(
+            self.open_range(path),
+            media_type="application/octet-stream",
+            headers=headers,
+        )
+
+
+class LocalStorage(StorageBackend):
+    """Files in UPLOAD_DIR, served by the backend under /uploads."""
+
+    name = "local"
+
+    def __init__(self) -> None:
+        # Full backend URL, so the frontend can fetch the file
+        self.url_prefix = f"{settings.BACKEND_HOST}/uploads/"
+
+    def key_of(self, path: str) -> str:
+        # Absolute paths of files under UPLOAD_DIR, whatever its name
+        if path.startswith("/"):
+            upload_dir: Path = settings.UPLOAD_DIR.resolve()
+            file_path = Path(path).resolve()
+            if file_path.is_relative_to(upload_dir):
+                return str(file_path.relative_to(upload_dir))
+        return _stored_key(path)
+
+    def file(self, path: str) -> Path:
+        """
+        Local file of a key or stored path.
+
+        Raises FileNotFoundError for paths that lead out of UPLOAD_DIR.
+        """
+        upload_dir: Path = settings.UPLOAD_DIR.resolve()
+        file_path = (upload_dir / self.key_of(path)).resolve()
+        if not file_path.is_relative_to(upload_dir):
+            raise FileNotFoundError(path)
+        return file_path
+
+    async def put_stream(
+        self, key: str, chunks: Callable[[], AsyncIterator[bytes]], size: int
+    ) -> None:
+        file_path = self.file(key)
+        # Written under another name, so a partial file is never served
+        partial_path = file_path.with_name(f"{file_path.name}.part")
+        logger.info(f"Saving file to: {file_path.resolve()}")
+        try:
+            await asyncio.to_thread(file_path.parent.mkdir, parents=True, exist_ok=True)
+            f = await asyncio.to_thread(partial_path.open, "wb")
+            try:
+                async for chunk in chunks():
+                    await asyncio.to_thread(f.write, chunk)
+            finally:
+                await asyncio.to_thread(f.close)
+            await asyncio.to_thread(partial_path.replace, file_path)
+        except HTTPException:
+            partial_path.unlink(missing_ok=True)
+            raise
+        except Exception as e:
+            partial_path.unlink(missing_ok=True)
+            logger.error(f"Failed to save file locally to {file_path}: {e}")
+            raise HTTPException(status_code=500, detail=f"Failed to save file locally: {str(e)}")
+
+    def _delete_files(self, paths: list[str]) -> list[DeleteResult]:
+        results = []
+        for path in paths:
+            try:
+                os.remove(self.file(path))
+                results.append(DeleteResult(path, True))
+            except FileNotFoundError:
+                results.append(DeleteResult(path, False, FILE_NOT_FOUND))
+            except OSError as e:
+                results.append(DeleteResult(path, False, str(e)))
+        return results
 
-async def save_to_bunnycdn(file: UploadFile, folder: CDNFolder, file_id: uuid.UUID) -> str:
-    """Save the file to BunnyCDN storage and return the accessible URL."""
-    logger.info(f"Uploading file to BunnyCDN folder: {folder.value}")
-    
-    # Check if BunnyCDN is configured
-    if not settings.bunnycdn_enabled:
-        raise HTTPException(
-            status_code=500, 
-            detail="BunnyCDN is not configured. Set BUNNYCDN_STORAGE_ZONE and BUNNYCDN_API_KEY environment variables."
+    async def _delete(self, paths: list[str]) -> list[DeleteResult]:
+        # One worker thread for the whole batch
+        return await asyncio.to_thread(self._delete_files, paths)
+
+    async def stat(self, path: str) -> FileStat | None:
+        try:
+            result = await asyncio.to_thread(self.file(path).stat)
+        except (FileNotFoundError, NotADirectoryError):
+            return None
+        return FileStat(result.st_size, result.st_mtime)
+
+    async def open_range(
+        self, path: str, start: int = 0, end: int | None = None
+    ) -> AsyncIterator[bytes]:
+        f = await asyncio.to_thread(self.file(path).open, "rb")
+        try:
+            await asyncio.to_thread(f.seek, start)
+            remaining = None if end is None else max(end - start, 0)
+            while remaining != 0:
+                size = UPLOAD_CHUNK_SIZE if remaining is None else min(remaining, UPLOAD_CHUNK_SIZE)
+                chunk = await asyncio.to_thread(f.read, size)
+                if not chunk:
+                    break
+                if remaining is not None:
+                    remaining -= len(chunk)
+                yield chunk
+        finally:
+            await asyncio.to_thread(f.close)
+
+    async def download_response(
+        self, path: str, filename: str | None = None
+    ) -> Response:
+        file_path = self.file(path)
+        if not await asyncio.to_thread(file_path.is_file):
+            raise FileNotFoundError(path)
+        if filename is None:
+            return FileResponse(file_path)
+        return FileResponse(
+            file_path, media_type="application/octet-stream", filename=filename
         )
-    
-    storage_zone = settings.BUNNYCDN_STORAGE_ZONE
-    bunny_api_key = settings.BUNNYCDN_API_KEY
-
-    try:
-        # Read file content
-        content = await file.read()
-        
-        # Use UUID as filename with original extension
-        original_filename = file.filename or "file"
-        file_extension = Path(original_filename).suffix
-        new_filename = f"{file_id}{file_extension}"
-        
-        bunny_path = f"{folder.value}/{new_filename}"
-        url = f"https://storage.bunnycdn.com/{storage_zone}/{bunny_path}"
 
+
+class BunnyCDNStorage(StorageBackend):
+    """
+    Files in a BunnyCDN storage zone, served by its pull zone.
+
+    Writes go to the Storage API over one pooled HTTP client, which keeps
+    connections alive between requests and uses HTTP/2 when the h2 package is
+    installed. Reads (`stat`, `open_range`) go to the pull zone, so they are
+    answered by the CDN edge.
+    """
+
+    name = "bunnycdn"
+
+    def __init__(self) -> None:
+        if not (settings.BUNNYCDN_STORAGE_ZONE and settings.BUNNYCDN_API_KEY):
+            raise ValueError(
+                "BunnyCDN is not configured. Set BUNNYCDN_STORAGE_ZONE and "
+                "BUNNYCDN_API_KEY environment variables."
+            )
+        self.storage_zone = settings.BUNNYCDN_STORAGE_ZONE
+        self.pull_zone_url = (
+            settings.BUNNYCDN_PULL_ZONE_URL or f"https://{self.storage_zone}.b-cdn.net"
+        ).rstrip("/")
+        self.url_prefix = f"{self.pull_zone_url}/"
+        self._client: httpx.AsyncClient | None = None
+
+    @property
+    def client(self) -> httpx.AsyncClient:
+        """The pooled HTTP client, created on first use in the running loop."""
+        if self._client is None or self._client.is_closed:
+            self._client = httpx.AsyncClient(
+                base_url=settings.BUNNYCDN_STORAGE_ENDPOINT,
+                http2=importlib.util.find_spec("h2") is not None,
+                limits=httpx.Limits(max_connections=settings.BUNNYCDN_MAX_CONNECTIONS),
+                timeout=httpx.Timeout(
+                    settings.BUNNYCDN_TIMEOUT_SECONDS,
+                    connect=settings.BUNNYCDN_CONNECT_TIMEOUT_SECONDS,
+                ),
+            )
+        return self._client
+
+    async def close(self) -> None:
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+    def key_of(self, path: str) -> str:
+        if path.startswith(self.url_prefix):
+            return path.removeprefix(self.url_prefix)
+        return _stored_key(path)
+
+    async def request(
+        self,
+        method: str,
+        key: str,
+        *,
+        stream: Callable[[], AsyncIterator[bytes]] | None = None,
+        **kwargs: Any,
+    ) -> httpx.Response:
+        """
+        Send a Storage API request for a file of the storage zone.
+
+        A streamed body is given as `stream`, called for each attempt.
+
+        Connection errors, timeouts and 5xx responses are retried up to
+        BUNNYCDN_MAX_RETRIES times, after a random delay of up to
+        BUNNYCDN_RETRY_BACKOFF_SECONDS doubled after each attempt; the last
+        response is returned, or the last error raised.
+        """
+        url = f"/{self.storage_zone}/{key}"
+        # Only sent to the Storage API, never to the pull zone
+        kwargs["headers"] = {
+            **kwargs.get("headers", {}),
+            "AccessKey": settings.BUNNYCDN_API_KEY or "",
+        }
+        retries = settings.BUNNYCDN_MAX_RETRIES
+        for attempt in range(retries + 1):
+            try:
+                if stream is not None:
+                    kwargs["content"] = stream()
+                response = await self.client.request(method, url, **kwargs)
+            except httpx.TransportError as e:
+                if attempt == retries:
+                    raise
+                logger.warning(f"BunnyCDN {method} {key} failed, retrying: {e!r}")
+            else:
+                if response.status_code < 500 or attempt == retries:
+                    return response
+                logger.warning(
+                    f"BunnyCDN {method} {key} returned {response.status_code}, retrying"
+                )
+            # Full jitter, so concurrent retries do not arrive together
+            await asyncio.sleep(
+                random.uniform(0, settings.BUNNYCDN_RETRY_BACKOFF_SECONDS * 2**attempt)
+            )
+        raise AssertionError("unreachable")
+
+    async def put_stream(
+        self, key: str, chunks: Callable[[], AsyncIterator[bytes]], size: int
+    ) -> None:
+        logger.info(f"Uploading file to BunnyCDN: {key}")
         headers = {
-            "AccessKey": bunny_api_key,
             "Content-Type": "application/octet-stream",
+            # Sent as is: the Storage API does not take chunked uploads
+            "Content-Length": str(size),
         }
-        # Upload via PUT
-        response = requests.put(url, data=content, headers=headers)
+        try:
+            response = await self.request("PUT", key, stream=chunks, headers=headers)
+        except HTTPException:
+            # Re-raise HTTP exceptions as-is
+            raise
+        except Exception as e:
+            error_detail = f"Failed to upload file to BunnyCDN: {str(e)}"
+            logger.error(error_detail)
+            raise HTTPException(status_code=500, detail=error_detail)
         if response.status_code not in (200, 201):
             error_detail = f"BunnyCDN upload failed with status {response.status_code}: {response.text}"
             logger.error(error_detail)
-            raise HTTPException(
-                status_code=500, detail=error_detail
-            )
+            raise HTTPException(status_code=500, detail=error_detail)
+        logger.info(f"Successfully uploaded to BunnyCDN: {key}")
+
+    async def _delete_file(self, semaphore: asyncio.Semaphore, path: str) -> DeleteResult:
+        try:
+            key = self.key_of(path)
+        except FileNotFoundError:
+            return DeleteResult(path, False, FILE_NOT_FOUND)
+        try:
+            async with semaphore:
+                response = await self.request("DELETE", key)
+        except (HTTPException, httpx.HTTPError) as e:
+            return DeleteResult(path, False, str(getattr(e, "detail", e)) or type(e).__name__)
+        if response.status_code in (200, 204):
+            return DeleteResult(path, True)
+        if response.status_code == 404:
+            return DeleteResult(path, False, FILE_NOT_FOUND)
+        return DeleteResult(path, False, f"BunnyCDN returned {response.status_code}")
 
-        logger.info(f"Successfully uploaded to BunnyCDN: {bunny_path}")
-        # Construct a public CDN URL for the uploaded file
-        bunny_url = f"https://{storage_zone}.b-cdn.net/{bunny_path}"
-        return bunny_url
-
-    except HTTPException:
-        # Re-raise HTTP exceptions as-is
-        raise
-    except Exception as e:
-        error_detail = f"Failed to upload file to BunnyCDN: {str(e)}"
-        logger.error(error_detail)
-        raise HTTPException(status_code=500, detail=error_detail)
-
-
-async def save_to_local(file: UploadFile, folder: CDNFolder, file_id: uuid.UUID) -> str:
-    """Save the file to a local folder and return a web-accessible relative path."""
-    upload_dir = settings.UPLOAD_DIR / folder.value
-    upload_dir.mkdir(parents=True, exist_ok=True)
-
-    # Use UUID as filename with original extension
-    original_filename = file.filename or "file"
-    file_extension = Path(original_filename).suffix
-    new_filename = f"{file_id}{file_extension}"
-    file_path = upload_dir / new_filename
-    
-    # Get absolute path for logging
-    abs_path = file_path.resolve()
-    logger.info(f"Saving file to: {abs_path}")
-
-    try:
-        with file_path.open("wb") as f:
-            content = await file.read()
-            f.write(content)
-        logger.info(f"Successfully saved file: {abs_path} ({len(content)} bytes)")
-        # Return full backend URL so frontend can access the file
-        # Format: http://localhost:8000/uploads/{folder}/{filename}
-        return f"{settings.BACKEND_HOST}/uploads/{folder.value}/{new_filename}"
-    except Exception as e:
-        logger.error(f"Failed to save file locally to {abs_path}: {e}")
-        raise HTTPException(status_code=500, detail=f"Failed to save file locally: {str(e)}")
-
-
-async def delete_from_bunnycdn(path: str) -> None:
-    """Delete a file from BunnyCDN storage."""
-    if not settings.bunnycdn_enabled:
-        raise HTTPException(
-            status_code=500, 
-            detail="BunnyCDN is not configured."
+    async def _delete(self, paths: list[str]) -> list[DeleteResult]:
+        # Concurrent over the pooled client, STORAGE_DELETE_CONCURRENCY at a time
+        semaphore = asyncio.Semaphore(settings.STORAGE_DELETE_CONCURRENCY)
+        return list(
+            await asyncio.gather(*(self._delete_file(semaphore, path) for path in paths))
         )
-    
-    storage_zone = settings.BUNNYCDN_STORAGE_ZONE
-    bunny_api_key = settings.BUNNYCDN_API_KEY
-    
-    # Extract the path from the URL
-    # URL format: https://{storage_zone}.b-cdn.net/{path}
-    if path.startswith("https://"):
-        # Extract path after storage zone
-        parts = path.split(".b-cdn.net/")
-        if len(parts) == 2:
-            bunny_path = parts[1]
-        else:
-            raise HTTPException(status_code=400, detail="Invalid BunnyCDN URL format")
-    else:
-        bunny_path = path
-    
-    url = f"https://storage.bunnycdn.com/{storage_zone}/{bunny_path}"
-    headers = {"AccessKey": bunny_api_key}
-    
-    try:
-        response = requests.delete(url, headers=headers)
-        if response.status_code not in (200, 204):
-            logger.error(f"Failed to delete from BunnyCDN: {response.status_code}")
-            raise HTTPException(
-                status_code=500, detail="Failed to delete file from BunnyCDN"
-            )
-        logger.info(f"Successfully deleted from BunnyCDN: {bunny_path}")
-    except HTTPException:
-        raise
-    except Exception as e:
-        logger.error(f"Failed to delete from BunnyCDN: {e}")
-        raise HTTPException(status_code=500, detail="Failed to delete file from BunnyCDN")
+
+    async def stat(self, path: str) -> FileStat | None:
+        try:
+            url = self.public_url(self.key_of(path))
+        except FileNotFoundError:
+            return None
+        response = await self.client.head(url)
+        if response.status_code == 404:
+            return None
+        response.raise_for_status()
+        return FileStat(int(response.headers.get("Content-Length", 0)))
+
+    async def open_range(
+        self, path: str, start: int = 0, end: int | None = None
+    ) -> AsyncIterator[bytes]:
+        headers = {}
+        if start or end is not None:
+            headers["Range"] = f"bytes={start}-{'' if end is None else end - 1}"
+        url = self.public_url(self.key_of(path))
+        async with self.client.stream("GET", url, headers=headers) as response:
+            if response.status_code == 404:
+                raise FileNotFoundError(path)
+            response.raise_for_status()
+            async for chunk in response.aiter_bytes(UPLOAD_CHUNK_SIZE):
+                yield chunk
+
+    async def download_response(
+        self, path: str, filename: str | None = None
+    ) -> Response:
+        # Served by the CDN
+        return RedirectResponse(url=self.public_url(self.key_of(path)))
+
+
+class MemoryStorage(StorageBackend):
+    """Files in a dict of the process, for tests."""
+
+    name = "memory"
+    url_prefix = "memory://"
+
+    def __init__(self) -> None:
+        self.files: dict[str, bytes] = {}
+
+    def key_of(self, path: str) -> str:
+        if path.startswith(self.url_prefix):
+            return path.removeprefix(self.url_prefix)
+        return _stored_key(path)
+
+    async def put_stream(
+        self, key: str, chunks: Callable[[], AsyncIterator[bytes]], size: int
+    ) -> None:
+        self.files[key] = b"".join([chunk async for chunk in chunks()])
+
+    def _get(self, path: str) -> bytes | None:
+        try:
+            return self.files.get(self.key_of(path))
+        except FileNotFoundError:
+            return None
+
+    async def _delete(self, paths: list[str]) -> list[DeleteResult]:
+        results = []
+        for path in paths:
+            if self._get(path) is None:
+                results.append(DeleteResult(path, False, FILE_NOT_FOUND))
+            else:
+                del self.files[self.key_of(path)]
+                results.append(DeleteResult(path, True))
+        return results
+
+    async def stat(self, path: str) -> FileStat | None:
+        content = self._get(path)
+        return None if content is None else FileStat(len(content))
+
+    async def open_range(
+        self, path: str, start: int = 0, end: int | None = None
+    ) -> AsyncIterator[bytes]:
+        content = self._get(path)
+        if content is None:
+            raise FileNotFoundError(path)
+        yield content[start:end]
+
+
+_BACKENDS: dict[str, type[StorageBackend]] = {
+    "local": LocalStorage,
+    "bunnycdn": BunnyCDNStorage,
+    "memory": MemoryStorage,
+}
+
+# The process's backend, see get_storage()
+_storage: StorageBackend | None = None
+
+
+def get_storage() -> StorageBackend:
+    """
+    The storage backend of the process, chosen on first use from STORAGE_BACKEND.
+
+    Without STORAGE_BACKEND, BunnyCDN is used when it is configured outside of
+    local development, and the local upload folder otherwise.
+    """
+    global _storage
+    if _storage is None:
+        name = settings.STORAGE_BACKEND or (
+            "bunnycdn" if settings.bunnycdn_enabled else "local"
+        )
+        _storage = _BACKENDS[name]()
+        logger.info(f"Using {name} storage")
+    return _storage
+
+
+def set_storage(storage: StorageBackend | None) -> None:
+    """Replace the process's backend (None chooses it again on next use)."""
+    global _storage
+    _storage = storage
+
+
+async def close_storage() -> None:
+    if _storage is not None:
+        await _storage.close()
+
+
+async def delete_many(paths: Iterable[str]) -> list[DeleteResult]:
+    """Delete stored files through the process's backend."""
+    return await get_storage().delete_many(paths)
+
+
+def storage_key_patterns() -> tuple[str, ...]:
+    """
+    Patterns of stored paths of files in storage, each capturing the file's key.
+
+    These are URLs on the BunnyCDN pull zone, URLs on BACKEND_HOST and /uploads/
+    paths of local files, and very old absolute paths of local files. Files
+    elsewhere, such as imported image URLs, match none of them. Also matched by
+    PostgreSQL (storage_key_expression), so they stick to syntax both regex
+    flavours read the same way.
+    """
+    backend = urlparse(settings.BACKEND_HOST)
+    patterns = [
+        rf"^(?:https?://{re.escape(backend.netloc)})?/uploads/{_KEY}$",
+        rf"^/.*/uploads/{_KEY}$",
+    ]
+    pull_zone_url = settings.BUNNYCDN_PULL_ZONE_URL or (
+        settings.BUNNYCDN_STORAGE_ZONE
+        and f"https://{settings.BUNNYCDN_STORAGE_ZONE}.b-cdn.net"
+    )
+    if pull_zone_url:
+        pull_zone = urlparse(pull_zone_url)
+        host = f"{pull_zone.netloc}{pull_zone.path.rstrip('/')}"
+        patterns.insert(0, rf"^https?://{re.escape(host)}/{_KEY}$")
+    return tuple(patterns)
+
+
+def storage_key_of(path: str) -> str | None:
+    """Key of a file from its stored path, or None if it is not in storage."""
+    for pattern in storage_key_patterns():
+        if match := re.match(pattern, path):
+            return match.group(1)
+    return None
+
+
+def storage_key_expression(path: Any) -> ColumnElement[str | None]:
+    """SQL version of `storage_key_of`."""
+    return func.coalesce(
+        *(func.substring(path, pattern) for pattern in storage_key_patterns())
+    )
+
+
+def public_url(path: str, storage_key: str | None) -> str:
+    """Public URL of an image row: from its key, or its path if it has none."""
+    if storage_key is None:
+        return path
+    return get_storage().public_url(storage_key)
+
+
+def public_url_expression(path: Any, storage_key: Any) -> ColumnElement[str]:
+    """SQL version of `public_url`, for rows read without loading objects."""
+    prefix = literal(get_storage().url_prefix, String)
+    return func.coalesce(prefix.concat(storage_key), path)
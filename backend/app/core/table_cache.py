@@ -0,0 +1,166 @@
+"""
+Per-process caches invalidated per table, through versions kept in the database.
+
+Shared by the count cache (app.core.counts) and the response cache
+(app.core.cache). Every table has a TableVersion row, bumped by the session
+listeners below in the transaction of each commit that writes to the table, so
+it changes with the table's rows, whichever worker process or CLI command
+wrote them. Each entry is stored with the versions of the tables its value was
+computed from, read through the session that computes it, before computing it.
+A lookup reads the current versions again, in one query, and the entry is
+served only if none changed. Entries also expire after the cache's TTL, and a
+full cache drops its least recently used entry.
+"""
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Generic, TypeVar
+
+from sqlalchemy import event, inspect
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.orm import ORMExecuteState, Session, UOWTransaction
+from sqlmodel import col, select
+from sqlmodel import Session as SQLModelSession
+from sqlmodel.ext.asyncio.session import AsyncSession
+from sqlmodel.sql.expression import Select
+
+from app.models import TableVersion
+
+V = TypeVar("V")
+
+# Tables written by a session since it last committed or rolled back
+_WRITTEN_TABLES = "table_cache_written_tables"
+_UPDATED_TABLES = "table_cache_updated_tables"
+
+
+class TableCache(Generic[V]):
+    """
+    Least recently used cache of values, invalidated per table.
+
+    With `updates=False`, only inserts and deletes invalidate entries (counts
+    do not change when rows are updated).
+    """
+
+    def __init__(self, ttl: float, max_entries: int, *, updates: bool = True) -> None:
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.updates = updates
+        # Values with their expiry and table versions, least recently used first
+        self._entries: OrderedDict[Any, tuple[V, float, tuple[int, ...]]] = (
+            OrderedDict()
+        )
+        self._lock = threading.Lock()
+
+    def _versions_statement(
+        self, tables: tuple[str, ...]
+    ) -> Select[tuple[str, int]]:
+        column = (
+            col(TableVersion.version) if self.updates else col(TableVersion.rows_version)
+        )
+        return select(col(TableVersion.name), column).where(
+            col(TableVersion.name).in_(tables)
+        )
+
+    @staticmethod
+    def _ordered(rows: Any, tables: tuple[str, ...]) -> tuple[int, ...]:
+        # Tables never written to have no row yet
+        versions = dict(rows)
+        return tuple(versions.get(table, 0) for table in tables)
+
+    def versions(self, session: SQLModelSession, tables: tuple[str, ...]) -> tuple[int, ...]:
+        """Current versions of the tables, as seen by the session."""
+        rows = session.exec(self._versions_statement(tables)).all()
+        return self._ordered(rows, tables)
+
+    async def versions_async(
+        self, session: AsyncSession, tables: tuple[str, ...]
+    ) -> tuple[int, ...]:
+        """Async variant of versions."""
+        rows = (await session.exec(self._versions_statement(tables))).all()
+        return self._ordered(rows, tables)
+
+    def lookup(self, key: Any, versions: tuple[int, ...]) -> V | None:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            value, expires_at, stored_versions = entry
+            if expires_at < time.monotonic() or stored_versions != versions:
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def store(self, key: Any, value: V, versions: tuple[int, ...]) -> None:
+        """Store a value computed after reading `versions` of its tables."""
+        with self._lock:
+            self._entries.pop(key, None)
+            self._entries[key] = (value, time.monotonic() + self.ttl, versions)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+def _tables(session: Session, name: str) -> set[str]:
+    tables: set[str] = session.info.setdefault(name, set())
+    return tables
+
+
+@event.listens_for(Session, "after_flush")
+def _collect_flushed_tables(session: Session, _flush_context: UOWTransaction) -> None:
+    written = _tables(session, _WRITTEN_TABLES)
+    for obj in [*session.new, *session.deleted]:
+        written.add(inspect(obj).mapper.local_table.name)
+    updated = _tables(session, _UPDATED_TABLES)
+    for obj in session.dirty:
+        updated.add(inspect(obj).mapper.local_table.name)
+
+
+@event.listens_for(Session, "do_orm_execute")
+def _collect_bulk_tables(orm_execute_state: ORMExecuteState) -> None:
+    table = getattr(orm_execute_state.statement, "table", None)
+    if table is None:
+        return
+    session = orm_execute_state.session
+    if orm_execute_state.is_insert or orm_execute_state.is_delete:
+        _tables(session, _WRITTEN_TABLES).add(table.name)
+    elif orm_execute_state.is_update:
+        _tables(session, _UPDATED_TABLES).add(table.name)
+
+
+@event.listens_for(Session, "before_commit")
+def _bump_table_versions(session: Session) -> None:
+    # Flushed here rather than by the commit, so every written table is known
+    session.flush()
+    written = session.info.pop(_WRITTEN_TABLES, set())
+    updated = session.info.pop(_UPDATED_TABLES, set())
+    if not written and not updated:
+        return
+    # In name order, so concurrent commits lock the rows in the same order
+    rows = [
+        {"name": table, "version": 1, "rows_version": int(table in written)}
+        for table in sorted(written | updated)
+    ]
+    statement = insert(TableVersion).values(rows)
+    statement = statement.on_conflict_do_update(
+        index_elements=[col(TableVersion.name)],
+        set_={
+            "version": col(TableVersion.version) + 1,
+            "rows_version": col(TableVersion.rows_version)
+            + statement.excluded.rows_version,
+        },
+    )
+    # Through the connection, so the statement is not collected as a write
+    session.connection().execute(statement)
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_rolled_back_tables(session: Session) -> None:
+    session.info.pop(_WRITTEN_TABLES, None)
+    session.info.pop(_UPDATED_TABLES, None)
@@ -1,7 +1,10 @@
 import uuid
 from typing import Any
 
-from sqlmodel import Session, select
+from sqlalchemy import insert, update
+from sqlmodel import Session, col, select
+from sqlmodel.ext.asyncio.session import AsyncSession
+from starlette.concurrency import run_in_threadpool
 
 from app.core.security import get_password_hash, verify_password
 from app.models import Item, ItemCreate, User, UserCreate, UserUpdate
@@ -52,3 +55,78 @@ def create_item(*, session: Session, item_in: ItemCreate, owner_id: uuid.UUID) -
     session.commit()
     session.refresh(db_item)
     return db_item
+
+
+# Async variants for routes running on the asyncio engine. Password hashing is
+# CPU bound, so it runs in the threadpool instead of blocking the event loop.
+
+
+async def create_user_async(*, session: AsyncSession, user_create: UserCreate) -> User:
+    hashed_password = await run_in_threadpool(get_password_hash, user_create.password)
+    db_obj = User.model_validate(user_create, update={"hashed_password": hashed_password})
+    session.add(db_obj)
+    await session.commit()
+    await session.refresh(db_obj)
+    return db_obj
+
+
+async def update_user_async(
+    *, session: AsyncSession, db_user: User, user_in: UserUpdate
+) -> Any:
+    user_data = user_in.model_dump(exclude_unset=True)
+    extra_data = {}
+    if "password" in user_data:
+        extra_data["hashed_password"] = await run_in_threadpool(
+            get_password_hash, user_data["password"]
+        )
+    db_user.sqlmodel_update(user_data, update=extra_data)
+    session.add(db_user)
+    await session.commit()
+    await session.refresh(db_user)
+    return db_user
+
+
+async def get_user_by_email_async(*, session: AsyncSession, email: str) -> User | None:
+    statement = select(User).where(User.email == email)
+    return (await session.exec(statement)).first()
+
+
+async def authenticate_async(
+    *, session: AsyncSession, email: str, password: str
+) -> User | None:
+    db_user = await get_user_by_email_async(session=session, email=email)
+    if not db_user:
+        return None
+    if not await run_in_threadpool(verify_password, password, db_user.hashed_password):
+        return None
+    return db_user
+
+
+async def create_item_async(
+    *, session: AsyncSession, item_in: ItemCreate, owner_id: uuid.UUID
+) -> Item:
+    db_item = Item.model_validate(item_in, update={"owner_id": owner_id})
+    session.add(db_item)
+    await session.commit()
+    await session.refresh(db_item)
+    return db_item
+
+
+async def create_items_async(
+    *, session: AsyncSession, items_in: list[ItemCreate], extra: dict[str, Any]
+) -> list[uuid.UUID]:
+    """Insert items in one statement, batched into multi-row INSERTs by the driver."""
+    rows = [Item.model_validate(item_in, update=extra).model_dump() for item_in in items_in]
+    statement = insert(Item).returning(col(Item.id), sort_by_parameter_order=True)
+    result = await session.exec(statement, params=rows)  # type: ignore[call-overload]
+    ids = list(result.scalars())
+    await session.commit()
+    return ids
+
+
+async def update_items_async(
+    *, session: AsyncSession, changes: list[dict[str, Any]]
+) -> None:
+    """Apply `{"id": ..., **fields}` changes as a bulk UPDATE by primary key."""
+    await session.exec(update(Item), params=changes)  # type: ignore[call-overload]
+    await session.commit()
@@ -0,0 +1,144 @@
+"""
+Index advisor for the app's hot queries.
+
+Runs EXPLAIN on every query in HOT_QUERIES with sequential scans disabled. The
+planner still picks a Seq Scan when no index can serve a filter or sort, so any
+Seq Scan left in the plan points at a missing index. When adding a model or a
+query on a new foreign key, register the query here; the test suite fails if it
+needs a sequential scan.
+
+Usage: python -m app.index_advisor
+"""
+import logging
+import sys
+import uuid
+from collections.abc import Callable
+from datetime import datetime
+from typing import Any, NamedTuple
+
+from sqlalchemy import text
+from sqlalchemy.sql import Select
+from sqlmodel import Session, select
+
+from app.api.routes.items import (
+    ITEM_KEYSET,
+    ITEM_SORTS,
+    ItemFilters,
+    item_cards_statement,
+    item_lineage,
+    item_search,
+)
+from app.api.routes.producers import PRODUCER_KEYSET
+from app.core.config import ItemSort
+from app.core.db import engine
+from app.core.explain import Explain, iter_plan_nodes
+from app.models import EmailLog, Item, ItemImage, Producer, ProducerImage, Review
+from app.services.export import export_statement
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Placeholder parameter values: only the shape of the plan matters
+_ID = uuid.UUID(int=1)
+_IDS = [uuid.UUID(int=1), uuid.UUID(int=2)]
+_PAGE = 100
+
+
+def _item_list(filters: ItemFilters, sort: ItemSort) -> Callable[[], Select[Any]]:
+    """An item list page as built by GET /items/."""
+    return lambda: filters.apply(select(Item)).order_by(*ITEM_SORTS[sort].order_by()).limit(_PAGE)
+
+
+HOT_QUERIES: dict[str, Callable[[], Select[Any]]] = {
+    # GET /items/
+    "items_gallery_page": lambda: select(Item)
+    .order_by(*ITEM_KEYSET.order_by())
+    .where(ITEM_KEYSET.after([datetime(2000, 1, 1), _ID]))
+    .limit(_PAGE),
+    # GET /items/cards
+    "item_cards_page": lambda: item_cards_statement()
+    .order_by(*ITEM_KEYSET.order_by())
+    .where(ITEM_KEYSET.after([datetime(2000, 1, 1), _ID]))
+    .limit(_PAGE),
+    # GET /items/ and /items/cards filters and orderings
+    "items_newest": _item_list(ItemFilters(), ItemSort.NEWEST),
+    "items_by_title": _item_list(ItemFilters(), ItemSort.TITLE),
+    "items_filtered_by_producer": _item_list(ItemFilters(producer_id=_ID), ItemSort.CREATED),
+    "items_filtered_by_variant_of": _item_list(ItemFilters(variant_of=_ID), ItemSort.CREATED),
+    "items_filtered_originals": _item_list(ItemFilters(is_original=True), ItemSort.NEWEST),
+    "items_filtered_with_model": _item_list(ItemFilters(has_model=True), ItemSort.CREATED),
+    # GET /items/{id}/lineage
+    "item_lineage": lambda: item_lineage(_ID, 10),
+    # GET /items/export
+    "items_export": export_statement,
+    # GET /items/search
+    "item_search": lambda: (search := item_search("placeholder"))
+    .page.order_by(*search.keyset.order_by())
+    .limit(_PAGE),
+    # GET /items/my-items/, DELETE /users/me
+    "items_by_owner": lambda: select(Item)
+    .where(Item.owner_id == _ID)
+    .order_by(*ITEM_KEYSET.order_by())
+    .limit(_PAGE),
+    # Item.producer selectinload, DELETE /users/{user_id} (producer profile)
+    "items_by_producer": lambda: select(Item).where(Item.producer_id.in_(_IDS)),  # type: ignore[union-attr]
+    "item_variants": lambda: select(Item).where(Item.variant_of == _ID),
+    # Item.images selectinload, /images/item/{item_id}, item deletion
+    "item_images": lambda: select(ItemImage).where(ItemImage.item_id.in_(_IDS)),  # type: ignore[attr-defined]
+    # GET /producers/
+    "producers_page": lambda: select(Producer)
+    .order_by(*PRODUCER_KEYSET.order_by())
+    .where(PRODUCER_KEYSET.after([datetime(2000, 1, 1), _ID]))
+    .limit(_PAGE),
+    # Producer.images selectinload, /images/producer/{producer_id}
+    "producer_images": lambda: select(ProducerImage).where(
+        ProducerImage.producer_id.in_(_IDS)  # type: ignore[attr-defined]
+    ),
+    "producer_reviews": lambda: select(Review).where(Review.producer_id.in_(_IDS)),  # type: ignore[attr-defined]
+    # Producer profile lookup for the current user
+    "producer_by_user": lambda: select(Producer).where(Producer.user_id == _ID),
+    # GET /users/{user_id}/email-status
+    "latest_email_for_user": lambda: select(EmailLog)
+    .where(EmailLog.user_id == _ID)
+    .order_by(EmailLog.created_at.desc())  # type: ignore[attr-defined]
+    .limit(1),
+}
+
+
+class SeqScan(NamedTuple):
+    query: str
+    table: str
+    filter: str | None
+
+
+def find_sequential_scans(session: Session) -> list[SeqScan]:
+    """Return the sequential scans left in the plans of HOT_QUERIES."""
+    findings: list[SeqScan] = []
+    with session.begin():
+        # Make the planner prefer any usable index, even on near-empty tables
+        session.execute(text("SET LOCAL enable_seqscan = off"))
+        for name, build in HOT_QUERIES.items():
+            plan = session.execute(Explain(build())).scalar_one()
+            for node in iter_plan_nodes(plan[0]["Plan"]):
+                if node["Node Type"] == "Seq Scan":
+                    findings.append(
+                        SeqScan(name, node["Relation Name"], node.get("Filter"))
+                    )
+    return findings
+
+
+def main() -> None:
+    with Session(engine) as session:
+        findings = find_sequential_scans(session)
+    for finding in findings:
+        logger.warning(
+            f"{finding.query}: sequential scan on {finding.table}"
+            f" (filter: {finding.filter or 'none'})"
+        )
+    if findings:
+        sys.exit(1)
+    logger.info(f"All {len(HOT_QUERIES)} hot queries can use an index")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,3 +1,5 @@
+import logging
+
 import sentry_sdk
 from fastapi import FastAPI
 from fastapi.routing import APIRoute
@@ -6,6 +8,7 @@ from starlette.middleware.cors import CORSMiddleware
 
 from app.api.main import api_router
 from app.core.config import settings
+from app.core.db_routing import ReadYourWritesMiddleware
 
 
 def custom_generate_unique_id(route: APIRoute) -> str:
@@ -29,6 +32,38 @@ async def startup_event() -> None:
     from app.api.routes.logs import setup_log_buffer
     setup_log_buffer()
 
+    # Build the first gallery pages before the first visitor asks for them
+    if settings.RESPONSE_CACHE_ENABLED and settings.RESPONSE_CACHE_WARM_PAGES > 0:
+        from app.api.routes.items import warm_item_pages
+        try:
+            await warm_item_pages(settings.RESPONSE_CACHE_WARM_PAGES)
+        except Exception as e:
+            logging.warning(f"Failed to warm the response cache: {e}")
+
+    # Choose the storage backend once, before the first upload
+    from app.core.storage import get_storage
+    get_storage()
+
+    # Delete the stored files of deleted rows in the background
+    if settings.STORAGE_WORKER_ENABLED:
+        from app.services.storage_tasks import start_worker
+        start_worker()
+
+
+@app.on_event("shutdown")
+async def shutdown_event() -> None:
+    """Release pooled async connections while their event loop is still running."""
+    from app.core.db import async_engine, async_replica_engine
+    from app.core.storage import close_storage
+    from app.services.image_variants import shutdown_pool
+    from app.services.storage_tasks import stop_worker
+    await stop_worker()
+    shutdown_pool()
+    await close_storage()
+    await async_engine.dispose()
+    if async_replica_engine is not None:
+        await async_replica_engine.dispose()
+
 
 # Set all CORS enabled origins
 if settings.all_cors_origins:
@@ -40,6 +75,10 @@ if settings.all_cors_origins:
         allow_headers=["*"],
     )
 
+# Keep clients that just wrote on the primary while the replica catches up
+if settings.SQLALCHEMY_REPLICA_DATABASE_URI:
+    app.add_middleware(ReadYourWritesMiddleware)
+
 app.include_router(api_router, prefix=settings.API_V1_STR)
 
 # Mount static files for local development (uploads directory)
@@ -1,12 +1,15 @@
 import uuid
 from datetime import datetime
-from typing import Optional
+from typing import Any, Optional
 
 from pydantic import EmailStr
 from enum import Enum
-from sqlalchemy import Column, String, DateTime
+from sqlalchemy import Column, Computed, DateTime, Index, String, text
+from sqlalchemy.dialects.postgresql import JSONB, TSVECTOR
 from sqlmodel import Field, Relationship, SQLModel
 
+from app.core.serialization import item_record
+
 
 # Shared properties
 class UserPermission(str, Enum):
@@ -67,6 +70,10 @@ class UserPublic(UserBase):
 class UsersPublic(SQLModel):
     data: list[UserPublic]
     count: int
+    # False when count is a planner estimate or a possibly stale cached value
+    count_exact: bool = True
+    # Opaque cursor for the next page, None on the last page
+    next_cursor: Optional[str] = None
 
 
 # Shared properties
@@ -104,12 +111,57 @@ class ItemUpdate(ItemBase):
     title: Optional[str] = Field(default=None, min_length=1, max_length=255)  # type: ignore
 
 
+# Rows accepted per request by the bulk item endpoints
+ITEM_BULK_MAX_ROWS = 1_000
+
+
+# Properties to receive on bulk item creation
+class ItemsBulkCreate(SQLModel):
+    items: list[ItemCreate] = Field(min_length=1, max_length=ITEM_BULK_MAX_ROWS)
+
+
+# One row of a bulk item update
+class ItemBulkUpdate(ItemUpdate):
+    id: uuid.UUID
+
+
+class ItemsBulkUpdate(SQLModel):
+    items: list[ItemBulkUpdate] = Field(min_length=1, max_length=ITEM_BULK_MAX_ROWS)
+
+
+# Ids of the created or updated items, in request order
+class ItemsBulkPublic(SQLModel):
+    ids: list[uuid.UUID]
+    count: int
+
+
 # Database model, database table inferred from class name
 class Item(ItemBase, table=True):  # type: ignore[call-arg]
+    __table_args__ = (
+        # Keyset pagination keys for /items/ and /items/my-items/
+        Index("ix_item_created_at_id", "created_at", "id"),
+        Index("ix_item_owner_id_created_at_id", "owner_id", "created_at", "id"),
+        # Filters and orderings of /items/ and /items/cards; the filter
+        # indexes also serve the producer_id and variant_of foreign keys
+        Index("ix_item_producer_id_created_at_id", "producer_id", "created_at", "id"),
+        Index("ix_item_variant_of_created_at_id", "variant_of", "created_at", "id"),
+        Index("ix_item_is_original_created_at_id", "is_original", "created_at", "id"),
+        Index(
+            "ix_item_with_model_created_at_id",
+            "created_at",
+            "id",
+            postgresql_where=text("model IS NOT NULL"),
+        ),
+        Index("ix_item_title_id", "title", "id"),
+    )
     id: uuid.UUID = Field(default_factory=uuid.uuid4, primary_key=True)
     title: str = Field(max_length=255)
     owner_id: uuid.UUID = Field(foreign_key="user.id", nullable=False)
     producer_id: Optional[uuid.UUID] = Field(default=None, foreign_key="producer.id")
+    created_at: datetime = Field(
+        default_factory=datetime.utcnow,
+        sa_column=Column(DateTime, nullable=False)
+    )
     owner: Optional[User] = Relationship(back_populates="items")
     producer: Optional["Producer"] = Relationship(back_populates="produced_items")
     item_images: list["ItemImage"] = Relationship(
@@ -118,6 +170,33 @@ class Item(ItemBase, table=True):  # type: ignore[call-arg]
     )
 
 
+# Text search configuration of Item's search vector and of the producer name index
+SEARCH_CONFIG = "english"
+
+# Full-text search document of an item, generated by Postgres. Title words rank
+# above description words. It is added to the table without being mapped on
+# Item, so regular item queries do not load it.
+item_search_vector = Column(
+    "search_vector",
+    TSVECTOR,
+    Computed(
+        f"setweight(to_tsvector('{SEARCH_CONFIG}', coalesce(title, '')), 'A') || "
+        f"setweight(to_tsvector('{SEARCH_CONFIG}', coalesce(description, '')), 'B')",
+        persisted=True,
+    ),
+)
+Item.__table__.append_column(item_search_vector)  # type: ignore[attr-defined]
+Index("ix_item_search_vector", item_search_vector, postgresql_using="gin")
+
+
+# Resized copy of an image, for `srcset` (`{url} {width}w`) and <source type>
+class ImageVariant(SQLModel):
+    url: str
+    width: int
+    height: int
+    format: str  # "avif" or "webp"
+
+
 # Properties to return via API, id is always required
 class ItemPublic(ItemBase):
     id: uuid.UUID
@@ -127,58 +206,13 @@ class ItemPublic(ItemBase):
     producer_location: Optional[str] = None
     producer_logo_url: Optional[str] = None
     image_urls: list[str] = []  # URLs/paths to images from Image table
+    # Resized copies of each image of image_urls, in the same order
+    image_variants: list[list[ImageVariant]] = []
     
     @classmethod
-    def from_item(cls, item: "Item", base_url: str = "") -> "ItemPublic":
+    def from_item(cls, item: "Item") -> "ItemPublic":
         """Create ItemPublic from Item with image URLs and producer info."""
-        from app.core.config import settings
-        import logging
-        
-        logger = logging.getLogger(__name__)
-        
-        image_urls = []
-        if hasattr(item, 'item_images') and item.item_images:
-            logger.info(f"Processing {len(item.item_images)} images for item {item.id}, environment: {settings.ENVIRONMENT}")
-            for img in item.item_images:
-                # Storage module now returns proper URLs for both local and CDN
-                # Local: http://localhost:8000/uploads/images/filename.webp
-                # CDN: https://zone.b-cdn.net/images/filename.webp
-                # Just use the stored path directly
-                logger.info(f"Image {img.id}: using path={img.path}")
-                image_urls.append(img.path)
-        
-        # Get producer info if available
-        producer_name = None
-        producer_location = None
-        producer_logo_url = None
-        if hasattr(item, 'producer') and item.producer:
-            producer_name = item.producer.name
-            producer_location = item.producer.location
-            producer_logo_url = item.producer.logo_url
-            if not producer_logo_url and hasattr(item.producer, 'producer_images'):
-                logo_images = [
-                    img for img in item.producer.producer_images
-                    if img.image_type == "logo"
-                ]
-                if logo_images:
-                    producer_logo_url = logo_images[0].path
-        
-        return cls(
-            id=item.id,
-            owner_id=item.owner_id,
-            producer_id=item.producer_id,
-            producer_name=producer_name,
-            producer_location=producer_location,
-            producer_logo_url=producer_logo_url,
-            title=item.title,
-            description=item.description,
-            images=item.images,
-            model=item.model,
-            certificate=item.certificate,
-            is_original=item.is_original,
-            variant_of=item.variant_of,
-            image_urls=image_urls
-        )
+        return cls.model_validate(item_record(item))
 
 
 class ItemWithPermissions(SQLModel):
@@ -187,9 +221,60 @@ class ItemWithPermissions(SQLModel):
     can_edit: bool = False
 
 
+class ItemSearchHit(ItemPublic):
+    rank: float
+    # HTML-escaped excerpts, with matched words wrapped in <mark></mark>
+    title_highlight: Optional[str] = None
+    description_highlight: Optional[str] = None
+
+
+class ItemsSearchPublic(SQLModel):
+    data: list[ItemSearchHit]
+    count: int
+    count_exact: bool = True
+    next_cursor: Optional[str] = None
+
+
 class ItemsPublic(SQLModel):
     data: list[ItemPublic]
     count: int
+    # False when count is a planner estimate or a possibly stale cached value
+    count_exact: bool = True
+    # Opaque cursor for the next page, None on the last page
+    next_cursor: Optional[str] = None
+
+
+# Gallery card, read straight from a projected query without loading Item objects
+class ItemCard(SQLModel):
+    id: uuid.UUID
+    title: str
+    cover_image_url: Optional[str] = None
+    cover_image_variants: list[ImageVariant] = []
+    producer_name: Optional[str] = None
+    producer_logo_url: Optional[str] = None
+
+
+class ItemCardsPublic(SQLModel):
+    data: list[ItemCard]
+    count: int
+    count_exact: bool = True
+    next_cursor: Optional[str] = None
+
+
+# One item of a variant family, `depth` variants below the family's original
+class ItemLineageNode(SQLModel):
+    id: uuid.UUID
+    title: str
+    is_original: bool
+    variant_of: Optional[uuid.UUID] = None
+    depth: int
+
+
+class ItemLineagePublic(SQLModel):
+    root_id: uuid.UUID
+    data: list[ItemLineageNode]
+    # True when the family is deeper than ITEM_LINEAGE_MAX_DEPTH
+    truncated: bool = False
 
 
 # Generic message
@@ -221,7 +306,7 @@ class EmailConfirmation(SQLModel):
 class ImageBase(SQLModel):
     path: str = Field(max_length=500)  # Full path or URL to the image
     name: str = Field(max_length=255)  # Filename without extension
-    item_id: uuid.UUID = Field(foreign_key="item.id", nullable=False, ondelete="CASCADE")
+    item_id: uuid.UUID = Field(foreign_key="item.id", nullable=False, ondelete="CASCADE", index=True)
 
 
 # Properties to receive on image creation
@@ -243,6 +328,14 @@ class ItemImage(ImageBase, table=True):  # type: ignore[call-arg]
         default_factory=datetime.utcnow,
         sa_column=Column(DateTime, nullable=False)
     )
+    # Key of the file in storage; the public URL is built from it (see
+    # app.core.storage.public_url). None for images stored elsewhere
+    storage_key: Optional[str] = Field(default=None, max_length=500)
+    # Resized copies of the image, as {"key", "width", "height", "format"}
+    # (see app.services.image_variants). None until they are made
+    variants: Optional[list[dict[str, Any]]] = Field(
+        default=None, sa_column=Column(JSONB(none_as_null=True), nullable=True)
+    )
     item: Optional["Item"] = Relationship(back_populates="item_images")
 
 
@@ -250,6 +343,7 @@ class ItemImage(ImageBase, table=True):  # type: ignore[call-arg]
 class ImagePublic(ImageBase):
     id: uuid.UUID
     created_at: datetime
+    variants: list[ImageVariant] = []
 
 
 class ImagesPublic(SQLModel):
@@ -262,7 +356,7 @@ class ProducerImageBase(SQLModel):
     path: str = Field(max_length=500)  # Full path or URL to the image
     name: str = Field(max_length=255)  # Filename without extension
     image_type: str = Field(max_length=50)  # "logo" or "portfolio"
-    producer_id: uuid.UUID = Field(foreign_key="producer.id", nullable=False, ondelete="CASCADE")
+    producer_id: uuid.UUID = Field(foreign_key="producer.id", nullable=False, ondelete="CASCADE", index=True)
 
 
 # Properties to receive on producer image creation
@@ -284,6 +378,8 @@ class ProducerImage(ProducerImageBase, table=True):  # type: ignore[call-arg]
         default_factory=datetime.utcnow,
         sa_column=Column(DateTime, nullable=False)
     )
+    # Key of the file in storage, as on ItemImage
+    storage_key: Optional[str] = Field(default=None, max_length=500)
     producer: Optional["Producer"] = Relationship(back_populates="producer_images")
 
 
@@ -318,8 +414,18 @@ class ProducerUpdate(ProducerBase):
 
 # Database model, database table inferred from class name
 class Producer(ProducerBase, table=True):  # type: ignore[call-arg]
+    __table_args__ = (
+        # Keyset pagination key for /producers/
+        Index("ix_producer_created_at_id", "created_at", "id"),
+        # Producer name matches in GET /items/search
+        Index(
+            "ix_producer_name_search",
+            text(f"to_tsvector('{SEARCH_CONFIG}', name)"),
+            postgresql_using="gin",
+        ),
+    )
     id: uuid.UUID = Field(default_factory=uuid.uuid4, primary_key=True)
-    user_id: Optional[uuid.UUID] = Field(default=None, foreign_key="user.id")
+    user_id: Optional[uuid.UUID] = Field(default=None, foreign_key="user.id", index=True)
     created_at: datetime = Field(
         default_factory=datetime.utcnow,
         sa_column=Column(DateTime, nullable=False)
@@ -346,6 +452,10 @@ class ProducerPublic(ProducerBase):
 class ProducersPublic(SQLModel):
     data: list[ProducerPublic]
     count: int
+    # False when count is a planner estimate or a possibly stale cached value
+    count_exact: bool = True
+    # Opaque cursor for the next page, None on the last page
+    next_cursor: Optional[str] = None
 
 
 # Shared properties for Review
@@ -372,7 +482,7 @@ class Review(ReviewBase, table=True):  # type: ignore[call-arg]
         default_factory=datetime.utcnow,
         sa_column=Column(DateTime, nullable=False)
     )
-    producer_id: uuid.UUID = Field(foreign_key="producer.id", nullable=False)
+    producer_id: uuid.UUID = Field(foreign_key="producer.id", nullable=False, index=True)
     producer: Optional["Producer"] = Relationship(back_populates="reviews")
 
 
@@ -388,6 +498,110 @@ class ReviewsPublic(SQLModel):
     count: int
 
 
+# Bulk catalog import (see app.services.catalog_import)
+class CatalogImportBase(SQLModel):
+    filename: str = Field(max_length=255)
+    format: str = Field(max_length=10)  # "csv" or "ndjson"
+    status: str = Field(max_length=20)  # "pending", "loading", "merging", "completed", "failed"
+    rows_loaded: int = 0
+    items_created: int = 0
+    images_created: int = 0
+    error_count: int = 0
+    error_message: Optional[str] = Field(default=None, max_length=1000)
+
+
+# Database model
+class CatalogImport(CatalogImportBase, table=True):
+    id: uuid.UUID = Field(default_factory=uuid.uuid4, primary_key=True)
+    # Owner and producer of the imported items
+    owner_id: uuid.UUID = Field(foreign_key="user.id", nullable=False, ondelete="CASCADE", index=True)
+    producer_id: Optional[uuid.UUID] = Field(default=None, foreign_key="producer.id", ondelete="SET NULL", index=True)
+    created_at: datetime = Field(
+        default_factory=datetime.utcnow,
+        sa_column=Column(DateTime, nullable=False)
+    )
+    finished_at: Optional[datetime] = Field(
+        default=None,
+        sa_column=Column(DateTime, nullable=True)
+    )
+
+
+# Properties to return via API
+class CatalogImportPublic(CatalogImportBase):
+    id: uuid.UUID
+    owner_id: uuid.UUID
+    producer_id: Optional[uuid.UUID]
+    created_at: datetime
+    finished_at: Optional[datetime]
+
+
+# A rejected row of a catalog import; row_number counts data rows from 1
+class CatalogImportError(SQLModel, table=True):
+    import_id: uuid.UUID = Field(
+        foreign_key="catalogimport.id", primary_key=True, ondelete="CASCADE"
+    )
+    row_number: int = Field(primary_key=True)
+    message: str = Field(max_length=255)
+
+
+class CatalogImportErrorPublic(SQLModel):
+    row_number: int
+    message: str
+
+
+class CatalogImportErrorsPublic(SQLModel):
+    data: list[CatalogImportErrorPublic]
+    next_cursor: Optional[str] = None
+
+
+# A stored file to delete, written in the same transaction as the rows that
+# referenced it and carried out by app.services.storage_tasks
+class StorageTask(SQLModel, table=True):
+    __tablename__ = "storage_task"
+    __table_args__ = (
+        # Due tasks, oldest first (the worker's batch query)
+        Index("ix_storage_task_next_attempt_at", "next_attempt_at"),
+    )
+    id: Optional[int] = Field(default=None, primary_key=True)
+    path: str = Field(max_length=1000)
+    attempts: int = 0
+    last_error: Optional[str] = Field(default=None, max_length=1000)
+    created_at: datetime = Field(
+        default_factory=datetime.utcnow,
+        sa_column=Column(DateTime, nullable=False)
+    )
+    next_attempt_at: datetime = Field(
+        default_factory=datetime.utcnow,
+        sa_column=Column(DateTime, nullable=False)
+    )
+
+
+# A stored image file, named after its content and shared by every ItemImage
+# and ProducerImage row with the same bytes (see app.services.blobs)
+class Blob(SQLModel, table=True):
+    storage_key: str = Field(primary_key=True, max_length=500)
+    sha256: str = Field(max_length=64)
+    size: int
+    # Image rows whose storage_key is this blob's
+    ref_count: int = 0
+    created_at: datetime = Field(
+        default_factory=datetime.utcnow,
+        sa_column=Column(DateTime, nullable=False)
+    )
+
+
+# Version of a table's rows, bumped in the transaction of every commit that
+# writes to the table, so the caches of every process see the write (see
+# app.core.table_cache)
+class TableVersion(SQLModel, table=True):
+    __tablename__ = "table_version"
+    name: str = Field(primary_key=True, max_length=100)
+    # Bumped by every write
+    version: int = 0
+    # Bumped by inserts and deletes only
+    rows_version: int = 0
+
+
 # Email Log for tracking email sends
 class EmailLogBase(SQLModel):
     email_to: str = Field(max_length=255)
@@ -399,6 +613,10 @@ class EmailLogBase(SQLModel):
 
 # Database model
 class EmailLog(EmailLogBase, table=True):  # type: ignore[call-arg]
+    __table_args__ = (
+        # Latest email per user (GET /users/{user_id}/email-status)
+        Index("ix_emaillog_user_id_created_at", "user_id", "created_at"),
+    )
     id: uuid.UUID = Field(default_factory=uuid.uuid4, primary_key=True)
     user_id: Optional[uuid.UUID] = Field(default=None, foreign_key="user.id")
     created_at: datetime = Field(
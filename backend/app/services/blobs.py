@@ -0,0 +1,180 @@
+"""
+Content-addressed image files, shared by the image rows that use them.
+
+Uploaded images are hashed while they are read from the spooled upload and
+stored under their SHA-256 (`images/item/<sha256>.webp`). When the same bytes
+are uploaded again into the same folder, nothing is sent to the storage
+backend: the new row gets the stored file's key, and its Blob counts one more
+reference.
+
+Deleting image rows releases their keys in the same transaction: reference
+counts go down, and blobs left without references are deleted. Their files are
+queued for deletion as before (app.services.storage_tasks); the storage worker
+skips files whose blob is referenced by the time it gets to them.
+
+Uploads hold a transaction-level advisory lock on the keys they work on, and
+the worker the same locks at session level while it deletes files (outside any
+transaction). An upload therefore either adds its reference before the worker
+looks at the file, or finds the blob gone and stores the file again after the
+worker has deleted it, never in between.
+
+Resized copies of a stored file (app.services.image_variants) are stored next
+to it, under `variant_key`, and kept as long as its blob.
+"""
+import logging
+import re
+from collections.abc import Iterable
+from typing import Any
+
+from fastapi import UploadFile
+from sqlalchemy import (
+    CompoundSelect,
+    Executable,
+    Select,
+    String,
+    delete,
+    literal,
+    update,
+)
+from sqlalchemy.dialects.postgresql import ARRAY
+from sqlmodel import col, func, select
+from sqlmodel.ext.asyncio.session import AsyncSession
+from sqlmodel.sql.expression import SelectOfScalar
+
+from app.core.config import CDNFolder
+from app.core.storage import StorageBackend, StoredFile, hash_upload
+from app.models import Blob
+
+logger = logging.getLogger(__name__)
+
+_VARIANT_KEY = re.compile(r"^(.+)\.w\d+\.(?:avif|webp)$")
+
+
+def variant_key(key: str, width: int, format: str) -> str:
+    """Key of a resized copy of the file stored under `key`."""
+    return f"{key}.w{width}.{format}"
+
+
+def source_key(key: str) -> str:
+    """Key of the file a variant was made from, or `key` itself."""
+    match = _VARIANT_KEY.match(key)
+    return match.group(1) if match else key
+
+
+def _key_rows(keys: Iterable[str]) -> Select[Any]:
+    rows = func.unnest(literal(list(keys), ARRAY(String))).table_valued("key").render_derived()
+    return select(rows.c.key)
+
+
+def lock_statement(
+    keys: Iterable[str], *, until_unlocked: bool = False
+) -> SelectOfScalar[Any]:
+    """
+    Take the advisory lock of each key until the end of the transaction.
+
+    With `until_unlocked`, the locks are held by the connection until
+    `unlock_statement` runs on it, across transactions.
+    """
+    # Always in the same order, so two transactions never wait on each other
+    rows = _key_rows(sorted(set(keys))).subquery()
+    lock = func.pg_advisory_lock if until_unlocked else func.pg_advisory_xact_lock
+    return select(lock(func.hashtextextended(rows.c.key, 0)))
+
+
+def unlock_statement() -> SelectOfScalar[Any]:
+    """Release the advisory locks taken with `until_unlocked`."""
+    return select(func.pg_advisory_unlock_all())
+
+
+def acquire_statement(keys: "Select[Any] | CompoundSelect[Any]") -> Executable:
+    """Add one reference per row of `keys`, a query of one key column, to blobs."""
+    rows = keys.subquery()
+    counts = (
+        select(rows.c[0].label("storage_key"), func.count().label("n"))
+        .group_by(rows.c[0])
+        .subquery()
+    )
+    return (
+        update(Blob)
+        .where(col(Blob.storage_key) == counts.c.storage_key)
+        .values(ref_count=col(Blob.ref_count) + counts.c.n)
+    )
+
+
+def release_statements(keys: "Select[Any] | CompoundSelect[Any]") -> list[Executable]:
+    """
+    Drop one reference per row of `keys` and delete the blobs left unreferenced.
+
+    Run before the image rows themselves are deleted, as `keys` usually
+    selects from them.
+    """
+    rows = keys.subquery()
+    counts = (
+        select(rows.c[0].label("storage_key"), func.count().label("n"))
+        .group_by(rows.c[0])
+        .subquery()
+    )
+    return [
+        update(Blob)
+        .where(col(Blob.storage_key) == counts.c.storage_key)
+        .values(ref_count=col(Blob.ref_count) - counts.c.n),
+        delete(Blob).where(
+            col(Blob.ref_count) <= 0,
+            col(Blob.storage_key).in_(select(counts.c.storage_key)),
+        ),
+    ]
+
+
+async def release_from(
+    session: AsyncSession, keys: "Select[Any] | CompoundSelect[Any]"
+) -> None:
+    for statement in release_statements(keys):
+        await session.exec(  # type: ignore[call-overload]
+            statement, execution_options={"synchronize_session": False}
+        )
+
+
+async def release(session: AsyncSession, keys: Iterable[str]) -> None:
+    """Drop a reference to the blob of each key, in the session's transaction."""
+    keys = list(keys)
+    if keys:
+        await release_from(session, _key_rows(keys))
+
+
+async def store_upload(
+    session: AsyncSession,
+    storage: StorageBackend,
+    file: UploadFile,
+    folder: CDNFolder,
+) -> StoredFile:
+    """
+    Store an uploaded image under its content hash, with a reference to it.
+
+    The reference is added in the session's transaction, which keeps the
+    key's lock until the caller commits it with the image row.
+    """
+    digest = await hash_upload(file, folder)
+    await session.exec(lock_statement([digest.key]))
+    result = await session.exec(  # type: ignore[call-overload]
+        update(Blob)
+        .where(col(Blob.storage_key) == digest.key)
+        .values(ref_count=col(Blob.ref_count) + 1)
+    )
+    if result.rowcount:
+        logger.info(f"Reusing stored file {digest.key}")
+        return StoredFile(
+            digest.key, storage.public_url(digest.key), digest.size, digest.sha256
+        )
+    stored = await storage.save_upload(file, folder, digest.sha256)
+    session.add(
+        Blob(storage_key=stored.key, sha256=stored.sha256, size=stored.size, ref_count=1)
+    )
+    return stored
+
+
+async def referenced_keys(session: AsyncSession, keys: Iterable[str]) -> set[str]:
+    """Keys among `keys` of blobs that still have references."""
+    statement = select(Blob.storage_key).where(
+        col(Blob.storage_key).in_(list(keys)), col(Blob.ref_count) > 0
+    )
+    return set((await session.exec(statement)).all())
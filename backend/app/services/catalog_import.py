@@ -0,0 +1,384 @@
+"""
+Bulk catalog import through a staging table.
+
+An uploaded CSV or NDJSON file is streamed into a temporary staging table with
+COPY, then checked and merged into `item` and `image` by a handful of
+set-based statements, all in one transaction: either every valid row is
+imported or, if the import fails, none is. Rows that break a rule (the same
+rules as ItemCreate, e.g. a variant must name its original) are skipped and
+recorded in CatalogImportError. Progress is written to the CatalogImport row
+from a separate session, so it can be read while the import runs.
+
+File columns (all optional except title): ref, title, description, model,
+certificate, is_original, variant_of, image_urls. `variant_of` is the id of an
+existing item or the `ref` of another row of the file; `image_urls` is a list
+(NDJSON) or `|`-separated URLs (CSV), as in the catalog export.
+
+Usage: python -m app.services.catalog_import FILE --owner EMAIL [--producer ID]
+"""
+import argparse
+import csv
+import json
+import logging
+import uuid
+from collections.abc import Iterator
+from datetime import datetime
+from pathlib import Path
+from typing import Any, TextIO
+
+from sqlalchemy import (
+    String,
+    Uuid,
+    column,
+    func,
+    insert,
+    literal,
+    literal_column,
+    table,
+    text,
+    true,
+    update,
+)
+from sqlalchemy.sql import Select
+from sqlmodel import Session, col, select
+
+from app.core.config import CatalogFormat
+from app.core.db import engine
+from app.core.storage import storage_key_expression
+from app.models import CatalogImport, Item, ItemImage, Producer, User
+from app.services import blobs
+from app.services.export import CSV_LIST_SEPARATOR
+
+logger = logging.getLogger(__name__)
+
+STAGING_TABLE = "catalog_import_staging"
+
+FILE_FIELDS = (
+    "ref",
+    "title",
+    "description",
+    "model",
+    "certificate",
+    "is_original",
+    "variant_of",
+    "image_urls",
+)
+COPY_COLUMNS = ("row_number", *FILE_FIELDS, "error")
+
+# rows_loaded is updated every this many rows while the file is copied
+PROGRESS_EVERY = 10_000
+
+# Text columns as read from the file, plus the outcome of the checks
+_CREATE_STAGING = f"""
+CREATE TEMPORARY TABLE {STAGING_TABLE} (
+    row_number integer PRIMARY KEY,
+    {", ".join(f"{name} text" for name in FILE_FIELDS)},
+    error text,
+    item_id uuid NOT NULL DEFAULT gen_random_uuid(),
+    original boolean,
+    variant_item_id uuid
+) ON COMMIT DROP
+"""
+
+# Built after COPY, which is faster into a table without indexes
+_INDEX_STAGING = (
+    f"CREATE INDEX ON {STAGING_TABLE} (ref)",
+    f"CREATE INDEX ON {STAGING_TABLE} (item_id)",
+    # Temporary tables are not analyzed automatically
+    f"ANALYZE {STAGING_TABLE}",
+)
+
+# Checks run in order; a row keeps the first error it hits
+_CHECKS = (
+    # Rules of ItemCreate and of the item and image columns
+    f"""
+    UPDATE {STAGING_TABLE} SET error = CASE
+        WHEN coalesce(btrim(title), '') = '' THEN 'title is required'
+        WHEN length(title) > 255 THEN 'title is longer than 255 characters'
+        WHEN length(description) > 255 THEN 'description is longer than 255 characters'
+        WHEN lower(coalesce(is_original, '')) NOT IN ('', 'true', 'false', '1', '0')
+            THEN 'is_original must be true or false'
+        WHEN lower(is_original) IN ('false', '0') AND coalesce(variant_of, '') = ''
+            THEN 'variant_of must be provided when is_original is false'
+        WHEN EXISTS (
+            SELECT FROM unnest(string_to_array(image_urls, '{CSV_LIST_SEPARATOR}')) AS url
+            WHERE length(url) > 500
+        ) THEN 'image URLs must be at most 500 characters'
+    END
+    WHERE error IS NULL
+    """,
+    f"""
+    UPDATE {STAGING_TABLE} AS s SET error = 'ref is used by an earlier row'
+    FROM {STAGING_TABLE} AS earlier
+    WHERE s.error IS NULL AND earlier.ref = s.ref AND earlier.row_number < s.row_number
+    """,
+    # variant_of names a row of the file first, then an existing item
+    f"""
+    UPDATE {STAGING_TABLE} AS s SET
+        original = lower(coalesce(s.is_original, '')) NOT IN ('false', '0'),
+        variant_item_id = coalesce(
+            (SELECT r.item_id FROM {STAGING_TABLE} AS r
+             WHERE r.ref = s.variant_of ORDER BY r.row_number LIMIT 1),
+            (SELECT i.id FROM item AS i
+             WHERE s.variant_of ~* '^[0-9a-f]{{8}}-([0-9a-f]{{4}}-){{3}}[0-9a-f]{{12}}$'
+             AND i.id = s.variant_of::uuid)
+        )
+    WHERE s.error IS NULL
+    """,
+    f"""
+    UPDATE {STAGING_TABLE} SET error = 'variant_of matches no item and no ref of the file'
+    WHERE error IS NULL AND coalesce(variant_of, '') <> '' AND variant_item_id IS NULL
+    """,
+)
+
+# Repeated until no row changes: variants of rejected rows are rejected too
+_REJECT_VARIANTS_OF_REJECTED = f"""
+UPDATE {STAGING_TABLE} AS s SET error = 'variant_of refers to a rejected row'
+FROM {STAGING_TABLE} AS r
+WHERE s.error IS NULL AND r.error IS NOT NULL AND s.variant_item_id = r.item_id
+"""
+
+_staging = table(
+    STAGING_TABLE,
+    column("row_number"),
+    column("title", String),
+    column("description", String),
+    column("model", String),
+    column("certificate", String),
+    column("image_urls", String),
+    column("error", String),
+    column("item_id", Uuid),
+    column("original"),
+    column("variant_item_id", Uuid),
+)
+
+
+def _text(value: Any) -> str | None:
+    if value is None or value == "":
+        return None
+    if isinstance(value, bool):
+        return "true" if value else "false"
+    if isinstance(value, list):
+        return CSV_LIST_SEPARATOR.join(str(v) for v in value)
+    return str(value)
+
+
+def read_rows(file: TextIO, format: CatalogFormat) -> Iterator[tuple[Any, ...]]:
+    """Staging rows (COPY_COLUMNS) of a file, one per data row."""
+    if format is CatalogFormat.CSV:
+        for number, record in enumerate(csv.DictReader(file), 1):
+            yield (number, *(_text(record.get(f)) for f in FILE_FIELDS), None)
+        return
+    number = 0
+    for line in file:
+        if not line.strip():
+            continue
+        number += 1
+        try:
+            document = json.loads(line)
+        except json.JSONDecodeError:
+            document = None
+        if not isinstance(document, dict):
+            yield (number, *(None for _ in FILE_FIELDS), "line is not a JSON object")
+            continue
+        yield (number, *(_text(document.get(f)) for f in FILE_FIELDS), None)
+
+
+def _set_progress(import_id: uuid.UUID, **values: Any) -> None:
+    with Session(engine) as session:
+        session.exec(  # type: ignore[call-overload]
+            update(CatalogImport).where(col(CatalogImport.id) == import_id).values(**values)
+        )
+        session.commit()
+
+
+def _copy_into_staging(session: Session, import_id: uuid.UUID, rows: Iterator[tuple[Any, ...]]) -> int:
+    driver_connection = session.connection().connection.driver_connection
+    loaded = 0
+    with driver_connection.cursor() as cursor:  # type: ignore[union-attr]
+        with cursor.copy(
+            f"COPY {STAGING_TABLE} ({', '.join(COPY_COLUMNS)}) FROM STDIN"
+        ) as copy:
+            for row in rows:
+                copy.write_row(row)
+                loaded += 1
+                if loaded % PROGRESS_EVERY == 0:
+                    _set_progress(import_id, rows_loaded=loaded)
+    return loaded
+
+
+def _merge(session: Session, catalog_import: CatalogImport) -> tuple[int, int]:
+    """Insert the accepted staging rows as items and images."""
+    now = func.timezone("utc", func.now())
+    # Keep the file order in the gallery, which sorts by created_at
+    created_at = now + _staging.c.row_number * literal_column("interval '1 microsecond'")
+    accepted = _staging.c.error.is_(None)
+    items: Select[Any] = select(  # type: ignore[call-overload]
+        _staging.c.item_id,
+        _staging.c.title,
+        _staging.c.description,
+        _staging.c.model,
+        _staging.c.certificate,
+        _staging.c.original,
+        _staging.c.variant_item_id,
+        literal(catalog_import.owner_id, Uuid),
+        literal(catalog_import.producer_id, Uuid),
+        created_at,
+    ).where(accepted)
+    urls = (
+        func.unnest(func.string_to_array(_staging.c.image_urls, CSV_LIST_SEPARATOR))
+        .table_valued("path", with_ordinality="position")
+        .render_derived(name="urls")
+    )
+    images: Select[Any] = (
+        select(  # type: ignore[call-overload]
+            func.gen_random_uuid(),
+            urls.c.path,
+            # Filename without directory and extension, as for uploads
+            func.left(func.regexp_replace(urls.c.path, r"^.*/|\.[^.]*$", "", "g"), 255),
+            _staging.c.item_id,
+            created_at + urls.c.position * literal_column("interval '1 microsecond'"),
+            # URLs of files in our storage are kept as keys, others as they are
+            storage_key_expression(urls.c.path).label("storage_key"),
+        )
+        .select_from(_staging)
+        .join(urls, true())
+        .where(accepted, urls.c.path != "")
+    )
+    # The driver reports no row count for INSERT ... SELECT, so count first
+    item_count = session.scalar(select(func.count()).select_from(items.subquery())) or 0
+    image_count = session.scalar(select(func.count()).select_from(images.subquery())) or 0
+    session.execute(
+        insert(Item).from_select(
+            [
+                "id", "title", "description", "model", "certificate", "is_original",
+                "variant_of", "owner_id", "producer_id", "created_at",
+            ],
+            items,
+        )
+    )
+    session.execute(
+        insert(ItemImage).from_select(
+            ["id", "path", "name", "item_id", "created_at", "storage_key"], images
+        )
+    )
+    # Images of files uploaded here reference their blobs
+    session.execute(blobs.acquire_statement(select(images.subquery().c.storage_key)))
+    return item_count, image_count
+
+
+def run_import(import_id: uuid.UUID, path: Path) -> None:
+    """Import the file at `path` for an existing, pending CatalogImport."""
+    with Session(engine) as session:
+        catalog_import = session.get(CatalogImport, import_id)
+        if catalog_import is None:
+            raise ValueError(f"Catalog import {import_id} not found")
+        _set_progress(import_id, status="loading")
+        try:
+            session.execute(text(_CREATE_STAGING))
+            with path.open(newline="", encoding="utf-8") as file:
+                loaded = _copy_into_staging(
+                    session, import_id, read_rows(file, CatalogFormat(catalog_import.format))
+                )
+            _set_progress(import_id, status="merging", rows_loaded=loaded)
+            for statement in (*_INDEX_STAGING, *_CHECKS):
+                session.execute(text(statement))
+            while session.execute(text(_REJECT_VARIANTS_OF_REJECTED)).rowcount:  # type: ignore[attr-defined]
+                pass
+            errors = session.execute(
+                text(
+                    f"INSERT INTO catalogimporterror (import_id, row_number, message) "
+                    f"SELECT :import_id, row_number, left(error, 255) FROM {STAGING_TABLE} "
+                    f"WHERE error IS NOT NULL"
+                ),
+                {"import_id": import_id},
+            ).rowcount  # type: ignore[attr-defined]
+            items, images = _merge(session, catalog_import)
+            catalog_import.sqlmodel_update(
+                {
+                    "status": "completed",
+                    "rows_loaded": loaded,
+                    "items_created": items,
+                    "images_created": images,
+                    "error_count": errors,
+                    "finished_at": datetime.utcnow(),
+                }
+            )
+            session.add(catalog_import)
+            session.commit()
+        except Exception as e:
+            session.rollback()
+            logger.exception(f"Catalog import {import_id} failed")
+            _set_progress(
+                import_id,
+                status="failed",
+                error_message=str(e)[:1000],
+                finished_at=datetime.utcnow(),
+            )
+            return
+    logger.info(
+        f"Catalog import {import_id}: {loaded} rows, {items} items and "
+        f"{images} images created, {errors} rows rejected"
+    )
+
+
+def create_import(
+    session: Session,
+    *,
+    filename: str,
+    format: CatalogFormat,
+    owner_id: uuid.UUID,
+    producer_id: uuid.UUID | None,
+) -> CatalogImport:
+    catalog_import = CatalogImport(
+        filename=filename[:255],
+        format=format.value,
+        status="pending",
+        owner_id=owner_id,
+        producer_id=producer_id,
+    )
+    session.add(catalog_import)
+    session.commit()
+    session.refresh(catalog_import)
+    return catalog_import
+
+
+def format_of(filename: str) -> CatalogFormat | None:
+    suffix = Path(filename).suffix.lower()
+    if suffix == ".csv":
+        return CatalogFormat.CSV
+    if suffix in (".ndjson", ".jsonl"):
+        return CatalogFormat.NDJSON
+    return None
+
+
+def main() -> None:
+    logging.basicConfig(level=logging.INFO)
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("file", type=Path)
+    parser.add_argument("--owner", required=True, help="email of the items' owner")
+    parser.add_argument("--producer", type=uuid.UUID, help="producer of the items")
+    parser.add_argument("--format", type=CatalogFormat, choices=list(CatalogFormat))
+    args = parser.parse_args()
+
+    format = args.format or format_of(args.file.name)
+    if format is None:
+        parser.error("cannot tell the format from the file name, pass --format")
+    with Session(engine) as session:
+        owner = session.exec(select(User).where(User.email == args.owner)).first()
+        if owner is None:
+            parser.error(f"no user with email {args.owner}")
+        if args.producer and session.get(Producer, args.producer) is None:
+            parser.error(f"no producer with id {args.producer}")
+        catalog_import = create_import(
+            session,
+            filename=args.file.name,
+            format=format,
+            owner_id=owner.id,
+            producer_id=args.producer,
+        )
+    run_import(catalog_import.id, args.file)
+
+
+if __name__ == "__main__":
+    main()
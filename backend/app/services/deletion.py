@@ -0,0 +1,107 @@
+"""
+Set-based deletion of users and producers with everything they own.
+
+Deleting through the ORM (`session.delete`) loads every relationship of the
+deleted row first, and walking a user's items issued one query per item. These
+routines instead run a fixed handful of `DELETE ... WHERE ... IN (subquery)`
+statements, whatever the number of rows involved:
+
+- the stored files of the deleted images are queued for deletion with one
+  `INSERT ... SELECT` into the storage task outbox, in the same transaction,
+  with the variants of item images, and their blobs released (see
+  app.services.blobs);
+- the items of a deleted producer made by other users are kept and lose their
+  producer;
+- the producer's reviews and images, the user's items and their images go with
+  them.
+
+Each table is deleted from explicitly rather than through `ON DELETE CASCADE`,
+so the response and count caches see every table that changed. The caller
+commits, then wakes the storage worker.
+"""
+import uuid
+from typing import Any
+
+from sqlalchemy import Executable, func, union_all
+from sqlalchemy.sql import Select
+from sqlmodel import col, delete, select, update
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from app.models import Item, ItemImage, Producer, ProducerImage, Review, User
+from app.services import blobs, storage_tasks
+
+
+async def _run(session: AsyncSession, statements: list[Executable]) -> None:
+    for statement in statements:
+        await session.exec(  # type: ignore[call-overload]
+            statement, execution_options={"synchronize_session": False}
+        )
+
+
+def _stored_keys(
+    image: type[ItemImage] | type[ProducerImage], *where: Any
+) -> Select[Any]:
+    # Images without a key are not in our storage: nothing to delete
+    return select(image.storage_key).where(
+        col(image.storage_key).is_not(None), *where
+    )
+
+
+async def _release_files(session: AsyncSession, paths: Any) -> None:
+    await storage_tasks.enqueue_deletions_from(session, paths)
+    await blobs.release_from(session, paths)
+
+
+def _variant_keys(images: Select[Any]) -> Select[Any]:
+    # One row per recorded variant of the selected item images
+    return images.with_only_columns(
+        func.jsonb_array_elements(ItemImage.variants).op("->>")("key")
+    )
+
+
+def _delete_producers(producer_ids: Select[Any]) -> list[Executable]:
+    return [
+        update(Item)
+        .where(col(Item.producer_id).in_(producer_ids))
+        .values(producer_id=None),
+        delete(Review).where(col(Review.producer_id).in_(producer_ids)),
+        delete(ProducerImage).where(col(ProducerImage.producer_id).in_(producer_ids)),
+        delete(Producer).where(col(Producer.id).in_(producer_ids)),
+    ]
+
+
+async def delete_producer(session: AsyncSession, producer_id: uuid.UUID) -> None:
+    """Delete a producer, its images and reviews, and queue its image files."""
+    producer_ids: Select[Any] = select(Producer.id).where(Producer.id == producer_id)
+    await _release_files(
+        session, _stored_keys(ProducerImage, ProducerImage.producer_id == producer_id)
+    )
+    await _run(session, _delete_producers(producer_ids))
+
+
+async def delete_user(session: AsyncSession, user_id: uuid.UUID) -> None:
+    """Delete a user, its items and producer profile, and queue their files."""
+    item_ids: Select[Any] = select(Item.id).where(Item.owner_id == user_id)
+    producer_ids: Select[Any] = select(Producer.id).where(Producer.user_id == user_id)
+    item_images = _stored_keys(ItemImage, Item.owner_id == user_id).join(
+        Item, col(ItemImage.item_id) == Item.id
+    )
+    await _release_files(
+        session,
+        union_all(
+            item_images,
+            _variant_keys(item_images),
+            _stored_keys(ProducerImage, Producer.user_id == user_id).join(
+                Producer, col(ProducerImage.producer_id) == Producer.id
+            ),
+        ),
+    )
+    await _run(
+        session,
+        [
+            delete(ItemImage).where(col(ItemImage.item_id).in_(item_ids)),
+            delete(Item).where(col(Item.owner_id) == user_id),
+            *_delete_producers(producer_ids),
+            delete(User).where(col(User.id) == user_id),
+        ],
+    )
@@ -0,0 +1,150 @@
+"""
+Streaming export of the item catalog.
+
+All items are read with one query over a server-side cursor (`yield_per`), so
+the export starts sending rows right away and holds only one batch in memory,
+however large the catalog is. Image URLs are aggregated per item and the
+producer is joined in the same query, with the same fields as ItemPublic.
+"""
+import csv
+import io
+from collections.abc import Iterable, Iterator
+from datetime import datetime
+from typing import Any
+
+from sqlalchemy import String, func
+from sqlalchemy.dialects.postgresql import ARRAY
+from sqlalchemy.engine import RowMapping
+from sqlalchemy.sql import Select
+from sqlmodel import Session, col, select
+
+from app.core.config import CatalogFormat
+from app.core.db import engine
+from app.core.serialization import dump_json
+from app.core.storage import public_url_expression
+from app.models import Item, ItemImage, Producer, ProducerImage
+
+# Rows fetched from the server-side cursor at a time
+BATCH_SIZE = 1_000
+
+EXPORT_FIELDS = (
+    "id",
+    "title",
+    "description",
+    "model",
+    "certificate",
+    "is_original",
+    "variant_of",
+    "owner_id",
+    "producer_id",
+    "producer_name",
+    "producer_location",
+    "producer_logo_url",
+    "image_urls",
+    "created_at",
+)
+
+MEDIA_TYPES = {
+    CatalogFormat.NDJSON: "application/x-ndjson",
+    CatalogFormat.CSV: "text/csv",
+}
+
+# Separates image URLs within a CSV cell
+CSV_LIST_SEPARATOR = "|"
+
+
+def export_statement() -> Select[Any]:
+    """All items in gallery order, one row each, with producer and image URLs."""
+    image_urls = func.array(
+        select(public_url_expression(col(ItemImage.path), col(ItemImage.storage_key)))
+        .where(ItemImage.item_id == Item.id)
+        .order_by(col(ItemImage.created_at), col(ItemImage.id))
+        .scalar_subquery(),
+        type_=ARRAY(String),
+    )
+    logo = (
+        select(
+            public_url_expression(col(ProducerImage.path), col(ProducerImage.storage_key))
+        )
+        .where(
+            ProducerImage.producer_id == Item.producer_id,
+            ProducerImage.image_type == "logo",
+        )
+        .order_by(col(ProducerImage.created_at), col(ProducerImage.id))
+        .limit(1)
+        .scalar_subquery()
+    )
+    statement: Select[Any] = (
+        select(  # type: ignore[call-overload, misc]
+            Item.id,
+            Item.title,
+            Item.description,
+            Item.model,
+            Item.certificate,
+            Item.is_original,
+            Item.variant_of,
+            Item.owner_id,
+            Item.producer_id,
+            col(Producer.name).label("producer_name"),
+            col(Producer.location).label("producer_location"),
+            func.coalesce(func.nullif(Producer.logo_url, ""), logo).label(
+                "producer_logo_url"
+            ),
+            image_urls.label("image_urls"),
+            Item.created_at,
+        )
+        .select_from(Item)
+        .outerjoin(Producer, col(Producer.id) == Item.producer_id)
+        .order_by(col(Item.created_at), col(Item.id))
+    )
+    return statement
+
+
+def iter_export_rows(batch_size: int = BATCH_SIZE) -> Iterator[RowMapping]:
+    """
+    Rows of `export_statement()`, streamed from the database.
+
+    Uses its own session: the export outlives the request's session, which is
+    closed once the endpoint returns the streaming response.
+    """
+    with Session(engine) as session:
+        result = session.execute(
+            export_statement().execution_options(yield_per=batch_size)
+        )
+        yield from result.mappings()
+
+
+def ndjson_lines(rows: Iterable[RowMapping]) -> Iterator[bytes]:
+    for row in rows:
+        yield dump_json(dict(row)) + b"\n"
+
+
+def _csv_value(value: Any) -> Any:
+    if isinstance(value, list):
+        return CSV_LIST_SEPARATOR.join(value)
+    if isinstance(value, datetime):
+        return value.isoformat()
+    return value
+
+
+def csv_lines(rows: Iterable[RowMapping]) -> Iterator[str]:
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(EXPORT_FIELDS)
+    for row in rows:
+        writer.writerow([_csv_value(row[field]) for field in EXPORT_FIELDS])
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+    # Header of an empty export
+    if buffer.tell():
+        yield buffer.getvalue()
+
+
+def export_lines(
+    format: CatalogFormat, batch_size: int = BATCH_SIZE
+) -> Iterator[bytes] | Iterator[str]:
+    rows = iter_export_rows(batch_size)
+    if format is CatalogFormat.CSV:
+        return csv_lines(rows)
+    return ndjson_lines(rows)
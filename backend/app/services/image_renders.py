@@ -0,0 +1,285 @@
+"""
+Images resized on request, cached on local disk.
+
+`GET /images/{id}/render` resizes an image's stored original to fit a width
+and/or height, in the requested format, for uses the pre-made variants do not
+cover (app.services.image_variants). Widths and heights are rounded up to one of
+IMAGE_RENDER_SIZES (`snap`), so each image has a bounded number of renders.
+Rendering runs in the variants' process pool; the result is kept in a
+RenderCache, a least recently used cache of files in IMAGE_RENDER_CACHE_DIR
+bounded to IMAGE_RENDER_CACHE_MAX_BYTES.
+
+Renders are named after the stored file's key and the parameters, so images of
+the same content share them, and a render is never stale: keys of stored files
+are never reused for other content. Concurrent requests for a render that is
+not cached yet wait for a single rendering rather than each making their own.
+
+The cache directory is shared by every app process, and is its own index: hits
+touch their file, so modification times order the files by use, and the total
+size is kept in a file next to them. Files are written to a temporary name and
+renamed into place, so a partial file is never read; evictions are made under
+an `fcntl` lock on the directory, one process at a time, from what is on disk.
+A hit is streamed from the file opened by the lookup, which stays readable when
+another process evicts it meanwhile; a fresh render is served from memory.
+"""
+import asyncio
+import contextlib
+import fcntl
+import hashlib
+import io
+import logging
+import os
+import tempfile
+import time
+from collections.abc import Iterator
+from pathlib import Path
+from typing import BinaryIO, Literal, NamedTuple
+
+from PIL import Image
+
+from app.core.config import settings
+from app.core.storage import StorageBackend
+from app.services import image_variants
+
+logger = logging.getLogger(__name__)
+
+RenderFormat = Literal["avif", "webp", "jpeg", "png"]
+
+CHUNK_SIZE = 64 * 1024
+
+_cache: "RenderCache | None" = None
+# Renders being made, by name, awaited by every request for them, with the
+# stat of their cached file
+_in_flight: dict[str, "asyncio.Future[tuple[bytes, os.stat_result]]"] = {}
+
+
+def render_image(
+    content: bytes,
+    width: int | None,
+    height: int | None,
+    format: RenderFormat,
+    quality: int,
+) -> bytes:
+    """Resize an encoded image to fit `width` x `height` and encode it."""
+    image = image_variants.open_image(content, alpha=format != "jpeg")
+    # Keeps the aspect ratio, and never upscales
+    image.thumbnail(
+        (width or image.width, height or image.height), Image.Resampling.LANCZOS
+    )
+    buffer = io.BytesIO()
+    image.save(buffer, format=format.upper(), quality=quality)
+    return buffer.getvalue()
+
+
+class CachedFile(NamedTuple):
+    # Open, so its content can still be read once it is evicted
+    file: BinaryIO
+    # Taken when the file was last used, for the response's headers
+    stat: os.stat_result
+
+    def chunks(self) -> Iterator[bytes]:
+        """The file's content, closing it once read."""
+        with self.file:
+            while chunk := self.file.read(CHUNK_SIZE):
+                yield chunk
+
+
+class RenderCache:
+    """Least recently used cache of files in a directory, bounded in bytes."""
+
+    # Evictions go down to this share of the limit, so the directory is not
+    # scanned again on the next miss
+    LOW_WATER = 0.9
+    # Partial files older than this were left by interrupted writes
+    PARTIAL_FILE_SECONDS = 3600
+
+    def __init__(self, directory: Path, max_bytes: int) -> None:
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self._lock_path = directory / ".lock"
+        # Total size of the files, as counted by the processes using them
+        self._size_path = directory / ".size"
+
+    def path(self, name: str) -> Path:
+        return self.directory / name[:2] / name
+
+    def get(self, name: str) -> CachedFile | None:
+        """
+        A cached file, opened and marked as the most recently used, or None.
+
+        The caller closes the file (`CachedFile.chunks` does once read).
+        """
+        try:
+            file = open(self.path(name), "rb")
+        except FileNotFoundError:
+            return None
+        try:
+            # Touched through the open file, which another process may unlink
+            os.utime(file.fileno())
+            return CachedFile(file, os.fstat(file.fileno()))
+        except BaseException:
+            file.close()
+            raise
+
+    def put(self, name: str, content: bytes) -> os.stat_result:
+        """
+        Store a file atomically, evicting the least recently used ones.
+
+        Returns the stat of the stored file.
+        """
+        path = self.path(name)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        fd, partial_path = tempfile.mkstemp(dir=path.parent, suffix=".part")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(content)
+                f.flush()
+                stat = os.fstat(f.fileno())
+            os.replace(partial_path, path)
+        except BaseException:
+            with contextlib.suppress(FileNotFoundError):
+                os.unlink(partial_path)
+            raise
+        with self._locked():
+            size = self._read_size()
+            if size is None or size + len(content) > self.max_bytes:
+                self._evict(keep=path)
+            else:
+                self._write_size(size + len(content))
+        return stat
+
+    def size(self) -> int:
+        """Total size of the cached files, from the directory."""
+        with self._locked():
+            return sum(size for _, size, _ in self._scan())
+
+    @contextlib.contextmanager
+    def _locked(self) -> Iterator[None]:
+        self.directory.mkdir(parents=True, exist_ok=True)
+        with open(self._lock_path, "wb") as lock:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+            yield
+
+    def _read_size(self) -> int | None:
+        try:
+            return int(self._size_path.read_text())
+        except (FileNotFoundError, ValueError):
+            return None
+
+    def _write_size(self, size: int) -> None:
+        self._size_path.write_text(str(size))
+
+    def _scan(self) -> list[tuple[float, int, Path]]:
+        """Cached files as (last used, size, path), least recently used first."""
+        files = []
+        stale = time.time() - self.PARTIAL_FILE_SECONDS
+        for path in self.directory.glob("*/*"):
+            with contextlib.suppress(FileNotFoundError):
+                stat = path.stat()
+                if path.suffix != ".part":
+                    files.append((stat.st_mtime, stat.st_size, path))
+                elif stat.st_mtime < stale:
+                    path.unlink()
+        return sorted(files)
+
+    def _evict(self, keep: Path) -> None:
+        # Holding the lock; `keep`, just written, stays even when it alone is
+        # over the limit
+        files = self._scan()
+        size = sum(file_size for _, file_size, _ in files)
+        target = self.max_bytes * self.LOW_WATER if size > self.max_bytes else size
+        for _, file_size, path in files:
+            if size <= target:
+                break
+            if path != keep:
+                with contextlib.suppress(FileNotFoundError):
+                    path.unlink()
+                size -= file_size
+        self._write_size(size)
+
+
+def get_render_cache() -> RenderCache:
+    global _cache
+    if _cache is None:
+        _cache = RenderCache(
+            settings.IMAGE_RENDER_CACHE_DIR, settings.IMAGE_RENDER_CACHE_MAX_BYTES
+        )
+    return _cache
+
+
+def set_render_cache(cache: RenderCache | None) -> None:
+    """Replace the process's cache (None makes it again on next use)."""
+    global _cache
+    _cache = cache
+
+
+def snap(size: int | None) -> int | None:
+    """The smallest of IMAGE_RENDER_SIZES at least `size`, or the largest."""
+    if size is None:
+        return None
+    sizes = sorted(settings.IMAGE_RENDER_SIZES)
+    return next((step for step in sizes if step >= size), sizes[-1])
+
+
+def render_name(
+    source: str, width: int | None, height: int | None, format: RenderFormat
+) -> str:
+    """Cache file name of a render of the stored file `source`."""
+    quality = settings.IMAGE_VARIANT_QUALITY
+    digest = hashlib.sha256(f"{source}|{width}|{height}|{quality}".encode()).hexdigest()
+    return f"{digest}.{format}"
+
+
+async def _render(
+    storage: StorageBackend,
+    source: str,
+    name: str,
+    width: int | None,
+    height: int | None,
+    format: RenderFormat,
+) -> tuple[bytes, os.stat_result]:
+    content = b"".join([chunk async for chunk in storage.open_range(source)])
+    rendered = await asyncio.get_running_loop().run_in_executor(
+        image_variants.get_pool(),
+        render_image,
+        content,
+        width,
+        height,
+        format,
+        settings.IMAGE_VARIANT_QUALITY,
+    )
+    stat = await asyncio.to_thread(get_render_cache().put, name, rendered)
+    logger.info(f"Rendered {source} as {name}")
+    return rendered, stat
+
+
+async def rendered_file(
+    storage: StorageBackend,
+    source: str,
+    width: int | None,
+    height: int | None,
+    format: RenderFormat,
+) -> CachedFile:
+    """
+    A render of the stored file `source`, made if it is not cached.
+
+    Hits are read from the cached file, and fresh renders from memory: either
+    way the caller gets the whole content, even if the file is evicted before
+    it is read. Raises FileNotFoundError if the stored file is missing, and PIL's
+    UnidentifiedImageError or DecompressionBombError if it is not an image, or
+    too large a one.
+    """
+    name = render_name(source, width, height, format)
+    cached = await asyncio.to_thread(get_render_cache().get, name)
+    if cached is not None:
+        return cached
+    future = _in_flight.get(name)
+    if future is None:
+        future = asyncio.ensure_future(
+            _render(storage, source, name, width, height, format)
+        )
+        _in_flight[name] = future
+        future.add_done_callback(lambda _: _in_flight.pop(name, None))
+    # Shielded: a client going away does not cancel the render for the others
+    content, stat = await asyncio.shield(future)
+    return CachedFile(io.BytesIO(content), stat)
@@ -0,0 +1,225 @@
+"""
+Resized copies of item images, for responsive `srcset`s.
+
+After an item image is uploaded, `make_image_variants` reads the original back
+from storage and renders it at each of IMAGE_VARIANT_WIDTHS (capped to the
+original's width), in each of IMAGE_VARIANT_FORMATS. Decoding and encoding
+take from tens of milliseconds to seconds of CPU per image (AVIF especially),
+so `render_variants` runs in a pool of IMAGE_VARIANT_PROCESSES processes: on the
+event loop, or in a thread holding the GIL, it would stall every request.
+
+The variants are stored next to the original (app.services.blobs.variant_key)
+and recorded on the image row. An image uploaded again with the same content
+copies the variants already made for it. ImagePublic, ItemPublic and ItemCard
+list them with their public URLs (app.core.serialization.variant_records);
+images stored elsewhere get none, and clients fall back to the original.
+
+Usage: python -m app.services.image_variants [--all] [--concurrency N]
+  (makes the variants of the images without any, or of every image with --all)
+"""
+import argparse
+import asyncio
+import io
+import logging
+import multiprocessing
+import uuid
+from collections.abc import AsyncIterator, Sequence
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+from typing import Any, NamedTuple
+
+from PIL import Image, ImageOps
+from sqlmodel import col, select, update
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from app.core.config import settings
+from app.core.db import async_engine
+from app.core.storage import StorageBackend, close_storage, get_storage
+from app.models import ItemImage
+from app.services import blobs, storage_tasks
+
+logger = logging.getLogger(__name__)
+
+_pool: ProcessPoolExecutor | None = None
+
+
+class RenderedVariant(NamedTuple):
+    width: int
+    height: int
+    format: str
+    content: bytes
+
+
+def open_image(content: bytes, *, alpha: bool = True) -> Image.Image:
+    """Decode an image upright, in RGB or (with `alpha`, if it has any) RGBA."""
+    with Image.open(io.BytesIO(content)) as original:
+        image = ImageOps.exif_transpose(original)
+    return image.convert("RGBA" if alpha and image.has_transparency_data else "RGB")
+
+
+def render_variants(
+    content: bytes, widths: Sequence[int], formats: Sequence[str], quality: int
+) -> list[RenderedVariant]:
+    """Resize an encoded image to each width and encode it in each format."""
+    image = open_image(content)
+    # Never upscaled: wider variants are made at the original's width
+    sizes = sorted({min(width, image.width) for width in widths})
+    rendered = []
+    for width in sizes:
+        height = max(1, round(image.height * width / image.width))
+        resized = image
+        if width != image.width:
+            resized = image.resize((width, height), Image.Resampling.LANCZOS)
+        for format in formats:
+            buffer = io.BytesIO()
+            resized.save(buffer, format=format.upper(), quality=quality)
+            rendered.append(RenderedVariant(width, height, format, buffer.getvalue()))
+    return rendered
+
+
+def get_pool() -> ProcessPoolExecutor:
+    global _pool
+    if _pool is None:
+        # Spawned: forking a process that runs threads can deadlock the child
+        _pool = ProcessPoolExecutor(
+            settings.IMAGE_VARIANT_PROCESSES,
+            mp_context=multiprocessing.get_context("spawn"),
+        )
+    return _pool
+
+
+def shutdown_pool() -> None:
+    """Cancel pending renders and let the pool stop, without waiting for it."""
+    global _pool
+    if _pool is not None:
+        _pool.shutdown(wait=False, cancel_futures=True)
+        _pool = None
+
+
+async def _content(content: bytes) -> AsyncIterator[bytes]:
+    yield content
+
+
+def variant_keys(image: Any) -> list[str]:
+    """Storage keys of the recorded variants of an item (or producer) image."""
+    return [variant["key"] for variant in getattr(image, "variants", None) or []]
+
+
+async def make_variants(
+    session: AsyncSession,
+    image: ItemImage,
+    storage: StorageBackend,
+    *,
+    reuse: bool = True,
+) -> list[dict[str, Any]] | None:
+    """
+    Make, store and record the variants of an image, and commit.
+
+    With `reuse`, the variants of another image of the same content are
+    recorded instead when there is one. Returns None for images stored
+    elsewhere than our storage.
+    """
+    key = image.storage_key
+    if key is None:
+        return None
+    variants: list[dict[str, Any]] | None = None
+    if reuse:
+        statement = (
+            select(ItemImage.variants)
+            .where(
+                ItemImage.storage_key == key,
+                ItemImage.id != image.id,
+                col(ItemImage.variants).is_not(None),
+            )
+            .limit(1)
+        )
+        copied = (await session.exec(statement)).first()
+        variants = list(copied) if copied is not None else None
+    if variants is None:
+        content = b"".join([chunk async for chunk in storage.open_range(key)])
+        rendered = await asyncio.get_running_loop().run_in_executor(
+            get_pool(),
+            render_variants,
+            content,
+            settings.IMAGE_VARIANT_WIDTHS,
+            settings.IMAGE_VARIANT_FORMATS,
+            settings.IMAGE_VARIANT_QUALITY,
+        )
+        variants = []
+        for variant in rendered:
+            variant_key = blobs.variant_key(key, variant.width, variant.format)
+            await storage.put_stream(
+                variant_key, partial(_content, variant.content), len(variant.content)
+            )
+            variants.append(
+                {
+                    "key": variant_key,
+                    "width": variant.width,
+                    "height": variant.height,
+                    "format": variant.format,
+                }
+            )
+    result = await session.exec(  # type: ignore[call-overload]
+        update(ItemImage).where(col(ItemImage.id) == image.id).values(variants=variants)
+    )
+    if not result.rowcount:
+        # Deleted meanwhile: the variants go the way of the original
+        storage_tasks.enqueue_deletions(session, [variant["key"] for variant in variants])
+    await session.commit()
+    return variants
+
+
+async def make_image_variants(image_id: uuid.UUID, *, reuse: bool = True) -> bool:
+    """Make the variants of an image in a session of its own; False on failure."""
+    async with AsyncSession(async_engine, expire_on_commit=False) as session:
+        image = await session.get(ItemImage, image_id)
+        if image is None:
+            return False
+        try:
+            await make_variants(session, image, get_storage(), reuse=reuse)
+        except Exception:
+            # Such as files Pillow cannot read; clients use the original
+            logger.exception(f"Could not make the variants of image {image_id}")
+            return False
+    return True
+
+
+async def make_all(regenerate: bool, concurrency: int) -> int:
+    """Make the variants of images without any (or of all), return how many."""
+    statement = select(ItemImage.id).where(col(ItemImage.storage_key).is_not(None))
+    if not regenerate:
+        statement = statement.where(col(ItemImage.variants).is_(None))
+    async with AsyncSession(async_engine) as session:
+        image_ids = (await session.exec(statement.order_by(col(ItemImage.created_at)))).all()
+    # Enough images in flight to keep every process busy while others do I/O
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def make(image_id: uuid.UUID) -> bool:
+        async with semaphore:
+            return await make_image_variants(image_id, reuse=not regenerate)
+
+    try:
+        made = await asyncio.gather(*(make(image_id) for image_id in image_ids))
+    finally:
+        shutdown_pool()
+        await close_storage()
+        await async_engine.dispose()
+    return sum(made)
+
+
+def main() -> None:
+    logging.basicConfig(level=logging.INFO)
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument(
+        "--all", action="store_true", help="make them again for images that have some"
+    )
+    parser.add_argument(
+        "--concurrency", type=int, default=settings.IMAGE_VARIANT_PROCESSES * 2
+    )
+    args = parser.parse_args()
+    made = asyncio.run(make_all(args.all, args.concurrency))
+    logger.info(f"Made the variants of {made} images")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,205 @@
+"""
+Outbox of stored files to delete.
+
+Endpoints that delete rows referencing stored files (items, images, producers,
+users) write one StorageTask per file with `enqueue_deletions`, in the same
+transaction as the rows, and return as soon as it commits: a crash can no
+longer leave rows pointing at deleted files, or files nobody references
+without a task to remove them.
+
+The tasks are carried out by a worker running in each app process, which
+claims due tasks in batches with `FOR UPDATE SKIP LOCKED` (so concurrent
+workers never pick the same task) and leases them: their next attempt is put
+off by LEASE, and the claim committed, before any file is deleted. The files
+are then deleted through the storage backend's `delete_many` outside any
+transaction, skipping files whose blob is referenced again (see
+app.services.blobs), and the outcome is recorded in a second transaction. A
+file that is already gone counts as deleted; tasks of a worker that died
+mid-batch are taken up again when their lease runs out. A failed deletion is retried after STORAGE_TASK_RETRY_SECONDS,
+doubling after each attempt up to an hour; after STORAGE_TASK_MAX_ATTEMPTS the
+task is kept with its last error and no longer retried.
+
+Usage: python -m app.services.storage_tasks  (carries out the due tasks once)
+"""
+import asyncio
+import contextlib
+import logging
+from collections.abc import Iterable
+from datetime import datetime, timedelta
+from typing import Any
+
+from sqlalchemy import CompoundSelect, Select, insert, literal
+from sqlmodel import Session, col, delete, select, update
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from app.core.config import settings
+from app.core.db import async_engine
+from app.core.storage import FILE_NOT_FOUND, DeleteResult, close_storage, get_storage
+from app.models import StorageTask
+from app.services import blobs
+
+logger = logging.getLogger(__name__)
+
+BATCH_SIZE = 100
+MAX_RETRY_DELAY = timedelta(hours=1)
+# How long claimed tasks are left to their worker before others take them up
+LEASE = timedelta(minutes=10)
+
+_wakeup: asyncio.Event | None = None
+_worker: "asyncio.Task[None] | None" = None
+
+
+def enqueue_deletions(session: Session | AsyncSession, paths: Iterable[str]) -> None:
+    """Add a deletion task per path to the session's transaction."""
+    session.add_all([StorageTask(path=path) for path in paths])
+
+
+async def enqueue_deletions_from(
+    session: AsyncSession, paths: "Select[Any] | CompoundSelect[Any]"
+) -> None:
+    """Add a deletion task per row of `paths`, a query of one path column."""
+    now = datetime.utcnow()
+    rows = paths.subquery()
+    statement = insert(StorageTask).from_select(
+        ["path", "attempts", "created_at", "next_attempt_at"],
+        select(rows.c[0], literal(0), literal(now), literal(now)),
+    )
+    await session.exec(statement)  # type: ignore[call-overload]
+
+
+def retry_delay(attempts: int) -> timedelta:
+    """Wait before retrying a task that has failed `attempts` times."""
+    delay = timedelta(seconds=settings.STORAGE_TASK_RETRY_SECONDS * 2 ** (attempts - 1))
+    return min(delay, MAX_RETRY_DELAY)
+
+
+async def _claim(limit: int) -> list[StorageTask]:
+    """Lease up to `limit` due tasks to this worker, and commit."""
+    now = datetime.utcnow()
+    statement = (
+        select(StorageTask)
+        .where(
+            col(StorageTask.next_attempt_at) <= now,
+            col(StorageTask.attempts) < settings.STORAGE_TASK_MAX_ATTEMPTS,
+        )
+        .order_by(col(StorageTask.next_attempt_at))
+        .limit(limit)
+        .with_for_update(skip_locked=True)
+    )
+    async with AsyncSession(async_engine, expire_on_commit=False) as session:
+        tasks = list((await session.exec(statement)).all())
+        if tasks:
+            await session.exec(  # type: ignore[call-overload]
+                update(StorageTask)
+                .where(col(StorageTask.id).in_([task.id for task in tasks]))
+                .values(next_attempt_at=now + LEASE)
+            )
+            await session.commit()
+    return tasks
+
+
+async def _record(
+    tasks: list[StorageTask], results: list[DeleteResult], done: list[int | None]
+) -> None:
+    """Delete the tasks done, and put off the failed ones, in one transaction."""
+    async with AsyncSession(async_engine) as session:
+        for task, result in zip(tasks, results, strict=True):
+            if result.deleted or result.error == FILE_NOT_FOUND:
+                done.append(task.id)
+                continue
+            task.attempts += 1
+            task.last_error = (result.error or "")[:1000]
+            task.next_attempt_at = datetime.utcnow() + retry_delay(task.attempts)
+            session.add(task)
+        if done:
+            await session.exec(  # type: ignore[call-overload]
+                delete(StorageTask).where(col(StorageTask.id).in_(done))
+            )
+        await session.commit()
+
+
+async def process_batch(limit: int = BATCH_SIZE) -> int:
+    """Carry out up to `limit` due tasks and return how many were attempted."""
+    tasks = await _claim(limit)
+    if not tasks:
+        return 0
+    sources = {task.path: blobs.source_key(task.path) for task in tasks}
+    async with async_engine.connect() as connection:
+        # The key locks are held while files are deleted, but no transaction
+        await connection.execution_options(isolation_level="AUTOCOMMIT")
+        async with AsyncSession(connection) as session:
+            # Files referenced again by an upload since they were queued are
+            # kept, with their variants (see app.services.blobs); the locks
+            # hold off such uploads until the files are deleted
+            await session.exec(blobs.lock_statement(sources.values(), until_unlocked=True))
+            try:
+                referenced = await blobs.referenced_keys(session, sources.values())
+                done = [task.id for task in tasks if sources[task.path] in referenced]
+                unreferenced = [
+                    task for task in tasks if sources[task.path] not in referenced
+                ]
+                results = await get_storage().delete_many(
+                    task.path for task in unreferenced
+                )
+                await _record(unreferenced, results, done)
+            finally:
+                await session.exec(blobs.unlock_statement())
+    return len(tasks)
+
+
+def wake() -> None:
+    """Have the worker look for tasks now rather than at its next poll."""
+    if _wakeup is not None:
+        _wakeup.set()
+
+
+async def _run_worker() -> None:
+    global _wakeup
+    _wakeup = asyncio.Event()
+    while True:
+        try:
+            # Full batches mean there may be more due tasks
+            while await process_batch() == BATCH_SIZE:
+                pass
+        except Exception as e:
+            logger.error(f"Failed to process storage tasks: {e}")
+        with contextlib.suppress(asyncio.TimeoutError):
+            await asyncio.wait_for(_wakeup.wait(), settings.STORAGE_TASK_POLL_SECONDS)
+        _wakeup.clear()
+
+
+def start_worker() -> None:
+    """Run the worker in the current event loop until `stop_worker`."""
+    global _worker
+    if _worker is None:
+        _worker = asyncio.create_task(_run_worker())
+
+
+async def stop_worker() -> None:
+    global _worker, _wakeup
+    if _worker is not None:
+        _worker.cancel()
+        with contextlib.suppress(asyncio.CancelledError):
+            await _worker
+        _worker = None
+        _wakeup = None
+
+
+async def _drain() -> int:
+    attempted = 0
+    while (count := await process_batch()) > 0:
+        attempted += count
+        if count < BATCH_SIZE:
+            break
+    await close_storage()
+    await async_engine.dispose()
+    return attempted
+
+
+def main() -> None:
+    logging.basicConfig(level=logging.INFO)
+    logger.info(f"Attempted {asyncio.run(_drain())} storage tasks")
+
+
+if __name__ == "__main__":
+    main()
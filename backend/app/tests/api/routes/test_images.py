@@ -0,0 +1,203 @@
+import asyncio
+import hashlib
+import io
+from datetime import datetime
+from pathlib import Path
+from unittest.mock import patch
+
+from fastapi.testclient import TestClient
+from PIL import Image
+from sqlmodel import Session, select
+
+from app.core.config import settings
+from app.core.db import async_engine
+from app.core.storage import MemoryStorage
+from app.models import Blob, ItemImage, StorageTask
+from app.services.image_renders import RenderCache, set_render_cache
+from app.services.storage_tasks import process_batch
+from app.tests.utils.item import create_random_item
+
+
+async def _process_batch() -> int:
+    try:
+        return await process_batch()
+    finally:
+        await async_engine.dispose()
+
+
+def test_upload_download_and_delete_image(
+    client: TestClient, db: Session, memory_storage: MemoryStorage
+) -> None:
+    item = create_random_item(db)
+    response = client.post(
+        f"{settings.API_V1_STR}/images/{item.id}",
+        files={"file": ("front.webp", b"image", "image/webp")},
+    )
+    assert response.status_code == 200
+    content = response.json()
+    assert content["name"] == "front"
+    key = f"images/item/{hashlib.sha256(b'image').hexdigest()}.webp"
+    assert content["path"] == f"memory://{key}"
+    assert memory_storage.files == {key: b"image"}
+
+    response = client.get(f"{settings.API_V1_STR}/images/download/{content['id']}")
+    assert response.status_code == 200
+    assert response.content == b"image"
+
+    response = client.delete(f"{settings.API_V1_STR}/images/{content['id']}")
+    assert response.status_code == 200
+    assert db.exec(select(ItemImage)).all() == []
+    # Queued by storage key
+    assert db.exec(select(StorageTask.path)).all() == [key]
+    assert db.exec(select(Blob)).all() == []
+
+    assert asyncio.run(_process_batch()) == 1
+    assert memory_storage.files == {}
+
+
+def test_identical_uploads_share_a_file(
+    client: TestClient, db: Session, memory_storage: MemoryStorage
+) -> None:
+    item = create_random_item(db)
+    ids = []
+    for name in ("front", "copy"):
+        response = client.post(
+            f"{settings.API_V1_STR}/images/{item.id}",
+            files={"file": (f"{name}.webp", b"image", "image/webp")},
+        )
+        assert response.status_code == 200
+        ids.append(response.json()["id"])
+    key = f"images/item/{hashlib.sha256(b'image').hexdigest()}.webp"
+    assert memory_storage.files == {key: b"image"}
+    blob = db.exec(select(Blob)).one()
+    assert (blob.storage_key, blob.size, blob.ref_count) == (key, 5, 2)
+
+    # The file stays while an image still uses it
+    client.delete(f"{settings.API_V1_STR}/images/{ids[0]}")
+    assert asyncio.run(_process_batch()) == 1
+    assert memory_storage.files == {key: b"image"}
+    db.refresh(blob)
+    assert blob.ref_count == 1
+
+    client.delete(f"{settings.API_V1_STR}/images/{ids[1]}")
+    db.expire_all()
+    assert db.exec(select(Blob)).all() == []
+    assert asyncio.run(_process_batch()) == 1
+    assert memory_storage.files == {}
+    assert db.exec(select(StorageTask)).all() == []
+
+
+def test_download_missing_image_file(
+    client: TestClient, db: Session, memory_storage: MemoryStorage  # noqa: ARG001
+) -> None:
+    item = create_random_item(db)
+    image = ItemImage(path="memory://images/item/gone.webp", name="gone", item_id=item.id)
+    db.add(image)
+    db.commit()
+
+    response = client.get(f"{settings.API_V1_STR}/images/download/{image.id}")
+    assert response.status_code == 404
+    assert response.json()["detail"] == "File not found"
+
+
+def test_image_urls_are_built_from_storage_keys(
+    client: TestClient, db: Session, memory_storage: MemoryStorage  # noqa: ARG001
+) -> None:
+    item = create_random_item(db)
+    # Stored while the files were served from another host
+    db.add(
+        ItemImage(
+            path="https://old.b-cdn.net/images/item/a.webp",
+            storage_key="images/item/a.webp",
+            name="a",
+            item_id=item.id,
+            created_at=datetime(2026, 1, 1),
+        )
+    )
+    db.add(ItemImage(path="https://example.com/b.webp", name="b", item_id=item.id))
+    db.commit()
+
+    response = client.get(f"{settings.API_V1_STR}/images/item/{item.id}")
+    assert {image["path"] for image in response.json()["data"]} == {
+        "memory://images/item/a.webp",
+        "https://example.com/b.webp",
+    }
+    response = client.get(f"{settings.API_V1_STR}/items/{item.id}")
+    assert response.json()["item"]["image_urls"] == [
+        "memory://images/item/a.webp",
+        "https://example.com/b.webp",
+    ]
+    response = client.get(f"{settings.API_V1_STR}/items/cards")
+    assert response.json()["data"][0]["cover_image_url"] == "memory://images/item/a.webp"
+
+
+@patch.object(settings, "IMAGE_VARIANT_WIDTHS", [16, 32])
+@patch.object(settings, "IMAGE_VARIANT_FORMATS", ["avif", "webp"])
+def test_upload_makes_variants(
+    client: TestClient, db: Session, memory_storage: MemoryStorage
+) -> None:
+    item = create_random_item(db)
+    buffer = io.BytesIO()
+    Image.new("RGB", (64, 48), "teal").save(buffer, format="PNG")
+    response = client.post(
+        f"{settings.API_V1_STR}/images/{item.id}",
+        files={"file": ("front.png", buffer.getvalue(), "image/png")},
+    )
+    assert response.status_code == 200
+    key = f"images/item/{hashlib.sha256(buffer.getvalue()).hexdigest()}.png"
+    variant_keys = [
+        f"{key}.w{width}.{format}" for width in (16, 32) for format in ("avif", "webp")
+    ]
+    # Made by a background task once the response is sent
+    assert sorted(memory_storage.files) == sorted([key, *variant_keys])
+
+    response = client.get(f"{settings.API_V1_STR}/images/item/{item.id}")
+    variants = response.json()["data"][0]["variants"]
+    assert [(v["url"], v["width"], v["height"]) for v in variants] == [
+        (f"memory://{variant_keys[0]}", 16, 12),
+        (f"memory://{variant_keys[1]}", 16, 12),
+        (f"memory://{variant_keys[2]}", 32, 24),
+        (f"memory://{variant_keys[3]}", 32, 24),
+    ]
+    response = client.get(f"{settings.API_V1_STR}/items/{item.id}")
+    assert response.json()["item"]["image_variants"] == [variants]
+    response = client.get(f"{settings.API_V1_STR}/items/cards")
+    assert response.json()["data"][0]["cover_image_variants"] == variants
+
+    # Deleted with the original
+    image_id = db.exec(select(ItemImage.id)).one()
+    client.delete(f"{settings.API_V1_STR}/images/{image_id}")
+    assert sorted(db.exec(select(StorageTask.path)).all()) == sorted([key, *variant_keys])
+    assert asyncio.run(_process_batch()) == 5
+    assert memory_storage.files == {}
+
+
+def test_render_image(
+    client: TestClient, db: Session, memory_storage: MemoryStorage, tmp_path: Path
+) -> None:
+    item = create_random_item(db)
+    buffer = io.BytesIO()
+    Image.new("RGB", (64, 48), "teal").save(buffer, format="PNG")
+    memory_storage.files["images/item/a.png"] = buffer.getvalue()
+    image = ItemImage(path="a", storage_key="images/item/a.png", name="a", item_id=item.id)
+    db.add(image)
+    db.commit()
+
+    set_render_cache(RenderCache(tmp_path, 1024 * 1024))
+    try:
+        url = f"{settings.API_V1_STR}/images/{image.id}/render"
+        response = client.get(url, params={"w": 32, "fmt": "avif"})
+        assert response.status_code == 200
+        assert response.headers["content-type"] == "image/avif"
+        with Image.open(io.BytesIO(response.content)) as rendered:
+            assert rendered.size == (32, 24)
+        # Served from the cache
+        del memory_storage.files["images/item/a.png"]
+        assert client.get(url, params={"w": 32, "fmt": "avif"}).content == response.content
+        # Rounded up to one of the render sizes: the 32 wide render
+        assert client.get(url, params={"w": 20, "fmt": "avif"}).content == response.content
+        assert client.get(url, params={"h": 12}).status_code == 404
+        assert client.get(url, params={"w": 0}).status_code == 422
+        assert client.get(url, params={"w": 4097}).status_code == 422
+    finally:
+        set_render_cache(None)
@@ -0,0 +1,149 @@
+import json
+import uuid
+from typing import Any
+
+from fastapi.testclient import TestClient
+from sqlmodel import Session, col, select
+
+from app.core.config import settings
+from app.models import Item, ItemImage, Producer
+from app.tests.utils.item import create_random_item
+
+
+def _import(
+    client: TestClient, headers: dict[str, str], filename: str, content: str, **data: str
+) -> dict[str, Any]:
+    response = client.post(
+        f"{settings.API_V1_STR}/imports/",
+        headers=headers,
+        files={"file": (filename, content.encode())},
+        data=data,
+    )
+    assert response.status_code == 202
+    # The import runs as a background task, before the test client returns
+    response = client.get(
+        f"{settings.API_V1_STR}/imports/{response.json()['id']}", headers=headers
+    )
+    assert response.status_code == 200
+    result: dict[str, Any] = response.json()
+    return result
+
+
+def test_import_catalog_csv(
+    client: TestClient, superuser_token_headers: dict[str, str], db: Session
+) -> None:
+    existing = create_random_item(db)
+    content = (
+        "ref,title,description,is_original,variant_of,image_urls\n"
+        "vase,Vase,Blue vase,true,,/uploads/images/vase/front.webp|/uploads/images/vase/back.webp\n"
+        "small,Small vase,,false,vase,\n"
+        ",Bad variant,,false,,\n"
+        "tiny,Tiny vase,,false,missing,\n"
+        ",Variant of existing,,0," + str(existing.id) + ",\n"
+        ",,No title,,,\n"
+    )
+    result = _import(client, superuser_token_headers, "catalog.csv", content)
+    assert result["status"] == "completed"
+    assert result["format"] == "csv"
+    assert result["rows_loaded"] == 6
+    assert result["items_created"] == 3
+    assert result["images_created"] == 2
+    assert result["error_count"] == 3
+
+    items = {
+        item.title: item
+        for item in db.exec(select(Item).where(col(Item.id) != existing.id)).all()
+    }
+    assert set(items) == {"Vase", "Small vase", "Variant of existing"}
+    assert items["Small vase"].variant_of == items["Vase"].id
+    assert items["Small vase"].is_original is False
+    assert items["Variant of existing"].variant_of == existing.id
+    images = db.exec(
+        select(ItemImage)
+        .where(ItemImage.item_id == items["Vase"].id)
+        .order_by(col(ItemImage.created_at))
+    ).all()
+    assert [(image.path, image.storage_key, image.name) for image in images] == [
+        ("/uploads/images/vase/front.webp", "images/vase/front.webp", "front"),
+        ("/uploads/images/vase/back.webp", "images/vase/back.webp", "back"),
+    ]
+
+    response = client.get(
+        f"{settings.API_V1_STR}/imports/{result['id']}/errors",
+        headers=superuser_token_headers,
+        params={"limit": 2},
+    )
+    first = response.json()
+    assert first["data"] == [
+        {
+            "row_number": 3,
+            "message": "variant_of must be provided when is_original is false",
+        },
+        {
+            "row_number": 4,
+            "message": "variant_of matches no item and no ref of the file",
+        },
+    ]
+    response = client.get(
+        f"{settings.API_V1_STR}/imports/{result['id']}/errors",
+        headers=superuser_token_headers,
+        params={"limit": 2, "cursor": first["next_cursor"]},
+    )
+    assert response.json()["data"] == [{"row_number": 6, "message": "title is required"}]
+
+
+def test_import_catalog_ndjson_for_producer(
+    client: TestClient, superuser_token_headers: dict[str, str], db: Session
+) -> None:
+    producer = Producer(name="Importer")
+    db.add(producer)
+    db.commit()
+    lines = [
+        json.dumps({"ref": "a", "title": "Original", "image_urls": ["/uploads/a.webp"]}),
+        "not json",
+        json.dumps({"ref": "b", "title": "", "is_original": False, "variant_of": "a"}),
+        json.dumps({"title": "Variant of b", "is_original": False, "variant_of": "b"}),
+    ]
+    result = _import(
+        client,
+        superuser_token_headers,
+        "catalog.jsonl",
+        "\n".join(lines) + "\n",
+        producer_id=str(producer.id),
+    )
+    assert result["status"] == "completed"
+    assert result["format"] == "ndjson"
+    assert result["producer_id"] == str(producer.id)
+    assert (result["items_created"], result["images_created"], result["error_count"]) == (1, 1, 3)
+    item = db.exec(select(Item).where(Item.producer_id == producer.id)).one()
+    assert item.title == "Original"
+
+    response = client.get(
+        f"{settings.API_V1_STR}/imports/{result['id']}/errors",
+        headers=superuser_token_headers,
+    )
+    assert [error["message"] for error in response.json()["data"]] == [
+        "line is not a JSON object",
+        "title is required",
+        "variant_of refers to a rejected row",
+    ]
+
+
+def test_import_catalog_unknown_format(
+    client: TestClient, superuser_token_headers: dict[str, str]
+) -> None:
+    response = client.post(
+        f"{settings.API_V1_STR}/imports/",
+        headers=superuser_token_headers,
+        files={"file": ("catalog.xlsx", b"")},
+    )
+    assert response.status_code == 400
+
+
+def test_import_catalog_requires_superuser(
+    client: TestClient, normal_user_token_headers: dict[str, str]
+) -> None:
+    response = client.get(
+        f"{settings.API_V1_STR}/imports/{uuid.uuid4()}", headers=normal_user_token_headers
+    )
+    assert response.status_code == 403
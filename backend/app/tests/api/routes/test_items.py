@@ -1,10 +1,29 @@
+import asyncio
+import base64
+import csv
+import io
+import json
 import uuid
+from pathlib import Path
+from typing import Any
+from unittest.mock import patch
 
 from fastapi.testclient import TestClient
-from sqlmodel import Session
+from sqlmodel import Session, select
 
 from app.core.config import settings
+from app.core.db import async_engine
+from app.models import Item, ItemImage, Producer, StorageTask
+from app.services.storage_tasks import process_batch
 from app.tests.utils.item import create_random_item
+from app.tests.utils.utils import random_lower_string
+
+
+async def _process_batch() -> int:
+    try:
+        return await process_batch()
+    finally:
+        await async_engine.dispose()
 
 
 def test_create_item(
@@ -129,6 +148,9 @@ def test_delete_item(
     client: TestClient, superuser_token_headers: dict[str, str], db: Session
 ) -> None:
     item = create_random_item(db)
+    key = f"images/{uuid.uuid4()}.webp"
+    db.add(ItemImage(path=f"/uploads/{key}", storage_key=key, name="image", item_id=item.id))
+    db.commit()
     response = client.delete(
         f"{settings.API_V1_STR}/items/{item.id}",
         headers=superuser_token_headers,
@@ -136,6 +158,35 @@ def test_delete_item(
     assert response.status_code == 200
     content = response.json()
     assert content["message"] == "Item deleted successfully"
+    # The file is deleted later by the storage worker
+    tasks = db.exec(select(StorageTask).where(StorageTask.path == key)).all()
+    assert len(tasks) == 1
+
+
+def test_delete_item_keeps_files_stored_elsewhere(
+    client: TestClient,
+    superuser_token_headers: dict[str, str],
+    db: Session,
+    tmp_path: Path,
+) -> None:
+    item = create_random_item(db)
+    # Another site's upload, with the path of one of our files
+    local_file = tmp_path / "images" / "item" / f"{uuid.uuid4()}.webp"
+    local_file.parent.mkdir(parents=True)
+    local_file.write_bytes(b"image")
+    path = f"https://partner.example/uploads/images/item/{local_file.name}"
+    db.add(ItemImage(path=path, name="image", item_id=item.id))
+    db.commit()
+
+    with patch.object(type(settings), "UPLOAD_DIR", tmp_path):
+        response = client.delete(
+            f"{settings.API_V1_STR}/items/{item.id}",
+            headers=superuser_token_headers,
+        )
+        assert response.status_code == 200
+        asyncio.run(_process_batch())
+    assert local_file.exists()
+    assert db.exec(select(StorageTask)).all() == []
 
 
 def test_delete_item_not_found(
@@ -161,3 +212,458 @@ def test_delete_item_not_enough_permissions(
     assert response.status_code == 400
     content = response.json()
     assert content["detail"] == "Not enough permissions"
+
+
+def test_read_items_cursor_pagination(
+    client: TestClient, superuser_token_headers: dict[str, str], db: Session
+) -> None:
+    created = {str(create_random_item(db).id) for _ in range(5)}
+    seen: list[str] = []
+    params: dict[str, str | int] = {"limit": 2}
+    for _ in range(5):
+        response = client.get(
+            f"{settings.API_V1_STR}/items/",
+            headers=superuser_token_headers,
+            params=params,
+        )
+        assert response.status_code == 200
+        content = response.json()
+        assert content["count"] == 5
+        seen.extend(item["id"] for item in content["data"])
+        if content["next_cursor"] is None:
+            break
+        params = {"limit": 2, "cursor": content["next_cursor"]}
+    assert len(seen) == 5
+    assert set(seen) == created
+
+
+def test_read_items_invalid_cursor(
+    client: TestClient, superuser_token_headers: dict[str, str]
+) -> None:
+    response = client.get(
+        f"{settings.API_V1_STR}/items/",
+        headers=superuser_token_headers,
+        params={"cursor": "not-a-cursor"},
+    )
+    assert response.status_code == 400
+    assert response.json()["detail"] == "Invalid cursor"
+
+
+def test_read_items_tampered_cursor(
+    client: TestClient, superuser_token_headers: dict[str, str]
+) -> None:
+    # Well-formed cursors whose id or creation time is not a string
+    values: list[list[Any]] = [["2026-01-01T00:00:00", v] for v in (5, [1], {"a": 1})]
+    values += [[v, str(uuid.uuid4())] for v in (5, 1.5, [1])]
+    for value in values:
+        payload = {"k": "created", "v": value}
+        cursor = base64.urlsafe_b64encode(json.dumps(payload).encode()).decode()
+        response = client.get(
+            f"{settings.API_V1_STR}/items/",
+            headers=superuser_token_headers,
+            params={"cursor": cursor},
+        )
+        assert response.status_code == 400
+        assert response.json()["detail"] == "Invalid cursor"
+
+
+def test_read_items_filtered(client: TestClient, db: Session) -> None:
+    producer = Producer(name=random_lower_string())
+    db.add(producer)
+    original, variant, with_model = (create_random_item(db) for _ in range(3))
+    for item in (original, variant, with_model):
+        item.producer_id = producer.id
+    variant.is_original = False
+    variant.variant_of = original.id
+    with_model.model = "/uploads/models/model.glb"
+    db.add_all([original, variant, with_model])
+    db.commit()
+
+    url = f"{settings.API_V1_STR}/items/"
+
+    def ids(**params: str) -> set[str]:
+        response = client.get(url, params={"producer_id": str(producer.id), **params})
+        assert response.status_code == 200
+        content = response.json()
+        assert content["count"] == len(content["data"])
+        return {item["id"] for item in content["data"]}
+
+    assert ids() == {str(original.id), str(variant.id), str(with_model.id)}
+    assert ids(is_original="false") == {str(variant.id)}
+    assert ids(variant_of=str(original.id)) == {str(variant.id)}
+    assert ids(has_model="true") == {str(with_model.id)}
+    assert ids(has_model="false") == {str(original.id), str(variant.id)}
+
+
+def test_read_items_sorted(client: TestClient, db: Session) -> None:
+    producer = Producer(name=random_lower_string())
+    db.add(producer)
+    items = [create_random_item(db) for _ in range(3)]
+    for title, item in zip(("b", "c", "a"), items, strict=True):
+        item.title = title
+        item.producer_id = producer.id
+    db.add_all(items)
+    db.commit()
+
+    url = f"{settings.API_V1_STR}/items/"
+    params: dict[str, Any] = {"producer_id": str(producer.id), "limit": 2}
+    by_title = client.get(url, params={**params, "sort": "title"}).json()
+    assert [item["title"] for item in by_title["data"]] == ["a", "b"]
+    rest = client.get(
+        url, params={**params, "sort": "title", "cursor": by_title["next_cursor"]}
+    ).json()
+    assert [item["title"] for item in rest["data"]] == ["c"]
+    newest = client.get(url, params={**params, "sort": "newest", "limit": 3}).json()
+    assert [item["title"] for item in newest["data"]] == ["a", "c", "b"]
+    # A cursor only continues the ordering it was issued for
+    response = client.get(
+        url, params={**params, "sort": "newest", "cursor": by_title["next_cursor"]}
+    )
+    assert response.status_code == 400
+    assert response.json()["detail"] == "Invalid cursor"
+
+
+def test_read_my_items_cursor_pagination(
+    client: TestClient, superuser_token_headers: dict[str, str]
+) -> None:
+    for i in range(3):
+        client.post(
+            f"{settings.API_V1_STR}/items/",
+            headers=superuser_token_headers,
+            json={"title": f"Mine {i}"},
+        )
+    response = client.get(
+        f"{settings.API_V1_STR}/items/my-items/",
+        headers=superuser_token_headers,
+        params={"limit": 2},
+    )
+    first_page = response.json()
+    assert [item["title"] for item in first_page["data"]] == ["Mine 0", "Mine 1"]
+    assert first_page["next_cursor"]
+    response = client.get(
+        f"{settings.API_V1_STR}/items/my-items/",
+        headers=superuser_token_headers,
+        params={"limit": 2, "cursor": first_page["next_cursor"]},
+    )
+    second_page = response.json()
+    assert [item["title"] for item in second_page["data"]] == ["Mine 2"]
+    assert second_page["next_cursor"] is None
+
+
+def test_read_item_not_modified(client: TestClient, db: Session) -> None:
+    item = create_random_item(db)
+    response = client.get(f"{settings.API_V1_STR}/items/{item.id}")
+    assert response.status_code == 200
+    etag = response.headers["etag"]
+    response = client.get(
+        f"{settings.API_V1_STR}/items/{item.id}",
+        headers={"If-None-Match": etag},
+    )
+    assert response.status_code == 304
+    assert response.headers["etag"] == etag
+    assert response.content == b""
+
+
+def test_read_item_cache_invalidated_by_update(
+    client: TestClient, superuser_token_headers: dict[str, str], db: Session
+) -> None:
+    item = create_random_item(db)
+    url = f"{settings.API_V1_STR}/items/{item.id}"
+    etag = client.get(url).headers["etag"]
+    response = client.put(
+        url, headers=superuser_token_headers, json={"title": "Updated title"}
+    )
+    assert response.status_code == 200
+    response = client.get(url, headers={"If-None-Match": etag})
+    assert response.status_code == 200
+    assert response.json()["item"]["title"] == "Updated title"
+    assert response.headers["etag"] != etag
+
+
+def test_read_item_cards(client: TestClient, db: Session) -> None:
+    item = create_random_item(db)
+    db.add(ItemImage(path="/uploads/images/cover.webp", name="cover", item_id=item.id))
+    db.commit()
+    response = client.get(f"{settings.API_V1_STR}/items/cards", params={"limit": 1000})
+    assert response.status_code == 200
+    content = response.json()
+    assert content["count"] >= 1
+    card = next(c for c in content["data"] if c["id"] == str(item.id))
+    assert card == {
+        "id": str(item.id),
+        "title": item.title,
+        "cover_image_url": "/uploads/images/cover.webp",
+        "cover_image_variants": [],
+        "producer_name": None,
+        "producer_logo_url": None,
+    }
+
+
+def test_read_item_cards_cursor_pagination(client: TestClient, db: Session) -> None:
+    for _ in range(3):
+        create_random_item(db)
+    url = f"{settings.API_V1_STR}/items/cards"
+    first = client.get(url, params={"limit": 2}).json()
+    assert len(first["data"]) == 2
+    second = client.get(
+        url, params={"limit": 2, "cursor": first["next_cursor"]}
+    ).json()
+    seen = {c["id"] for c in first["data"]}
+    assert not seen & {c["id"] for c in second["data"]}
+
+
+def test_search_items(client: TestClient, db: Session) -> None:
+    word = random_lower_string()[:12]
+    in_title = create_random_item(db)
+    in_title.title = f"{word} vase"
+    in_description = create_random_item(db)
+    in_description.description = f"Glazed {word} inside"
+    by_producer = create_random_item(db)
+    producer = Producer(name=f"{word} pottery")
+    db.add(producer)
+    by_producer.producer_id = producer.id
+    db.add_all([in_title, in_description, by_producer])
+    db.commit()
+
+    url = f"{settings.API_V1_STR}/items/search"
+    response = client.get(url, params={"q": word, "limit": 2})
+    assert response.status_code == 200
+    first = response.json()
+    assert first["count"] == 3
+    # Title matches rank above description and producer name matches
+    assert first["data"][0]["id"] == str(in_title.id)
+    assert first["data"][0]["title_highlight"] == f"<mark>{word}</mark> vase"
+    assert first["data"][0]["rank"] >= first["data"][1]["rank"]
+    second = client.get(
+        url, params={"q": word, "limit": 2, "cursor": first["next_cursor"]}
+    ).json()
+    assert second["next_cursor"] is None
+    ids = {hit["id"] for hit in first["data"] + second["data"]}
+    assert ids == {str(in_title.id), str(in_description.id), str(by_producer.id)}
+    by_producer_hit = next(h for h in first["data"] + second["data"] if h["id"] == str(by_producer.id))
+    assert by_producer_hit["producer_name"] == f"{word} pottery"
+
+
+def test_search_items_escapes_highlights(client: TestClient, db: Session) -> None:
+    word = random_lower_string()[:12]
+    item = create_random_item(db)
+    item.title = f"<img src=x onerror=alert(1)> {word}"
+    item.description = f"{word} & <script>alert(1)</script>"
+    db.add(item)
+    db.commit()
+
+    response = client.get(f"{settings.API_V1_STR}/items/search", params={"q": word})
+    assert response.status_code == 200
+    hit = response.json()["data"][0]
+    assert hit["title_highlight"] == (
+        f"&lt;img src=x onerror=alert(1)&gt; <mark>{word}</mark>"
+    )
+    assert hit["description_highlight"].startswith(f"<mark>{word}</mark> &amp; ")
+    assert "<script" not in hit["description_highlight"]
+
+
+def test_search_items_requires_query(client: TestClient) -> None:
+    response = client.get(f"{settings.API_V1_STR}/items/search", params={"q": ""})
+    assert response.status_code == 422
+
+
+def _variant(db: Session, parent: Item, title: str) -> Item:
+    item = create_random_item(db)
+    item.title = title
+    item.is_original = False
+    item.variant_of = parent.id
+    db.add(item)
+    db.commit()
+    return item
+
+
+def test_read_item_lineage(client: TestClient, db: Session) -> None:
+    original = create_random_item(db)
+    first = _variant(db, original, "first")
+    second = _variant(db, original, "second")
+    nested = _variant(db, first, "nested")
+
+    response = client.get(f"{settings.API_V1_STR}/items/{nested.id}/lineage")
+    assert response.status_code == 200
+    content = response.json()
+    assert content["root_id"] == str(original.id)
+    assert content["truncated"] is False
+    assert [(node["id"], node["depth"]) for node in content["data"]] == [
+        (str(original.id), 0),
+        (str(first.id), 1),
+        (str(second.id), 1),
+        (str(nested.id), 2),
+    ]
+    assert content["data"][3]["variant_of"] == str(first.id)
+
+
+@patch.object(settings, "ITEM_LINEAGE_MAX_DEPTH", 1)
+def test_read_item_lineage_depth_limit(client: TestClient, db: Session) -> None:
+    original = create_random_item(db)
+    first = _variant(db, original, "first")
+    nested = _variant(db, first, "nested")
+
+    url = f"{settings.API_V1_STR}/items"
+    content = client.get(f"{url}/{original.id}/lineage").json()
+    assert [node["id"] for node in content["data"]] == [str(original.id), str(first.id)]
+    assert content["truncated"] is True
+    # Walking up stops at the limit too
+    content = client.get(f"{url}/{nested.id}/lineage").json()
+    assert content["root_id"] == str(first.id)
+    assert content["truncated"] is True
+
+
+def test_read_item_lineage_not_found(client: TestClient) -> None:
+    response = client.get(f"{settings.API_V1_STR}/items/{uuid.uuid4()}/lineage")
+    assert response.status_code == 404
+
+
+def test_export_items_ndjson(
+    client: TestClient, superuser_token_headers: dict[str, str], db: Session
+) -> None:
+    item = create_random_item(db)
+    producer = Producer(name=random_lower_string(), location="Lisbon")
+    db.add(producer)
+    item.producer_id = producer.id
+    db.add(item)
+    for name in ("front", "back"):
+        db.add(ItemImage(path=f"/uploads/images/{name}.webp", name=name, item_id=item.id))
+    db.commit()
+
+    with client.stream(
+        "GET", f"{settings.API_V1_STR}/items/export", headers=superuser_token_headers
+    ) as response:
+        assert response.status_code == 200
+        assert response.headers["content-type"] == "application/x-ndjson"
+        rows = [json.loads(line) for line in response.iter_lines()]
+    row = next(r for r in rows if r["id"] == str(item.id))
+    assert row["title"] == item.title
+    assert row["producer_name"] == producer.name
+    assert row["producer_location"] == "Lisbon"
+    assert row["image_urls"] == ["/uploads/images/front.webp", "/uploads/images/back.webp"]
+
+
+def test_export_items_csv(
+    client: TestClient, superuser_token_headers: dict[str, str], db: Session
+) -> None:
+    item = create_random_item(db)
+    db.add(ItemImage(path="/uploads/images/a.webp", name="a", item_id=item.id))
+    db.add(ItemImage(path="/uploads/images/b.webp", name="b", item_id=item.id))
+    db.commit()
+
+    response = client.get(
+        f"{settings.API_V1_STR}/items/export",
+        headers=superuser_token_headers,
+        params={"format": "csv"},
+    )
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/csv")
+    assert 'filename="items.csv"' in response.headers["content-disposition"]
+    rows = list(csv.DictReader(io.StringIO(response.text)))
+    row = next(r for r in rows if r["id"] == str(item.id))
+    assert row["image_urls"] == "/uploads/images/a.webp|/uploads/images/b.webp"
+    assert row["producer_name"] == ""
+    assert row["is_original"] == "True"
+
+
+def test_export_items_requires_superuser(
+    client: TestClient, normal_user_token_headers: dict[str, str]
+) -> None:
+    response = client.get(
+        f"{settings.API_V1_STR}/items/export", headers=normal_user_token_headers
+    )
+    assert response.status_code == 403
+
+
+def test_create_items_bulk(
+    client: TestClient, superuser_token_headers: dict[str, str], db: Session
+) -> None:
+    original = create_random_item(db)
+    rows = [
+        {"title": "Bulk one"},
+        {"title": "Bulk two", "is_original": False, "variant_of": str(original.id)},
+    ]
+    response = client.post(
+        f"{settings.API_V1_STR}/items/bulk",
+        headers=superuser_token_headers,
+        json={"items": rows},
+    )
+    assert response.status_code == 200
+    content = response.json()
+    assert content["count"] == 2
+    created = [db.get(Item, uuid.UUID(id)) for id in content["ids"]]
+    assert [item.title for item in created if item] == ["Bulk one", "Bulk two"]
+    assert created[1] and created[1].variant_of == original.id
+
+
+def test_create_items_bulk_reports_row_errors(
+    client: TestClient, superuser_token_headers: dict[str, str]
+) -> None:
+    title = random_lower_string()
+    rows: list[dict[str, Any]] = [
+        {"title": title},
+        {"title": ""},
+        {"title": title, "is_original": False},
+        {"title": title, "is_original": False, "variant_of": str(uuid.uuid4())},
+    ]
+    url = f"{settings.API_V1_STR}/items/bulk"
+    response = client.post(url, headers=superuser_token_headers, json={"items": rows})
+    assert response.status_code == 422
+    assert [error["loc"][2] for error in response.json()["detail"]] == [1]
+    rows[1]["title"] = title
+    response = client.post(url, headers=superuser_token_headers, json={"items": rows})
+    assert response.status_code == 422
+    errors = response.json()["detail"]
+    assert [(e["loc"][2], e["loc"][3]) for e in errors] == [
+        (2, "variant_of"),
+        (3, "variant_of"),
+    ]
+    assert errors[1]["msg"] == "Item not found"
+    # Nothing was written
+    response = client.get(url.removesuffix("/bulk") + "/search", params={"q": title})
+    assert response.json()["count"] == 0
+
+
+def test_update_items_bulk(
+    client: TestClient, superuser_token_headers: dict[str, str], db: Session
+) -> None:
+    first, second = create_random_item(db), create_random_item(db)
+    response = client.patch(
+        f"{settings.API_V1_STR}/items/bulk",
+        headers=superuser_token_headers,
+        json={
+            "items": [
+                {"id": str(first.id), "title": "Renamed"},
+                {"id": str(second.id), "is_original": False, "variant_of": str(first.id)},
+            ]
+        },
+    )
+    assert response.status_code == 200
+    assert response.json()["ids"] == [str(first.id), str(second.id)]
+    db.refresh(first)
+    db.refresh(second)
+    assert first.title == "Renamed"
+    assert (second.is_original, second.variant_of) == (False, first.id)
+
+
+def test_update_items_bulk_reports_row_errors(
+    client: TestClient, normal_user_token_headers: dict[str, str], db: Session
+) -> None:
+    other_users_item = create_random_item(db)
+    response = client.patch(
+        f"{settings.API_V1_STR}/items/bulk",
+        headers=normal_user_token_headers,
+        json={
+            "items": [
+                {"id": str(uuid.uuid4()), "title": "Missing"},
+                {"id": str(other_users_item.id), "title": "Not mine"},
+            ]
+        },
+    )
+    assert response.status_code == 422
+    assert [error["msg"] for error in response.json()["detail"]] == [
+        "Item not found",
+        "Not enough permissions",
+    ]
+    db.refresh(other_users_item)
+    assert other_users_item.title != "Not mine"
@@ -0,0 +1,32 @@
+from fastapi.testclient import TestClient
+
+from app.core.config import settings
+
+
+def test_read_pool_stats(
+    client: TestClient, superuser_token_headers: dict[str, str]
+) -> None:
+    response = client.get(
+        f"{settings.API_V1_STR}/logs/pool-stats",
+        headers=superuser_token_headers,
+    )
+    assert response.status_code == 200
+    content = response.json()
+    assert set(content["pools"]) == {"sync", "async"}
+    sync_pool = content["pools"]["sync"]
+    assert sync_pool["pool_size"] == settings.DB_POOL_SIZE
+    assert sync_pool["max_overflow"] == settings.DB_MAX_OVERFLOW
+    assert sync_pool["checkouts"] >= 1
+    assert sync_pool["checked_out"] >= 0
+    assert "max_wait_ms" in sync_pool
+
+
+def test_read_pool_stats_not_enough_permissions(
+    client: TestClient, normal_user_token_headers: dict[str, str]
+) -> None:
+    response = client.get(
+        f"{settings.API_V1_STR}/logs/pool-stats",
+        headers=normal_user_token_headers,
+    )
+    assert response.status_code == 403
+    assert response.json()["detail"] == "Only superusers can access pool stats"
@@ -0,0 +1,42 @@
+import hashlib
+
+from fastapi.testclient import TestClient
+
+from app.core.config import settings
+from app.core.storage import MemoryStorage
+
+
+def test_upload_download_and_delete_model(
+    client: TestClient, memory_storage: MemoryStorage
+) -> None:
+    response = client.post(
+        f"{settings.API_V1_STR}/models/item/user",
+        files={"file": ("vase.3mf", b"model", "application/octet-stream")},
+    )
+    assert response.status_code == 200
+    content = response.json()
+    assert content["sha256"] == hashlib.sha256(b"model").hexdigest()
+    file_name = content["url"].removeprefix("memory://models/")
+    assert memory_storage.files == {f"models/{file_name}": b"model"}
+
+    response = client.get(f"{settings.API_V1_STR}/models/item/user/{file_name}")
+    assert response.status_code == 200
+    assert response.content == b"model"
+    assert response.headers["content-disposition"] == f'attachment; filename="{file_name}"'
+
+    response = client.delete(f"{settings.API_V1_STR}/models/item/user/{file_name}")
+    assert response.status_code == 200
+    assert memory_storage.files == {}
+    response = client.get(f"{settings.API_V1_STR}/models/item/user/{file_name}")
+    assert response.status_code == 404
+
+
+def test_upload_model_rejects_other_files(
+    client: TestClient, memory_storage: MemoryStorage
+) -> None:
+    response = client.post(
+        f"{settings.API_V1_STR}/models/item/user",
+        files={"file": ("vase.stl", b"model", "application/octet-stream")},
+    )
+    assert response.status_code == 400
+    assert memory_storage.files == {}
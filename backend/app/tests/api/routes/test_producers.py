@@ -0,0 +1,94 @@
+import uuid
+
+from fastapi.testclient import TestClient
+from sqlmodel import Session, select
+
+from app.core.config import settings
+from app.models import Item, Producer, Review
+from app.tests.utils.item import create_random_item
+
+
+def create_producer(db: Session, name: str = "Acme Studio") -> Producer:
+    producer = Producer(name=name, location="Berlin")
+    db.add(producer)
+    db.commit()
+    db.refresh(producer)
+    return producer
+
+
+def test_read_producers(client: TestClient, db: Session) -> None:
+    create_producer(db, "First")
+    create_producer(db, "Second")
+    response = client.get(f"{settings.API_V1_STR}/producers/")
+    assert response.status_code == 200
+    content = response.json()
+    assert content["count"] == 2
+    assert {p["name"] for p in content["data"]} == {"First", "Second"}
+
+
+def test_read_producers_cursor_pagination(client: TestClient, db: Session) -> None:
+    for name in ("A", "B", "C"):
+        create_producer(db, name)
+    response = client.get(f"{settings.API_V1_STR}/producers/", params={"limit": 2})
+    first_page = response.json()
+    assert [p["name"] for p in first_page["data"]] == ["A", "B"]
+    response = client.get(
+        f"{settings.API_V1_STR}/producers/",
+        params={"limit": 2, "cursor": first_page["next_cursor"]},
+    )
+    second_page = response.json()
+    assert [p["name"] for p in second_page["data"]] == ["C"]
+    assert second_page["next_cursor"] is None
+
+
+def test_read_producer(client: TestClient, db: Session) -> None:
+    producer = create_producer(db)
+    response = client.get(f"{settings.API_V1_STR}/producers/{producer.id}")
+    assert response.status_code == 200
+    content = response.json()
+    assert content["id"] == str(producer.id)
+    assert content["name"] == producer.name
+
+
+def test_read_producer_not_found(client: TestClient) -> None:
+    response = client.get(f"{settings.API_V1_STR}/producers/{uuid.uuid4()}")
+    assert response.status_code == 404
+    assert response.json()["detail"] == "Producer not found"
+
+
+def test_delete_producer(
+    client: TestClient, superuser_token_headers: dict[str, str], db: Session
+) -> None:
+    producer = create_producer(db)
+    response = client.delete(
+        f"{settings.API_V1_STR}/producers/{producer.id}",
+        headers=superuser_token_headers,
+    )
+    assert response.status_code == 200
+    assert response.json()["message"] == "Producer deleted successfully"
+    db.expunge_all()
+    assert db.get(Producer, producer.id) is None
+
+
+def test_delete_producer_with_reviews_and_items(
+    client: TestClient, superuser_token_headers: dict[str, str], db: Session
+) -> None:
+    producer = create_producer(db)
+    producer_id = producer.id
+    db.add(Review(name="Visitor", review_text="Lovely", producer_id=producer_id))
+    item = create_random_item(db)
+    item.producer_id = producer_id
+    db.add(item)
+    db.commit()
+    item_id = item.id
+    response = client.delete(
+        f"{settings.API_V1_STR}/producers/{producer_id}",
+        headers=superuser_token_headers,
+    )
+    assert response.status_code == 200
+    db.expunge_all()
+    assert db.get(Producer, producer_id) is None
+    assert db.exec(select(Review)).all() == []
+    kept = db.get(Item, item_id)
+    assert kept is not None
+    assert kept.producer_id is None
@@ -7,7 +7,17 @@ from sqlmodel import Session, select
 from app import crud
 from app.core.config import settings
 from app.core.security import verify_password
-from app.models import User, UserCreate
+from app.models import (
+    Item,
+    ItemImage,
+    Producer,
+    ProducerImage,
+    Review,
+    StorageTask,
+    User,
+    UserCreate,
+)
+from app.tests.utils.item import create_random_item
 from app.tests.utils.utils import random_email, random_lower_string
 
 
@@ -168,6 +178,32 @@ def test_retrieve_users(
         assert "email" in item
 
 
+def test_retrieve_users_cursor_pagination(
+    client: TestClient, superuser_token_headers: dict[str, str], db: Session
+) -> None:
+    for _ in range(3):
+        user_in = UserCreate(email=random_email(), password=random_lower_string())
+        crud.create_user(session=db, user_create=user_in)
+
+    seen: list[str] = []
+    params: dict[str, str | int] = {"limit": 2}
+    while True:
+        r = client.get(
+            f"{settings.API_V1_STR}/users/",
+            headers=superuser_token_headers,
+            params=params,
+        )
+        page = r.json()
+        seen.extend(user["id"] for user in page["data"])
+        if page["next_cursor"] is None:
+            break
+        params = {"limit": 2, "cursor": page["next_cursor"]}
+
+    # Three new users plus the first superuser
+    assert len(seen) == len(set(seen)) == 4
+    assert seen == sorted(seen)
+
+
 def test_update_user_me(
     client: TestClient, normal_user_token_headers: dict[str, str], db: Session
 ) -> None:
@@ -444,6 +480,82 @@ def test_delete_user_super_user(
     assert result is None
 
 
+def test_delete_user_with_items_and_producer(
+    client: TestClient, superuser_token_headers: dict[str, str], db: Session
+) -> None:
+    user = crud.create_user(
+        session=db,
+        user_create=UserCreate(email=random_email(), password=random_lower_string()),
+    )
+    user_id = user.id
+    producer = Producer(name="Studio", location="Berlin", user_id=user_id)
+    db.add(producer)
+    db.flush()
+    items = [
+        Item(title=f"Item {i}", owner_id=user_id, producer_id=producer.id)
+        for i in range(3)
+    ]
+    db.add_all(items)
+    db.flush()
+    paths = {f"images/{item.id}.webp" for item in items}
+    db.add_all(
+        ItemImage(
+            path=f"/uploads/images/{item.id}.webp",
+            storage_key=f"images/{item.id}.webp",
+            name="image",
+            item_id=item.id,
+        )
+        for item in items
+    )
+    # Resized copies are queued with their image
+    paths.add("images/item/a.webp.w320.webp")
+    db.add(
+        ItemImage(
+            path="a",
+            storage_key="images/item/a.webp",
+            name="a",
+            item_id=items[0].id,
+            variants=[
+                {"key": "images/item/a.webp.w320.webp", "width": 320, "height": 240, "format": "webp"}
+            ],
+        )
+    )
+    paths.add("images/item/a.webp")
+    paths.add(f"images/producer/{producer.id}.webp")
+    db.add(
+        ProducerImage(
+            path=f"/uploads/images/producer/{producer.id}.webp",
+            storage_key=f"images/producer/{producer.id}.webp",
+            name="logo",
+            image_type="logo",
+            producer_id=producer.id,
+        )
+    )
+    db.add(Review(name="Visitor", review_text="Lovely", producer_id=producer.id))
+    # Another user's item made by the producer is kept
+    other_item = create_random_item(db)
+    other_item.producer_id = producer.id
+    db.add(other_item)
+    db.commit()
+    producer_id, other_item_id = producer.id, other_item.id
+
+    r = client.delete(
+        f"{settings.API_V1_STR}/users/{user_id}",
+        headers=superuser_token_headers,
+    )
+    assert r.status_code == 200
+    db.expunge_all()
+    assert db.get(User, user_id) is None
+    assert db.get(Producer, producer_id) is None
+    assert db.exec(select(Item).where(Item.owner_id == user_id)).all() == []
+    assert db.exec(select(Review)).all() == []
+    kept = db.get(Item, other_item_id)
+    assert kept is not None
+    assert kept.producer_id is None
+    # The stored files are left to the storage worker
+    assert set(db.exec(select(StorageTask.path)).all()) == paths
+
+
 def test_delete_user_not_found(
     client: TestClient, superuser_token_headers: dict[str, str]
 ) -> None:
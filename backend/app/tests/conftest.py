@@ -1,20 +1,43 @@
-from collections.abc import Generator
+from collections.abc import AsyncGenerator, Generator
+from unittest.mock import patch
 
 import pytest
 from fastapi.testclient import TestClient
 from sqlmodel import Session, delete
+from sqlmodel.ext.asyncio.session import AsyncSession
 
 from app.core.config import settings
-from app.core.db import engine, init_db
+from app.core.db import async_engine, engine, init_db
+from app.core.storage import MemoryStorage, set_storage
 from app.main import app
-from app.models import EmailLog, Item, ItemImage, Producer, ProducerImage, Review, User
+from app.models import (
+    Blob,
+    EmailLog,
+    Item,
+    ItemImage,
+    Producer,
+    ProducerImage,
+    Review,
+    StorageTask,
+    User,
+)
 from app.tests.utils.user import authentication_token_from_email
 from app.tests.utils.utils import get_superuser_token_headers
 
 
 def clear_database(session: Session) -> None:
     session.rollback()
-    for model in (ProducerImage, Review, ItemImage, Item, EmailLog, Producer, User):
+    for model in (
+        ProducerImage,
+        Review,
+        ItemImage,
+        Item,
+        EmailLog,
+        Producer,
+        User,
+        StorageTask,
+        Blob,
+    ):
         session.execute(delete(model))
     session.commit()
 
@@ -28,12 +51,35 @@ def db() -> Generator[Session, None, None]:
         clear_database(session)
 
 
+@pytest.fixture
+def anyio_backend() -> str:
+    return "asyncio"
+
+
+@pytest.fixture
+async def async_db(db: Session) -> AsyncGenerator[AsyncSession, None]:  # noqa: ARG001
+    async with AsyncSession(async_engine, expire_on_commit=False) as session:
+        yield session
+    # Pooled connections are bound to this test's event loop
+    await async_engine.dispose()
+
+
 @pytest.fixture(scope="module")
 def client() -> Generator[TestClient, None, None]:
-    with TestClient(app) as c:
+    # Tests carry out storage tasks themselves (app.services.storage_tasks)
+    with patch.object(settings, "STORAGE_WORKER_ENABLED", False), TestClient(app) as c:
         yield c
 
 
+@pytest.fixture
+def memory_storage() -> Generator[MemoryStorage, None, None]:
+    storage = MemoryStorage()
+    set_storage(storage)
+    yield storage
+    # Chosen from the settings again on next use
+    set_storage(None)
+
+
 @pytest.fixture
 def superuser_token_headers(client: TestClient) -> dict[str, str]:
     return get_superuser_token_headers(client)
@@ -0,0 +1,97 @@
+import pytest
+from sqlmodel import Session
+
+from app.core.cache import (
+    ITEM_TABLES,
+    CachedResponse,
+    _etag_matches,
+    make_etag,
+    response_cache,
+)
+from app.core.db import engine
+from app.core.table_cache import TableCache
+from app.tests.utils.item import create_random_item
+
+KEY = ("/test", "")
+
+
+@pytest.fixture(autouse=True)
+def empty_response_cache() -> None:
+    response_cache.clear()
+
+
+def _store(db: Session) -> CachedResponse:
+    entry = CachedResponse(b"{}", make_etag(b"{}"))
+    response_cache.store(KEY, entry, response_cache.versions(db, ITEM_TABLES))
+    return entry
+
+
+def _lookup(db: Session) -> CachedResponse | None:
+    return response_cache.lookup(KEY, response_cache.versions(db, ITEM_TABLES))
+
+
+def test_cached_response_invalidated_on_update(db: Session) -> None:
+    item = create_random_item(db)
+    entry = _store(db)
+    assert _lookup(db) == entry
+    item.title = "Renamed"
+    db.add(item)
+    db.commit()
+    assert _lookup(db) is None
+
+
+def test_cached_response_invalidated_by_other_sessions(db: Session) -> None:
+    item = create_random_item(db)
+    _store(db)
+    # As written by another worker process or the CLI: nothing in this process
+    # hears of the write but the database
+    with Session(engine) as other:
+        other_item = other.get(type(item), item.id)
+        assert other_item is not None
+        other_item.title = "Renamed elsewhere"
+        other.add(other_item)
+        other.commit()
+    assert _lookup(db) is None
+
+
+def test_cached_response_kept_on_rollback(db: Session) -> None:
+    item = create_random_item(db)
+    entry = _store(db)
+    item.title = "Renamed"
+    db.add(item)
+    db.flush()
+    db.rollback()
+    assert _lookup(db) == entry
+
+
+def test_updates_keep_row_versions(db: Session) -> None:
+    cache: TableCache[int] = TableCache(60, 10, updates=False)
+    item = create_random_item(db)
+    cache.store("count", 1, cache.versions(db, ("item",)))
+    item.title = "Renamed"
+    db.add(item)
+    db.commit()
+    assert cache.lookup("count", cache.versions(db, ("item",))) == 1
+    create_random_item(db)
+    assert cache.lookup("count", cache.versions(db, ("item",))) is None
+
+
+def test_full_cache_evicts_least_recently_used() -> None:
+    cache: TableCache[int] = TableCache(60, 2)
+    versions = (1, 2)
+    cache.store("a", 1, versions)
+    cache.store("b", 2, versions)
+    assert cache.lookup("a", versions) == 1
+    cache.store("c", 3, versions)
+    assert cache.lookup("b", versions) is None
+    assert cache.lookup("a", versions) == 1
+    assert cache.lookup("c", versions) == 3
+
+
+def test_etag_matches() -> None:
+    etag = make_etag(b"body")
+    assert _etag_matches(etag, etag)
+    assert _etag_matches(f'"other", W/{etag}', etag)
+    assert _etag_matches("*", etag)
+    assert not _etag_matches('"other"', etag)
+    assert not _etag_matches(None, etag)
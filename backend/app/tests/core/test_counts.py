@@ -0,0 +1,102 @@
+from unittest.mock import patch
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import text
+from sqlmodel import Session, delete, func, select
+
+from app.core.config import CountMode, settings
+from app.core.counts import count_cache, count_rows
+from app.core.explain import Explain, iter_plan_nodes
+from app.models import Item
+from app.tests.utils.item import create_random_item
+
+ITEM_COUNT = select(func.count()).select_from(Item)
+
+
+@pytest.fixture(autouse=True)
+def empty_count_cache() -> None:
+    count_cache.clear()
+
+
+def test_exact_count(db: Session) -> None:
+    create_random_item(db)
+    assert count_rows(db, ITEM_COUNT, CountMode.EXACT) == (1, True)
+
+
+def test_cached_count_invalidated_on_insert(db: Session) -> None:
+    create_random_item(db)
+    assert count_rows(db, ITEM_COUNT, CountMode.CACHED) == (1, True)
+    assert count_rows(db, ITEM_COUNT, CountMode.CACHED) == (1, False)
+    create_random_item(db)
+    assert count_rows(db, ITEM_COUNT, CountMode.CACHED) == (2, True)
+
+
+def test_cached_count_invalidated_on_bulk_delete(db: Session) -> None:
+    create_random_item(db)
+    assert count_rows(db, ITEM_COUNT, CountMode.CACHED).value == 1
+    db.exec(delete(Item))  # type: ignore
+    db.commit()
+    assert count_rows(db, ITEM_COUNT, CountMode.CACHED) == (0, True)
+
+
+def test_cached_count_kept_on_rollback(db: Session) -> None:
+    create_random_item(db)
+    count_rows(db, ITEM_COUNT, CountMode.CACHED)
+    db.exec(delete(Item))  # type: ignore
+    db.rollback()
+    assert count_rows(db, ITEM_COUNT, CountMode.CACHED) == (1, False)
+
+
+def test_estimated_count_small_table_is_exact(db: Session) -> None:
+    create_random_item(db)
+    assert count_rows(db, ITEM_COUNT, CountMode.ESTIMATED) == (1, True)
+
+
+def test_estimated_count_uses_planner(db: Session) -> None:
+    create_random_item(db)
+    with patch.object(settings, "COUNT_ESTIMATE_THRESHOLD", 0):
+        result = count_rows(db, ITEM_COUNT, CountMode.ESTIMATED)
+    assert result.exact is False
+    assert result.value >= 0
+
+
+def test_estimated_count_of_parallel_plan(db: Session) -> None:
+    for _ in range(3):
+        create_random_item(db)
+    db.exec(text("ANALYZE item"))  # type: ignore[call-overload]
+    with patch.object(settings, "COUNT_ESTIMATE_THRESHOLD", 0):
+        serial = count_rows(db, ITEM_COUNT, CountMode.ESTIMATED)
+        # Make parallel plans free, whatever the size of the table
+        for setting in [
+            "parallel_setup_cost",
+            "parallel_tuple_cost",
+            "min_parallel_table_scan_size",
+        ]:
+            db.exec(text(f"SET LOCAL {setting} = 0"))  # type: ignore[call-overload]
+        db.exec(text("SET LOCAL max_parallel_workers_per_gather = 2"))  # type: ignore[call-overload]
+        plan = db.execute(Explain(ITEM_COUNT)).scalar_one()
+        parallel = count_rows(db, ITEM_COUNT, CountMode.ESTIMATED)
+    db.rollback()
+    assert any(node["Node Type"] == "Gather" for node in iter_plan_nodes(plan[0]["Plan"]))
+    assert parallel.exact is False
+    # Each worker's estimate, scaled back up to the whole table
+    assert abs(parallel.value - serial.value) <= 1
+
+
+@patch.object(settings, "RESPONSE_CACHE_ENABLED", False)
+def test_read_items_count_mode(client: TestClient, db: Session) -> None:
+    create_random_item(db)
+    response = client.get(
+        f"{settings.API_V1_STR}/items/", params={"count_mode": "cached"}
+    )
+    assert response.json()["count"] == 1
+    assert response.json()["count_exact"] is True
+    response = client.get(
+        f"{settings.API_V1_STR}/items/", params={"count_mode": "cached"}
+    )
+    assert response.json()["count_exact"] is False
+    response = client.get(
+        f"{settings.API_V1_STR}/items/", params={"count_mode": "bogus"}
+    )
+    assert response.status_code == 422
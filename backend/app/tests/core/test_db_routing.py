@@ -0,0 +1,94 @@
+from typing import Any
+
+import pytest
+from starlette.applications import Starlette
+from starlette.responses import PlainTextResponse
+from starlette.routing import Route
+from starlette.testclient import TestClient
+
+from app.core import db, db_routing
+from app.core.db_routing import (
+    READ_YOUR_WRITES_COOKIE,
+    ReadYourWritesMiddleware,
+    ReadYourWritesWindow,
+    select_async_engine,
+)
+
+
+@pytest.fixture
+def replica(monkeypatch: pytest.MonkeyPatch) -> Any:
+    sentinel = object()
+    monkeypatch.setattr(db, "async_replica_engine", sentinel)
+    monkeypatch.setattr(
+        db_routing, "read_your_writes", ReadYourWritesWindow(60, "secret")
+    )
+    return sentinel
+
+
+def test_primary_without_replica() -> None:
+    assert select_async_engine("GET", None) is db.async_engine
+
+
+def test_safe_requests_use_replica(replica: Any) -> None:
+    assert select_async_engine("GET", None) is replica
+    assert select_async_engine("HEAD", "Bearer abc") is replica
+
+
+def test_writes_use_primary(replica: Any) -> None:  # noqa: ARG001
+    for method in ("POST", "PUT", "PATCH", "DELETE"):
+        assert select_async_engine(method, "Bearer abc") is db.async_engine
+
+
+def test_read_your_writes_window(replica: Any) -> None:
+    cookie = db_routing.read_your_writes.cookie("Bearer writer")
+    assert select_async_engine("GET", "Bearer writer", cookie) is db.async_engine
+    assert select_async_engine("GET", "Bearer writer") is replica
+    # Bound to the client, and signed
+    assert select_async_engine("GET", "Bearer someone-else", cookie) is replica
+    forged = f"9{cookie}"
+    assert select_async_engine("GET", "Bearer writer", forged) is replica
+    assert select_async_engine("GET", "Bearer writer", "garbage") is replica
+
+
+def test_read_your_writes_window_is_shared() -> None:
+    # As opened by another worker process, with the same secret
+    cookie = ReadYourWritesWindow(60, "secret").cookie("Bearer writer")
+    assert ReadYourWritesWindow(60, "secret").is_active(cookie, "Bearer writer")
+    assert not ReadYourWritesWindow(60, "other").is_active(cookie, "Bearer writer")
+
+
+def test_read_your_writes_window_expires() -> None:
+    window = ReadYourWritesWindow(0, "secret")
+    cookie = window.cookie("Bearer writer")
+    assert window.is_active(cookie, "Bearer writer") is False
+    assert window.is_active(None, "Bearer writer") is False
+    assert window.is_active(cookie, None) is False
+
+
+def test_middleware_marks_successful_writes(replica: Any) -> None:  # noqa: ARG001
+    async def ok(_request: Any) -> PlainTextResponse:
+        return PlainTextResponse("ok")
+
+    async def fail(_request: Any) -> PlainTextResponse:
+        return PlainTextResponse("no", status_code=400)
+
+    app = Starlette(
+        routes=[
+            Route("/ok", ok, methods=["GET", "POST"]),
+            Route("/fail", fail, methods=["POST"]),
+        ]
+    )
+    app.add_middleware(ReadYourWritesMiddleware)
+    window = db_routing.read_your_writes
+    with TestClient(app) as client:
+        response = client.get("/ok", headers={"Authorization": "Bearer reader"})
+        assert READ_YOUR_WRITES_COOKIE not in response.cookies
+        response = client.post("/fail", headers={"Authorization": "Bearer failed"})
+        assert READ_YOUR_WRITES_COOKIE not in response.cookies
+        response = client.post("/ok")
+        assert READ_YOUR_WRITES_COOKIE not in response.cookies
+        response = client.post("/ok", headers={"Authorization": "Bearer writer"})
+    cookie = response.cookies[READ_YOUR_WRITES_COOKIE]
+    assert window.is_active(cookie, "Bearer writer") is True
+    assert "Max-Age=60" in response.headers["set-cookie"]
+    assert "HttpOnly" in response.headers["set-cookie"]
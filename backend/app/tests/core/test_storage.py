@@ -0,0 +1,346 @@
+import asyncio
+import hashlib
+import io
+import threading
+import time
+import uuid
+from collections.abc import Generator
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Any
+from unittest.mock import patch
+
+import pytest
+from fastapi import HTTPException, UploadFile
+from sqlmodel import Session, literal, select
+
+from app.core import storage as storage_module
+from app.core.config import CDNFolder, settings
+from app.core.storage import (
+    FILE_NOT_FOUND,
+    BunnyCDNStorage,
+    DeleteResult,
+    FileStat,
+    LocalStorage,
+    MemoryStorage,
+    StoredFile,
+    storage_key_expression,
+    storage_key_of,
+)
+
+CONTENT = b"0123456789" * 10
+
+
+class StorageStandIn(ThreadingHTTPServer):
+    """Local stand-in for the BunnyCDN Storage API."""
+
+    def __init__(self) -> None:
+        super().__init__(("127.0.0.1", 0), _StorageHandler)
+        self.files: dict[str, bytes] = {}
+        # Status codes to answer before handling requests normally
+        self.failures: list[int] = []
+        self.requests: list[tuple[str, str]] = []
+        self.connections: set[tuple[str, int]] = set()
+        self.in_flight = 0
+        self.most_in_flight = 0
+        self.lock = threading.Lock()
+
+    @property
+    def endpoint(self) -> str:
+        return f"http://127.0.0.1:{self.server_address[1]}"
+
+
+class _StorageHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    server: StorageStandIn
+
+    def _respond(self, status: int) -> None:
+        self.send_response(status)
+        self.send_header("Content-Length", "0")
+        self.end_headers()
+
+    def _serve(self, method: str) -> None:
+        # The pull zone: public, and answers ranges
+        content = self.server.files.get(self.path)
+        if content is None:
+            self._respond(404)
+            return
+        status = 200
+        if "Range" in self.headers:
+            start, end = self.headers["Range"].removeprefix("bytes=").split("-")
+            content = content[int(start) : int(end) + 1 if end else None]
+            status = 206
+        self.send_response(status)
+        self.send_header("Content-Length", str(len(content)))
+        self.end_headers()
+        if method == "GET":
+            self.wfile.write(content)
+
+    def _handle(self, method: str) -> None:
+        server = self.server
+        body = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        with server.lock:
+            server.requests.append((method, self.path))
+            server.connections.add(self.client_address)
+            server.in_flight += 1
+            server.most_in_flight = max(server.most_in_flight, server.in_flight)
+            failure = server.failures.pop(0) if server.failures else None
+        time.sleep(0.01)
+        with server.lock:
+            server.in_flight -= 1
+        if self.headers["AccessKey"] != "key":
+            self._respond(401)
+        elif failure is not None:
+            self._respond(failure)
+        elif method == "PUT":
+            server.files[self.path] = body
+            self._respond(201)
+        else:
+            self._respond(200 if server.files.pop(self.path, None) is not None else 404)
+
+    def do_PUT(self) -> None:
+        self._handle("PUT")
+
+    def do_DELETE(self) -> None:
+        self._handle("DELETE")
+
+    def do_GET(self) -> None:
+        self._serve("GET")
+
+    def do_HEAD(self) -> None:
+        self._serve("HEAD")
+
+    def log_message(self, *_args: Any) -> None:
+        pass
+
+
+@pytest.fixture
+def storage() -> Generator[StorageStandIn, None, None]:
+    server = StorageStandIn()
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    with (
+        patch.object(settings, "BUNNYCDN_STORAGE_ZONE", "zone"),
+        patch.object(settings, "BUNNYCDN_API_KEY", "key"),
+        patch.object(settings, "BUNNYCDN_STORAGE_ENDPOINT", server.endpoint),
+        patch.object(settings, "BUNNYCDN_PULL_ZONE_URL", f"{server.endpoint}/zone"),
+        patch.object(settings, "BUNNYCDN_RETRY_BACKOFF_SECONDS", 0.01),
+    ):
+        yield server
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.fixture
+def local(tmp_path: Path) -> Generator[LocalStorage, None, None]:
+    with patch.object(type(settings), "UPLOAD_DIR", tmp_path):
+        yield LocalStorage()
+
+
+def _run(coroutine: Any, backend: BunnyCDNStorage | None = None) -> Any:
+    async def run() -> Any:
+        try:
+            return await coroutine
+        finally:
+            # The pooled client is bound to this event loop
+            if backend is not None:
+                await backend.close()
+
+    return asyncio.run(run())
+
+
+async def _read(backend: Any, path: str, start: int = 0, end: int | None = None) -> bytes:
+    return b"".join([chunk async for chunk in backend.open_range(path, start, end)])
+
+
+def test_delete_many_local(local: LocalStorage, tmp_path: Path) -> None:
+    stored = tmp_path / "images" / "kept.webp"
+    stored.parent.mkdir()
+    stored.write_bytes(b"image")
+    foreign = tmp_path / "images" / "foreign.webp"
+    foreign.write_bytes(b"image")
+    paths = [
+        f"{settings.BACKEND_HOST}/uploads/images/kept.webp",
+        "/uploads/images/missing.webp",
+        # Another site's uploads are not ours
+        "https://partner.example/uploads/images/foreign.webp",
+    ]
+    results = asyncio.run(local.delete_many(paths))
+    assert results == [
+        DeleteResult(paths[0], True),
+        DeleteResult(paths[1], False, FILE_NOT_FOUND),
+        DeleteResult(paths[2], False, FILE_NOT_FOUND),
+    ]
+    assert not stored.exists()
+    assert foreign.exists()
+
+
+def test_local_file_stays_in_upload_dir(local: LocalStorage, tmp_path: Path) -> None:
+    assert local.file("images/a.webp") == tmp_path.resolve() / "images" / "a.webp"
+    assert local.file(str(tmp_path / "a.webp")) == tmp_path.resolve() / "a.webp"
+    for path in ["/uploads/../../etc/passwd", "../secret", "/etc/passwd"]:
+        with pytest.raises(FileNotFoundError):
+            local.file(path)
+
+
+@patch.object(settings, "STORAGE_DELETE_CONCURRENCY", 2)
+def test_delete_many_bunnycdn(storage: StorageStandIn) -> None:
+    paths = [f"{storage.endpoint}/zone/images/item/{i}.webp" for i in range(3)]
+    paths += [f"images/item/{i}.webp" for i in range(3, 6)]
+    storage.files = {f"/zone/images/item/{i}.webp": b"image" for i in range(6)}
+    paths.append("images/item/missing.webp")
+    # Files on another pull zone are not ours, whatever their path
+    paths.append("https://otherzone.b-cdn.net/images/item/0.webp")
+
+    backend = BunnyCDNStorage()
+    results = _run(backend.delete_many(paths), backend)
+    assert [result.path for result in results] == paths
+    assert all(result.deleted for result in results[:6])
+    assert results[6] == DeleteResult(paths[6], False, FILE_NOT_FOUND)
+    assert results[7] == DeleteResult(paths[7], False, FILE_NOT_FOUND)
+    assert storage.files == {}
+    assert storage.most_in_flight == 2
+    # Connections are kept alive and reused
+    assert len(storage.connections) == 2
+
+
+def test_save_upload_bunnycdn_retries_server_errors(storage: StorageStandIn) -> None:
+    storage.failures = [503, 502]
+    file_id = uuid.uuid4()
+    upload = UploadFile(io.BytesIO(b"image"), filename="photo.webp")
+
+    backend = BunnyCDNStorage()
+    stored = _run(backend.save_upload(upload, CDNFolder.IMAGES_ITEM, file_id), backend)
+    assert stored.url == f"{storage.endpoint}/zone/images/item/{file_id}.webp"
+    assert storage.files == {f"/zone/images/item/{file_id}.webp": b"image"}
+    assert len(storage.requests) == 3
+
+
+@patch.object(storage_module, "UPLOAD_CHUNK_SIZE", 16)
+def test_save_upload_bunnycdn_streams_chunks(storage: StorageStandIn) -> None:
+    file_id = uuid.uuid4()
+    upload = UploadFile(io.BytesIO(CONTENT), filename="model.3mf")
+
+    backend = BunnyCDNStorage()
+    stored = _run(backend.save_upload(upload, CDNFolder.MODELS, file_id), backend)
+    assert stored == StoredFile(
+        f"models/{file_id}.3mf",
+        f"{storage.endpoint}/zone/models/{file_id}.3mf",
+        len(CONTENT),
+        hashlib.sha256(CONTENT).hexdigest(),
+    )
+    assert storage.files == {f"/zone/models/{file_id}.3mf": CONTENT}
+
+
+@patch.object(settings, "UPLOAD_MAX_MODEL_BYTES", 50)
+def test_save_upload_bunnycdn_rejects_large_files(storage: StorageStandIn) -> None:
+    upload = UploadFile(io.BytesIO(CONTENT), filename="model.3mf")
+
+    backend = BunnyCDNStorage()
+    with pytest.raises(HTTPException) as exc_info:
+        _run(backend.save_upload(upload, CDNFolder.MODELS, uuid.uuid4()), backend)
+    assert exc_info.value.status_code == 413
+    assert storage.requests == []
+
+
+def test_bunnycdn_reads_from_pull_zone(storage: StorageStandIn) -> None:
+    storage.files = {"/zone/models/a.3mf": CONTENT}
+    backend = BunnyCDNStorage()
+
+    async def read() -> tuple[Any, ...]:
+        return (
+            await backend.stat(backend.public_url("models/a.3mf")),
+            await backend.exists("models/b.3mf"),
+            await _read(backend, "models/a.3mf", 10, 20),
+        )
+
+    assert _run(read(), backend) == (FileStat(len(CONTENT)), False, CONTENT[10:20])
+    # Reads do not go through the Storage API
+    assert storage.requests == []
+
+
+@patch.object(settings, "BUNNYCDN_MAX_RETRIES", 1)
+def test_delete_many_bunnycdn_gives_up_after_retries(storage: StorageStandIn) -> None:
+    storage.failures = [500, 500]
+    path = "images/item/broken.webp"
+
+    backend = BunnyCDNStorage()
+    results = _run(backend.delete_many([path]), backend)
+    assert results == [DeleteResult(path, False, "BunnyCDN returned 500")]
+    assert len(storage.requests) == 2
+
+
+@patch.object(storage_module, "UPLOAD_CHUNK_SIZE", 16)
+def test_save_upload_local_streams_chunks(local: LocalStorage, tmp_path: Path) -> None:
+    file_id = uuid.uuid4()
+    upload = UploadFile(io.BytesIO(CONTENT), filename="model.3mf")
+
+    stored = asyncio.run(local.save_upload(upload, CDNFolder.MODELS, file_id))
+    assert stored == StoredFile(
+        f"models/{file_id}.3mf",
+        f"{settings.BACKEND_HOST}/uploads/models/{file_id}.3mf",
+        len(CONTENT),
+        hashlib.sha256(CONTENT).hexdigest(),
+    )
+    assert [p.name for p in (tmp_path / "models").iterdir()] == [f"{file_id}.3mf"]
+    assert (tmp_path / "models" / f"{file_id}.3mf").read_bytes() == CONTENT
+    assert asyncio.run(local.stat(stored.url)) == FileStat(
+        len(CONTENT), (tmp_path / "models" / f"{file_id}.3mf").stat().st_mtime
+    )
+    assert asyncio.run(_read(local, stored.url, 5, 40)) == CONTENT[5:40]
+
+
+@patch.object(storage_module, "UPLOAD_CHUNK_SIZE", 16)
+def test_put_stream_local_removes_partial_file(local: LocalStorage, tmp_path: Path) -> None:
+    # No size from the multipart parser: the limit is enforced while streaming
+    upload = UploadFile(io.BytesIO(CONTENT), filename="model.3mf")
+    reader = storage_module._UploadReader(upload, 50)
+
+    with pytest.raises(HTTPException) as exc_info:
+        asyncio.run(local.put_stream("models/large.3mf", reader.chunks, len(CONTENT)))
+    assert exc_info.value.status_code == 413
+    assert list((tmp_path / "models").iterdir()) == []
+
+
+def test_memory_storage() -> None:
+    memory = MemoryStorage()
+    upload = UploadFile(io.BytesIO(CONTENT), filename="photo.webp")
+
+    async def run() -> tuple[Any, ...]:
+        stored = await memory.save_upload(upload, CDNFolder.IMAGES_ITEM, uuid.uuid4())
+        return (
+            stored,
+            await _read(memory, stored.url, 90),
+            await memory.delete_many([stored.url, stored.url]),
+            await memory.exists(stored.url),
+        )
+
+    stored, tail, results, exists = asyncio.run(run())
+    assert stored.url.startswith("memory://images/item/")
+    assert tail == CONTENT[90:]
+    assert results == [
+        DeleteResult(stored.url, True),
+        DeleteResult(stored.url, False, FILE_NOT_FOUND),
+    ]
+    assert not exists
+
+
+@patch.object(settings, "BUNNYCDN_PULL_ZONE_URL", "https://zone.b-cdn.net")
+def test_storage_key_of(db: Session) -> None:
+    keys = {
+        "https://zone.b-cdn.net/images/item/a.webp": "images/item/a.webp",
+        f"{settings.BACKEND_HOST}/uploads/models/b.3mf": "models/b.3mf",
+        "/uploads/images/c.webp": "images/c.webp",
+        "/srv/app/backend/uploads/images/d.webp": "images/d.webp",
+        # Files elsewhere
+        "https://example.com/e.webp": None,
+        "https://othersite.example/uploads/a.jpg": None,
+        "https://otherzone.b-cdn.net/images/x.webp": None,
+        "https://zone.b-cdn.net.example/images/x.webp": None,
+        # Paths leading out of the storage
+        "/uploads/../../etc/passwd": None,
+        "/uploads//etc/passwd": None,
+    }
+    for path, key in keys.items():
+        assert storage_key_of(path) == key
+        assert db.exec(select(storage_key_expression(literal(path)))).one() == key
@@ -1,5 +1,7 @@
+import pytest
 from fastapi.encoders import jsonable_encoder
 from sqlmodel import Session
+from sqlmodel.ext.asyncio.session import AsyncSession
 
 from app import crud
 from app.core.security import verify_password
@@ -89,3 +91,34 @@ def test_update_user(db: Session) -> None:
     assert user_2
     assert user.email == user_2.email
     assert verify_password(new_password, user_2.hashed_password)
+
+
+@pytest.mark.anyio
+async def test_create_and_authenticate_user_async(async_db: AsyncSession) -> None:
+    email = random_email()
+    password = random_lower_string()
+    user_in = UserCreate(email=email, password=password)
+    user = await crud.create_user_async(session=async_db, user_create=user_in)
+    assert user.email == email
+    authenticated_user = await crud.authenticate_async(
+        session=async_db, email=email, password=password
+    )
+    assert authenticated_user
+    assert authenticated_user.id == user.id
+    wrong_password = await crud.authenticate_async(
+        session=async_db, email=email, password=random_lower_string()
+    )
+    assert wrong_password is None
+
+
+@pytest.mark.anyio
+async def test_update_user_async(async_db: AsyncSession) -> None:
+    user_in = UserCreate(email=random_email(), password=random_lower_string())
+    user = await crud.create_user_async(session=async_db, user_create=user_in)
+    new_password = random_lower_string()
+    await crud.update_user_async(
+        session=async_db, db_user=user, user_in=UserUpdate(password=new_password)
+    )
+    user_2 = await crud.get_user_by_email_async(session=async_db, email=user.email)
+    assert user_2
+    assert verify_password(new_password, user_2.hashed_password)
@@ -0,0 +1,11 @@
+from sqlmodel import Session
+
+from app.core.db import engine
+from app.index_advisor import HOT_QUERIES, find_sequential_scans
+
+
+def test_hot_queries_use_indexes() -> None:
+    with Session(engine) as session:
+        findings = find_sequential_scans(session)
+    assert HOT_QUERIES
+    assert findings == []
@@ -0,0 +1,121 @@
+import asyncio
+import io
+import os
+from collections.abc import Generator
+from pathlib import Path
+from typing import Any
+
+import pytest
+from PIL import Image
+
+from app.core.storage import MemoryStorage
+from app.services.image_renders import (
+    CachedFile,
+    RenderCache,
+    render_image,
+    rendered_file,
+    set_render_cache,
+    snap,
+)
+
+
+@pytest.fixture
+def cache(tmp_path: Path) -> Generator[RenderCache, None, None]:
+    cache = RenderCache(tmp_path, 1000)
+    set_render_cache(cache)
+    yield cache
+    set_render_cache(None)
+
+
+def _png(width: int, height: int) -> bytes:
+    buffer = io.BytesIO()
+    Image.new("RGBA", (width, height), (0, 128, 128, 128)).save(buffer, format="PNG")
+    return buffer.getvalue()
+
+
+def test_render_image() -> None:
+    # Fits the box, keeping the aspect ratio
+    with Image.open(io.BytesIO(render_image(_png(80, 40), 40, 40, "webp", 75))) as image:
+        assert (image.format, image.size, image.mode) == ("WEBP", (40, 20), "RGBA")
+    # Never enlarged; JPEG has no alpha
+    with Image.open(io.BytesIO(render_image(_png(80, 40), 200, None, "jpeg", 75))) as image:
+        assert (image.format, image.size, image.mode) == ("JPEG", (80, 40), "RGB")
+
+
+def test_render_cache_evicts_least_recently_used(cache: RenderCache, tmp_path: Path) -> None:
+    for name in ("aa.webp", "bb.webp", "cc.webp"):
+        cache.put(name, b"x" * 400)
+    # Only the two most recent fit
+    assert cache.get("aa.webp") is None
+    hit = cache.get("bb.webp")
+    assert hit is not None and hit.file.name == str(tmp_path / "bb" / "bb.webp")
+    assert hit.stat.st_size == 400
+    hit.file.close()
+    cache.put("dd.webp", b"x" * 400)
+    assert cache.get("cc.webp") is None
+    assert sorted(p.name for p in tmp_path.glob("*/*")) == ["bb.webp", "dd.webp"]
+    assert cache.size() == 800
+
+
+def test_render_cache_is_shared(cache: RenderCache, tmp_path: Path) -> None:
+    # As used by another process: the order and sizes come from the directory
+    other = RenderCache(tmp_path, 1000)
+    cache.put("aa.webp", b"x" * 400)
+    other.put("bb.webp", b"x" * 400)
+    os.utime(tmp_path / "bb" / "bb.webp", (1, 1))
+    stale = tmp_path / "bb" / "ee.webp.part"
+    stale.write_bytes(b"x")
+    os.utime(stale, (1, 1))
+    cache.put("cc.webp", b"x" * 400)
+    # The least recently used file went, whichever process wrote it, and the
+    # partial file left by an interrupted write with it
+    assert other.get("bb.webp") is None
+    hit = other.get("aa.webp")
+    assert hit is not None
+    hit.file.close()
+    assert not stale.exists()
+    assert other.size() == 800
+
+
+class CountingStorage(MemoryStorage):
+    def __init__(self) -> None:
+        super().__init__()
+        self.reads = 0
+
+    def open_range(self, path: str, start: int = 0, end: int | None = None) -> Any:
+        self.reads += 1
+        return super().open_range(path, start, end)
+
+
+def test_rendered_file_renders_once(cache: RenderCache) -> None:
+    storage = CountingStorage()
+    storage.files["images/item/a.png"] = _png(80, 40)
+
+    async def run() -> list[CachedFile]:
+        renders = [rendered_file(storage, "images/item/a.png", 20, None, "png") for _ in range(3)]
+        cached = await asyncio.gather(*renders)
+        # Served from the cache from now on
+        return [*cached, await rendered_file(storage, "images/item/a.png", 20, None, "png")]
+
+    contents = {b"".join(cached.chunks()) for cached in asyncio.run(run())}
+    assert len(contents) == 1
+    assert storage.reads == 1
+    content = contents.pop()
+    with Image.open(io.BytesIO(content)) as image:
+        assert image.size == (20, 10)
+    assert cache.size() == len(content)
+
+
+def test_cached_file_outlives_its_eviction(cache: RenderCache, tmp_path: Path) -> None:
+    cache.put("aa.webp", b"x" * 400)
+    hit = cache.get("aa.webp")
+    assert hit is not None
+    # Evicted by another process between the lookup and the response
+    RenderCache(tmp_path, 1000).put("bb.webp", b"y" * 800)
+    assert not (tmp_path / "aa" / "aa.webp").exists()
+    assert b"".join(hit.chunks()) == b"x" * 400
+    assert hit.file.closed
+
+
+def test_snap() -> None:
+    assert [snap(size) for size in (None, 1, 32, 33, 5000)] == [None, 32, 32, 64, 4096]
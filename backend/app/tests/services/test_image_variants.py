@@ -0,0 +1,53 @@
+import asyncio
+import io
+from unittest.mock import patch
+
+from PIL import Image
+from sqlmodel import Session, select
+
+from app.core.config import settings
+from app.core.storage import MemoryStorage
+from app.models import ItemImage
+from app.services.image_variants import make_all, render_variants
+from app.tests.utils.item import create_random_item
+
+
+def _png(width: int, height: int) -> bytes:
+    buffer = io.BytesIO()
+    Image.new("RGB", (width, height), "teal").save(buffer, format="PNG")
+    return buffer.getvalue()
+
+
+def test_render_variants() -> None:
+    rendered = render_variants(_png(80, 40), [32, 64, 128], ["avif", "webp"], 75)
+    # Not upscaled: the widest variant has the original's width
+    assert [(v.width, v.height, v.format) for v in rendered] == [
+        (32, 16, "avif"),
+        (32, 16, "webp"),
+        (64, 32, "avif"),
+        (64, 32, "webp"),
+        (80, 40, "avif"),
+        (80, 40, "webp"),
+    ]
+    with Image.open(io.BytesIO(rendered[1].content)) as image:
+        assert (image.format, image.size) == ("WEBP", (32, 16))
+
+
+@patch.object(settings, "IMAGE_VARIANT_WIDTHS", [16])
+@patch.object(settings, "IMAGE_VARIANT_FORMATS", ["webp"])
+def test_make_all(db: Session, memory_storage: MemoryStorage) -> None:
+    item = create_random_item(db)
+    memory_storage.files["images/item/a.png"] = _png(40, 20)
+    db.add(ItemImage(path="a", storage_key="images/item/a.png", name="a", item_id=item.id))
+    # Stored elsewhere: left without variants
+    db.add(ItemImage(path="https://example.com/b.png", name="b", item_id=item.id))
+    db.commit()
+
+    assert asyncio.run(make_all(regenerate=False, concurrency=2)) == 1
+    image = db.exec(select(ItemImage).where(ItemImage.name == "a")).one()
+    assert image.variants == [
+        {"key": "images/item/a.png.w16.webp", "width": 16, "height": 8, "format": "webp"}
+    ]
+    assert "images/item/a.png.w16.webp" in memory_storage.files
+    # Only images without variants, unless regenerating
+    assert asyncio.run(make_all(regenerate=False, concurrency=2)) == 0
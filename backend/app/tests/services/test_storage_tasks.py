@@ -0,0 +1,90 @@
+import asyncio
+from collections.abc import Awaitable, Generator
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import TypeVar
+from unittest.mock import patch
+
+import pytest
+from sqlmodel import Session, select
+
+from app.core.config import settings
+from app.core.db import async_engine
+from app.models import StorageTask
+from app.services.storage_tasks import (
+    LEASE,
+    _claim,
+    enqueue_deletions,
+    process_batch,
+)
+
+T = TypeVar("T")
+
+
+@pytest.fixture(autouse=True)
+def upload_dir(tmp_path: Path) -> Generator[None, None, None]:
+    # Files are deleted through the local storage, which stays in UPLOAD_DIR
+    with patch.object(type(settings), "UPLOAD_DIR", tmp_path):
+        yield
+
+
+def _process_batch() -> int:
+    return _run(process_batch())
+
+
+def _run(coroutine: Awaitable[T]) -> T:
+    async def run() -> T:
+        try:
+            return await coroutine
+        finally:
+            # Pooled connections are bound to this event loop
+            await async_engine.dispose()
+
+    return asyncio.run(run())
+
+
+def test_process_batch_deletes_files(db: Session, tmp_path: Path) -> None:
+    stored = tmp_path / "stored.webp"
+    stored.write_bytes(b"image")
+    missing = tmp_path / "missing.webp"
+    enqueue_deletions(db, [str(stored), str(missing)])
+    db.commit()
+
+    assert _process_batch() == 2
+    assert not stored.exists()
+    # A file that is already gone needs no retry
+    assert db.exec(select(StorageTask)).all() == []
+
+
+def test_process_batch_retries_failures(db: Session, tmp_path: Path) -> None:
+    # Deleting a directory fails, and keeps failing
+    enqueue_deletions(db, [str(tmp_path)])
+    db.commit()
+
+    assert _process_batch() == 1
+    task = db.exec(select(StorageTask)).one()
+    assert task.attempts == 1
+    assert task.last_error
+    assert task.next_attempt_at > datetime.utcnow()
+    # Not due again until its backoff has passed
+    assert _process_batch() == 0
+    assert tmp_path.exists()
+
+
+def test_claimed_tasks_are_leased(db: Session, tmp_path: Path) -> None:
+    stored = tmp_path / "stored.webp"
+    stored.write_bytes(b"image")
+    enqueue_deletions(db, [str(stored)])
+    db.commit()
+
+    # As if the worker that claimed the task died before deleting the file
+    assert len(_run(_claim(10))) == 1
+    task = db.exec(select(StorageTask)).one()
+    assert task.next_attempt_at > datetime.utcnow() + LEASE - timedelta(minutes=1)
+    assert _process_batch() == 0
+    assert stored.exists()
+    task.next_attempt_at = datetime.utcnow()
+    db.add(task)
+    db.commit()
+    assert _process_batch() == 1
+    assert not stored.exists()
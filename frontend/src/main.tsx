@@ -12,6 +12,8 @@ OpenAPI.BASE = import.meta.env.VITE_API_URL
 OpenAPI.TOKEN = async () => {
   return localStorage.getItem("access_token") || ""
 }
+// Sends the backend's read-your-writes cookie back after a write
+OpenAPI.WITH_CREDENTIALS = true
 
 const queryClient = new QueryClient()
 